@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Contract
+from .models import Contract, ContractBatch
 
 
 @admin.register(Contract)
@@ -107,3 +107,16 @@ class ContractAdmin(admin.ModelAdmin):
         return obj.is_trial_period
     is_trial_period_display.boolean = True
     is_trial_period_display.short_description = 'En période d\'essai'
+
+
+
+@admin.register(ContractBatch)
+class ContractBatchAdmin(admin.ModelAdmin):
+    """Admin pour les lots de contrats (suivi uniquement)"""
+    
+    list_display = ['id', 'status', 'processed', 'total', 'succeeded', 'failed', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    readonly_fields = [
+        'status', 'parameters', 'total', 'processed', 'succeeded', 'failed', 'errors',
+        'created_by', 'created_at', 'started_at', 'finished_at'
+    ]
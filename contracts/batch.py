@@ -0,0 +1,371 @@
+"""
+Lots de contrats : création en masse et génération parallèle des documents Word
+
+Un lot (ContractBatch) porte une liste de salariés et des conditions
+communes. Son exécution se fait en deux temps :
+    - création : salariés, contrats actifs et numéros existants chargés en une
+      requête chacun, contrats validés en mémoire (Contract.validate_terms)
+      puis insérés avec bulk_create ; en renouvellement, les conditions du
+      contrat actif sont reprises et ce contrat passe à l'état « expiré » ;
+    - documents : variante et champs de chaque contrat lus dans le processus
+      principal, squelette rempli (skeletons.render_contract) dans un pool de
+      processus qui ne reçoit que ces données simples, comme l'export des
+      bulletins (au plus `workers * PENDING_PER_WORKER` documents en cours) ;
+      fichiers enregistrés au fil de l'eau et avancement écrit en base tous
+      les PROGRESS_EVERY contrats.
+Les erreurs sont relevées salarié par salarié dans ContractBatch.errors, sans
+interrompre le lot. Le lot est suivi par l'API (GET /api/contracts/batches/<id>/).
+
+Exécution : la commande run_contract_batches (cron ou worker dédié) est le
+mode pris en charge, avec le pool de processus. CONTRACT_BATCH_ASYNC lance en
+plus le lot dans un thread après la requête qui le crée (start_contract_batch),
+avec un rendu séquentiel : pas de pool de processus créé depuis un thread
+d'un processus web.
+
+Un lot en cours écrit un signe de vie (heartbeat_at) à chaque écriture de
+l'avancement. Un lot « en cours » sans signe de vie depuis
+CONTRACT_BATCH_STALE_AFTER secondes (processus arrêté) est repris par la
+commande : si ses contrats ont déjà été créés, seuls les documents manquants
+sont générés.
+"""
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from employees.models import Employee, MedicalVisit
+from sirh_core.stats_cache import invalidate_stats
+from . import skeletons
+from .models import Contract, ContractBatch
+
+
+# Documents en attente par processus de rendu (borne la mémoire)
+PENDING_PER_WORKER = 4
+
+# Contrats traités entre deux écritures de l'avancement
+PROGRESS_EVERY = 10
+
+# Conditions reprises du contrat actif lors d'un renouvellement
+RENEWED_FIELDS = [
+    'contract_type', 'entity_template', 'working_hours_per_week', 'hourly_rate', 'monthly_salary',
+    'collective_agreement', 'collective_agreement_date', 'occupational_health_service',
+]
+
+DATE_PARAMETERS = ['start_date', 'end_date', 'trial_end_date', 'collective_agreement_date']
+DECIMAL_PARAMETERS = ['working_hours_per_week', 'hourly_rate', 'monthly_salary']
+
+
+def stale_after():
+    return timedelta(seconds=getattr(settings, 'CONTRACT_BATCH_STALE_AFTER', 600))
+
+
+def claimable_batches(now=None):
+    """Lots à exécuter : en attente, ou « en cours » sans signe de vie récent (processus interrompu)"""
+    cutoff = (now or timezone.now()) - stale_after()
+    return ContractBatch.objects.filter(
+        Q(status='pending')
+        | Q(status='running', heartbeat_at__lt=cutoff)
+        | Q(status='running', heartbeat_at__isnull=True, started_at__lt=cutoff)
+    )
+
+
+def default_workers():
+    return getattr(settings, 'CONTRACT_BATCH_WORKERS', 0) or os.cpu_count() or 1
+
+
+def batch_parameters(data):
+    """Paramètres validés d'un lot, sérialisables en JSON (dates et montants en chaînes)"""
+    return {
+        key: str(value) if isinstance(value, (date, Decimal)) else value
+        for key, value in data.items()
+    }
+
+
+def _terms(parameters, previous):
+    """Conditions d'un contrat du lot : paramètres du lot, complétés par le contrat renouvelé"""
+    terms = {}
+    if previous is not None:
+        terms.update({field: getattr(previous, field) for field in RENEWED_FIELDS})
+        if previous.end_date:
+            terms['start_date'] = previous.end_date + timedelta(days=1)
+        terms['contract_status'] = 'confirmed'
+    for field in RENEWED_FIELDS + ['start_date', 'end_date', 'trial_end_date', 'contract_status', 'notes']:
+        value = parameters.get(field)
+        if value in (None, ''):
+            continue
+        if field in DATE_PARAMETERS:
+            value = date.fromisoformat(value)
+        elif field in DECIMAL_PARAMETERS:
+            value = Decimal(value)
+        terms[field] = value
+    return terms
+
+
+def contract_number(parameters, contract):
+    prefix = parameters.get('number_prefix') or f'{contract.contract_type.upper()}-{contract.start_date:%Y%m%d}'
+    return f'{prefix}-{contract.employee.employee_id}'
+
+
+def create_batch_contracts(batch):
+    """
+    Créer les contrats du lot en une transaction.
+    Retourne (contrats créés, erreurs par salarié).
+    """
+    parameters = batch.parameters
+    employee_ids = parameters['employees']
+    renewal = parameters.get('renewal', False)
+    employees = Employee.objects.select_related('user').in_bulk(employee_ids)
+    active = {}
+    for contract in Contract.objects.filter(employee_id__in=employee_ids, status='active').order_by('employee_id', '-start_date'):
+        active.setdefault(contract.employee_id, contract)
+
+    errors = []
+    contracts = []
+    for employee_id in employee_ids:
+        employee = employees.get(employee_id)
+        previous = active.get(employee_id)
+        if employee is None:
+            errors.append({'employee': employee_id, 'contract': None, 'error': 'Salarié introuvable'})
+            continue
+        if renewal and previous is None:
+            errors.append({'employee': employee_id, 'contract': None, 'error': 'Aucun contrat actif à renouveler'})
+            continue
+        if not renewal and previous is not None:
+            errors.append({
+                'employee': employee_id, 'contract': previous.id,
+                'error': f'Le salarié {employee} a déjà un contrat actif. Un seul contrat actif par salarié est autorisé.'
+            })
+            continue
+
+        contract = Contract(
+            employee=employee,
+            batch=batch,
+            created_by=batch.created_by,
+            status='active',
+            **_terms(parameters, previous if renewal else None)
+        )
+        try:
+            # Clés étrangères exclues : leur validation fait une requête par contrat
+            contract.clean_fields(exclude=['employee', 'batch', 'created_by', 'contract_number', 'contract_file'])
+            contract.validate_terms()
+        except ValidationError as error:
+            errors.append({'employee': employee_id, 'contract': None, 'error': ' '.join(error.messages)})
+            continue
+        contract.contract_number = contract_number(parameters, contract)
+        contracts.append((contract, previous))
+
+    taken = set(
+        Contract.objects.filter(contract_number__in=[contract.contract_number for contract, _ in contracts])
+        .values_list('contract_number', flat=True)
+    )
+    accepted = []
+    for contract, previous in contracts:
+        if contract.contract_number in taken:
+            errors.append({
+                'employee': contract.employee_id, 'contract': None,
+                'error': f'Le numéro de contrat {contract.contract_number} existe déjà'
+            })
+            continue
+        taken.add(contract.contract_number)
+        accepted.append((contract, previous))
+
+    with transaction.atomic():
+        if renewal and accepted:
+            Contract.objects.filter(id__in=[previous.id for _, previous in accepted]).update(
+                status='expired', updated_at=timezone.now()
+            )
+        created = Contract.objects.bulk_create([contract for contract, _ in accepted])
+        if not renewal:
+            _create_hiring_visits(created)
+    # bulk_create / update n'envoient pas de signaux
+    invalidate_stats('employees')
+    return created, errors
+
+
+def _create_hiring_visits(contracts):
+    """Visites médicales d'embauche des nouveaux contrats (comme à la création unitaire)"""
+    existing = set(
+        MedicalVisit.objects.filter(
+            employee_id__in=[contract.employee_id for contract in contracts],
+            visit_type='embauche'
+        ).values_list('employee_id', 'scheduled_date')
+    )
+    MedicalVisit.objects.bulk_create([
+        MedicalVisit(
+            employee=contract.employee,
+            visit_type='embauche',
+            scheduled_date=contract.start_date,
+            doctor_name=contract.occupational_health_service or '',
+            status='scheduled',
+            notes='Créée automatiquement lors de la création du contrat'
+        )
+        for contract in contracts
+        if (contract.employee_id, contract.start_date) not in existing
+    ])
+
+
+# Rendu dans un processus de rendu : il ne reçoit que des données simples, comme
+# l'export des bulletins (une instance de modèle ne se désérialise pas avant le
+# chargement des applications, en spawn ou forkserver)
+_render_contract = skeletons.render_contract
+
+
+def render_job(contract):
+    """(nom du fichier, arguments de _render_contract) d'un contrat, lus dans le processus principal"""
+    from .utils import contract_document_filename, contract_fields, contract_variant
+
+    entity, contract_type, gender = contract_variant(contract)
+    return contract_document_filename(contract, entity), (entity, contract_type, gender, contract_fields(contract))
+
+
+def _rendered(contracts, workers):
+    """Itérateur de (contrat, (nom, contenu) ou None, erreur ou None), dans l'ordre"""
+    if workers <= 1:
+        for contract in contracts:
+            try:
+                filename, arguments = render_job(contract)
+                document, error = (filename, _render_contract(*arguments)), None
+            except Exception as render_error:
+                document, error = None, str(render_error)
+            yield contract, document, error
+        return
+
+    def result(contract, filename, future, error):
+        if error is None:
+            try:
+                return contract, (filename, future.result()), None
+            except Exception as render_error:
+                error = str(render_error)
+        return contract, None, error
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for contract in contracts:
+            try:
+                filename, arguments = render_job(contract)
+            except Exception as error:
+                pending.append((contract, None, None, str(error)))
+            else:
+                pending.append((contract, filename, executor.submit(_render_contract, *arguments), None))
+            if len(pending) >= workers * PENDING_PER_WORKER:
+                yield result(*pending.popleft())
+        while pending:
+            yield result(*pending.popleft())
+
+
+def render_batch_documents(batch, contracts, workers=None):
+    """Générer et enregistrer les documents des contrats du lot en relevant l'avancement"""
+    workers = default_workers() if workers is None else workers
+    rendered = []
+
+    def flush():
+        if rendered:
+            Contract.objects.bulk_update(rendered, ['contract_file', 'updated_at'])
+            rendered.clear()
+        ContractBatch.objects.filter(pk=batch.pk).update(
+            processed=batch.processed, succeeded=batch.succeeded, failed=batch.failed, errors=batch.errors,
+            heartbeat_at=timezone.now()
+        )
+
+    for contract, document, error in _rendered(contracts, workers):
+        if error is None:
+            filename, content = document
+            contract.contract_file.save(filename, ContentFile(content), save=False)
+            contract.updated_at = timezone.now()
+            rendered.append(contract)
+            batch.succeeded += 1
+        else:
+            batch.errors.append({'employee': contract.employee_id, 'contract': contract.id, 'error': error})
+            batch.failed += 1
+        batch.processed += 1
+        if batch.processed % PROGRESS_EVERY == 0:
+            flush()
+    flush()
+
+
+def claim_batch(batch):
+    """
+    Passer un lot en attente (ou interrompu) à « en cours » ; False s'il est
+    déjà pris par un autre processus. L'état enregistré du lot est relu.
+    """
+    now = timezone.now()
+    claimed = claimable_batches(now).filter(pk=batch.pk).update(
+        status='running', started_at=Coalesce(F('started_at'), now), heartbeat_at=now
+    )
+    if claimed:
+        batch.refresh_from_db()
+    return bool(claimed)
+
+
+def resume_batch_contracts(batch):
+    """
+    Contrats d'un lot interrompu après leur création : ceux sans document, à
+    générer. L'avancement repart des documents déjà enregistrés ; les erreurs
+    de rendu de ces contrats sont retirées (nouvel essai).
+    """
+    contracts = list(
+        Contract.objects.filter(batch=batch).select_related('employee__user', 'employee__profession').order_by('id')
+    )
+    pending = [contract for contract in contracts if not contract.contract_file]
+    pending_ids = {contract.id for contract in pending}
+    batch.errors = [error for error in batch.errors if error.get('contract') not in pending_ids]
+    batch.failed = len(batch.errors)
+    batch.succeeded = len(contracts) - len(pending)
+    batch.processed = batch.succeeded + batch.failed
+    return pending
+
+
+def run_contract_batch(batch, workers=None):
+    """Exécuter un lot en attente ou interrompu : création des contrats puis génération des documents"""
+    if not claim_batch(batch):
+        return batch
+    try:
+        if Contract.objects.filter(batch=batch).exists():
+            # Reprise : la création (une transaction) a déjà été validée
+            contracts = resume_batch_contracts(batch)
+        else:
+            contracts, errors = create_batch_contracts(batch)
+            batch.errors = errors
+            batch.processed = batch.failed = len(errors)
+            batch.succeeded = 0
+        render_batch_documents(batch, contracts, workers)
+        batch.status = 'completed'
+    except Exception as error:
+        batch.errors.append({'employee': None, 'contract': None, 'error': str(error)})
+        batch.status = 'failed'
+    batch.finished_at = timezone.now()
+    batch.save(update_fields=['status', 'processed', 'succeeded', 'failed', 'errors', 'finished_at'])
+    return batch
+
+
+def _run_in_background(batch_id):
+    try:
+        # Rendu séquentiel : pas de fork d'un pool de processus depuis un thread
+        run_contract_batch(ContractBatch.objects.get(pk=batch_id), workers=1)
+    finally:
+        connection.close()
+
+
+def start_contract_batch(batch):
+    """
+    Lancer un lot : dans un thread une fois la transaction validée, ou
+    immédiatement si CONTRACT_BATCH_ASYNC est désactivé. Les lots restés en
+    attente ou interrompus (redémarrage) sont repris par la commande
+    run_contract_batches.
+    """
+    if not getattr(settings, 'CONTRACT_BATCH_ASYNC', True):
+        return run_contract_batch(batch)
+    transaction.on_commit(
+        lambda: threading.Thread(target=_run_in_background, args=(batch.pk,), daemon=True).start()
+    )
+    return batch
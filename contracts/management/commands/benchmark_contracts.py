@@ -0,0 +1,69 @@
+"""
+Management command pour comparer la génération des CDD Word : construction complète
+(build_contract_document) et remplissage du squelette compilé (contracts.skeletons)
+"""
+import time
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from contracts.models import Contract
+from contracts.skeletons import clear_template_cache
+from contracts.utils import generate_contract_document
+from employees.models import Employee
+
+
+class Command(BaseCommand):
+    help = "Mesure le temps de génération d'un CDD Word, avec et sans squelette compilé"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='Contrats générés par variante (défaut : 20)')
+
+    def handle(self, *args, **options):
+        iterations = max(options['iterations'], 1)
+        for entity, _ in Contract.ENTITY_TEMPLATE_CHOICES:
+            for gender, _ in Employee.GENDER_CHOICES:
+                contract = self._sample_contract(entity, gender)
+
+                builder = self._timed(lambda: generate_contract_document(contract, use_cache=False), iterations)
+                clear_template_cache()
+                first = self._timed(lambda: generate_contract_document(contract), 1)
+                cached = self._timed(lambda: generate_contract_document(contract), iterations)
+
+                self.stdout.write(
+                    f'{entity} / {gender} : construction {builder * 1000:.1f} ms, '
+                    f'squelette {cached * 1000:.2f} ms (premier appel {first * 1000:.1f} ms), '
+                    f'x{builder / cached:.0f}'
+                )
+        self.stdout.write(self.style.SUCCESS(f'✅ {iterations} contrat(s) généré(s) par variante et par méthode'))
+
+    @staticmethod
+    def _timed(function, iterations):
+        """Durée moyenne d'un appel (secondes)"""
+        started = time.perf_counter()
+        for _ in range(iterations):
+            function()
+        return (time.perf_counter() - started) / iterations
+
+    @staticmethod
+    def _sample_contract(entity, gender):
+        """Contrat fictif non enregistré"""
+        user = get_user_model()(first_name='Camille', last_name='Martin')
+        employee = Employee(
+            user=user,
+            gender=gender,
+            address='12 rue des Lilas',
+            postal_code='44000',
+            city='Nantes',
+            birth_date=date(1990, 5, 15),
+            birth_place='Nantes',
+            social_security_number='190054412345678',
+        )
+        return Contract(
+            employee=employee,
+            contract_type='cdd',
+            entity_template=entity,
+            start_date=date(2026, 1, 5),
+            end_date=date(2026, 6, 30),
+        )
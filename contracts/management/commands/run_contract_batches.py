@@ -0,0 +1,32 @@
+"""
+Management command pour exécuter les lots de contrats en attente
+(lots créés sans exécution en arrière-plan ou interrompus par un redémarrage).
+C'est le mode d'exécution pris en charge (cron ou worker dédié), avec le pool
+de processus de rendu.
+"""
+from django.core.management.base import BaseCommand
+
+from contracts.batch import claimable_batches, default_workers, run_contract_batch
+from contracts.models import ContractBatch
+
+
+class Command(BaseCommand):
+    help = 'Crée les contrats et génère les documents Word des lots en attente ou interrompus'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, help="Identifiant d'un lot précis (par défaut : tous les lots en attente ou interrompus)")
+        parser.add_argument('--workers', type=int, default=None, help='Processus de rendu (par défaut : CONTRACT_BATCH_WORKERS ou nombre de CPU)')
+
+    def handle(self, *args, **options):
+        workers = default_workers() if options['workers'] is None else options['workers']
+        batches = claimable_batches().order_by('created_at')
+        if options['batch']:
+            batches = batches.filter(pk=options['batch'])
+
+        for batch in batches:
+            run_contract_batch(batch, workers)
+            self.stdout.write(
+                f'Lot {batch.id} : {batch.get_status_display()}, '
+                f'{batch.succeeded} contrat(s) généré(s), {batch.failed} erreur(s)'
+            )
+        self.stdout.write(self.style.SUCCESS(f'✅ {len(batches)} lot(s) traité(s)'))
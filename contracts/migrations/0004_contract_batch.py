@@ -0,0 +1,43 @@
+# Generated by Django 4.2.8 on 2026-10-17 11:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('contracts', '0003_contract_entity_template'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContractBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('running', 'En cours'), ('completed', 'Terminé'), ('failed', 'Échoué')], default='pending', help_text='État du lot', max_length=20)),
+                ('parameters', models.JSONField(default=dict, help_text='Salariés et conditions des contrats à créer')),
+                ('total', models.PositiveIntegerField(default=0, help_text='Salariés du lot')),
+                ('processed', models.PositiveIntegerField(default=0, help_text='Salariés traités')),
+                ('succeeded', models.PositiveIntegerField(default=0, help_text='Contrats créés avec leur document')),
+                ('failed', models.PositiveIntegerField(default=0, help_text='Salariés en erreur')),
+                ('errors', models.JSONField(default=list, help_text='Erreurs par salarié : [{employee, contract, error}]')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(help_text='Utilisateur qui a lancé le lot', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='contract_batches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Lot de contrats',
+                'verbose_name_plural': 'Lots de contrats',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='contract',
+            name='batch',
+            field=models.ForeignKey(blank=True, help_text='Lot de génération ayant créé le contrat', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='contracts', to='contracts.contractbatch'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-17 12:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contracts', '0004_contract_batch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contractbatch',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Dernier signe de vie du processus qui exécute le lot (reprise des lots interrompus)', null=True),
+        ),
+    ]
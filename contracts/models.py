@@ -3,9 +3,10 @@ from django.core.exceptions import ValidationError
 from django.utils import timezone
 from employees.models import Employee
 from accounts.models import CustomUser
+from sirh_core.tracking import TrackedModelMixin
 
 
-class Contract(models.Model):
+class Contract(TrackedModelMixin, models.Model):
     """Modèle pour les contrats de travail"""
     
     CONTRACT_TYPE_CHOICES = [
@@ -149,6 +150,15 @@ class Contract(models.Model):
         help_text='Fichier du contrat (PDF)'
     )
     
+    batch = models.ForeignKey(
+        'ContractBatch',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='contracts',
+        help_text='Lot de génération ayant créé le contrat'
+    )
+    
     # Audit
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -186,17 +196,7 @@ class Contract(models.Model):
     def clean(self):
         """Validations personnalisées"""
         super().clean()
-        
-        # Vérifier que end_date est après start_date pour les contrats avec fin
-        if self.end_date and self.end_date < self.start_date:
-            raise ValidationError('La date de fin doit être après la date de début')
-        
-        # Vérifier la période d'essai
-        if self.trial_end_date:
-            if self.trial_end_date < self.start_date:
-                raise ValidationError('La fin d\'essai doit être après le début du contrat')
-            if self.end_date and self.trial_end_date > self.end_date:
-                raise ValidationError('La fin d\'essai ne peut pas dépasser la fin du contrat')
+        self.validate_terms()
         
         # Vérifier qu'un salarié ne peut avoir qu'un seul contrat actif à la fois
         active_contracts = Contract.objects.filter(
@@ -209,6 +209,19 @@ class Contract(models.Model):
                 f'Le salarié {self.employee} a déjà un contrat actif. '
                 'Un seul contrat actif par salarié est autorisé.'
             )
+    
+    def validate_terms(self):
+        """Validations des dates et de la rémunération (sans requête, utilisées aussi par les lots)"""
+        # Vérifier que end_date est après start_date pour les contrats avec fin
+        if self.end_date and self.end_date < self.start_date:
+            raise ValidationError('La date de fin doit être après la date de début')
+        
+        # Vérifier la période d'essai
+        if self.trial_end_date:
+            if self.trial_end_date < self.start_date:
+                raise ValidationError('La fin d\'essai doit être après le début du contrat')
+            if self.end_date and self.trial_end_date > self.end_date:
+                raise ValidationError('La fin d\'essai ne peut pas dépasser la fin du contrat')
         
         # Vérifier le salaire ou le taux horaire
         if not self.hourly_rate and not self.monthly_salary:
@@ -256,3 +269,84 @@ class Contract(models.Model):
             remaining = (self.end_date - today).days
             return max(0, remaining)
         return None
+
+
+class ContractBatch(models.Model):
+    """Lot de création de contrats et de génération des documents Word (contracts.batch)"""
+    
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('running', 'En cours'),
+        ('completed', 'Terminé'),
+        ('failed', 'Échoué'),
+    ]
+    
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pending',
+        help_text='État du lot'
+    )
+    
+    parameters = models.JSONField(
+        default=dict,
+        help_text='Salariés et conditions des contrats à créer'
+    )
+    
+    # Avancement
+    total = models.PositiveIntegerField(default=0, help_text='Salariés du lot')
+    processed = models.PositiveIntegerField(default=0, help_text='Salariés traités')
+    succeeded = models.PositiveIntegerField(default=0, help_text='Contrats créés avec leur document')
+    failed = models.PositiveIntegerField(default=0, help_text='Salariés en erreur')
+    errors = models.JSONField(
+        default=list,
+        help_text='Erreurs par salarié : [{employee, contract, error}]'
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    heartbeat_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="Dernier signe de vie du processus qui exécute le lot (reprise des lots interrompus)"
+    )
+    finished_at = models.DateTimeField(blank=True, null=True)
+    created_by = models.ForeignKey(
+        CustomUser,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='contract_batches',
+        help_text='Utilisateur qui a lancé le lot'
+    )
+    
+    class Meta:
+        verbose_name = 'Lot de contrats'
+        verbose_name_plural = 'Lots de contrats'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f'Lot {self.id} ({self.get_status_display()}, {self.processed}/{self.total})'
+    
+    @property
+    def progress(self):
+        """Avancement en pourcentage"""
+        if not self.total:
+            return 100 if self.status in ['completed', 'failed'] else 0
+        return round(100 * self.processed / self.total)
+
+
+def active_contracts_by_employee(employee_ids, reference_date=None):
+    """Contrat actif le plus récent par employé, en une seule requête"""
+    from django.db.models import Q
+    
+    reference_date = reference_date or timezone.now().date()
+    contracts = (
+        Contract.objects.filter(employee_id__in=employee_ids, status='active')
+        .filter(Q(end_date__isnull=True) | Q(end_date__gte=reference_date))
+        .filter(Q(start_date__isnull=True) | Q(start_date__lte=reference_date))
+        .order_by('employee_id', '-start_date')
+    )
+    contracts_by_employee = {}
+    for contract in contracts:
+        contracts_by_employee.setdefault(contract.employee_id, contract)
+    return contracts_by_employee
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Contract
+from .models import Contract, ContractBatch
 from employees.serializers import EmployeeSerializer
 
 
@@ -52,3 +52,63 @@ class ContractSerializer(serializers.ModelSerializer):
     
     def get_days_remaining(self, obj):
         return obj.days_remaining
+
+
+class ContractBatchCreateSerializer(serializers.Serializer):
+    """Paramètres d'un lot de contrats (contracts.batch)"""
+    
+    employees = serializers.ListField(child=serializers.IntegerField(), min_length=1, max_length=500)
+    renewal = serializers.BooleanField(default=False)
+    contract_type = serializers.ChoiceField(choices=Contract.CONTRACT_TYPE_CHOICES, required=False)
+    contract_status = serializers.ChoiceField(choices=Contract.CONTRACT_STATUS_CHOICES, required=False)
+    entity_template = serializers.ChoiceField(choices=Contract.ENTITY_TEMPLATE_CHOICES, required=False, allow_null=True)
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+    trial_end_date = serializers.DateField(required=False)
+    working_hours_per_week = serializers.DecimalField(max_digits=5, decimal_places=2, required=False)
+    hourly_rate = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    monthly_salary = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    collective_agreement = serializers.CharField(max_length=200, required=False)
+    collective_agreement_date = serializers.DateField(required=False)
+    occupational_health_service = serializers.CharField(max_length=200, required=False, allow_blank=True)
+    notes = serializers.CharField(required=False, allow_blank=True)
+    number_prefix = serializers.CharField(max_length=30, required=False)
+    
+    def validate_employees(self, value):
+        # Un salarié ne figure qu'une fois dans le lot
+        return list(dict.fromkeys(value))
+    
+    def validate(self, attrs):
+        if not attrs['renewal']:
+            missing = [field for field in ('contract_type', 'start_date') if not attrs.get(field)]
+            if missing:
+                raise serializers.ValidationError({field: 'Ce champ est obligatoire hors renouvellement.' for field in missing})
+        return attrs
+
+
+class ContractBatchSerializer(serializers.ModelSerializer):
+    """Serializer pour le suivi d'un lot de contrats"""
+    
+    progress = serializers.IntegerField(read_only=True)
+    contracts = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    
+    class Meta:
+        model = ContractBatch
+        fields = [
+            'id',
+            'status',
+            'parameters',
+            'total',
+            'processed',
+            'succeeded',
+            'failed',
+            'progress',
+            'errors',
+            'contracts',
+            'created_by',
+            'created_at',
+            'started_at',
+            'heartbeat_at',
+            'finished_at'
+        ]
+        read_only_fields = fields
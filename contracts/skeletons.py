@@ -0,0 +1,158 @@
+"""
+Squelettes compilés des contrats CDD Word
+
+Le texte d'un CDD ne dépend que de sa variante (entité, type de contrat,
+genre) et d'une douzaine de valeurs propres au salarié et au contrat
+(contracts.utils.contract_fields). Le squelette d'une variante est construit
+une seule fois par contracts.utils.build_contract_document avec des marqueurs
+{{champ}} à la place de ces valeurs, puis compilé : parties du .docx gardées
+telles quelles et word/document.xml découpé en segments fixes / marqueurs.
+Générer un contrat revient alors à joindre les segments avec les valeurs
+échappées et à réécrire l'archive, sans python-docx.
+
+Les squelettes compilés sont gardés par processus (LRU, CONTRACT_TEMPLATE_CACHE_SIZE)
+et, si CONTRACT_TEMPLATE_CACHE_DIR est défini, enregistrés sur disque pour être
+partagés entre processus et redémarrages. Incrémenter SKELETON_VERSION à chaque
+modification du texte de build_contract_document.
+"""
+import io
+import os
+import re
+import threading
+import zipfile
+from collections import OrderedDict
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+
+
+SKELETON_VERSION = 1
+
+# Champs remplis par contrat (clés de contracts.utils.contract_fields)
+CONTRACT_FIELDS = [
+    'first_name', 'last_name', 'address', 'postal_code', 'city', 'birth_date',
+    'birth_place', 'ssn', 'start_date', 'end_date', 'trial_period_days', 'signature_date',
+]
+
+DOCUMENT_PART = 'word/document.xml'
+
+PLACEHOLDER = re.compile(r'\{\{(\w+)\}\}')
+
+# Retours à la ligne et tabulations dans un run (comme python-docx)
+BREAK = '</w:t><w:br/><w:t xml:space="preserve">'
+TAB = '</w:t><w:tab/><w:t xml:space="preserve">'
+
+
+def placeholder_fields():
+    """Valeurs de construction d'un squelette : un marqueur par champ"""
+    return {name: '{{%s}}' % name for name in CONTRACT_FIELDS}
+
+
+def _xml_text(value):
+    return escape(str(value)).replace('\n', BREAK).replace('\t', TAB)
+
+
+class CompiledContractTemplate:
+    """Squelette .docx d'une variante, prêt à être rempli"""
+
+    def __init__(self, content):
+        self.parts = []
+        document = None
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            for info in archive.infolist():
+                data = archive.read(info)
+                if info.filename == DOCUMENT_PART:
+                    document = data.decode('utf-8')
+                self.parts.append((info.filename, info.date_time, info.compress_type, data))
+        if document is None:
+            raise ValueError(f'{DOCUMENT_PART} absent du squelette')
+
+        # Un marqueur peut tomber en tête ou en fin de run : conserver les espaces
+        document = document.replace('<w:t>', '<w:t xml:space="preserve">')
+        # Segments pairs : texte fixe ; segments impairs : nom du champ
+        self.segments = PLACEHOLDER.split(document)
+        unknown = set(self.segments[1::2]) - set(CONTRACT_FIELDS)
+        if unknown:
+            raise ValueError(f"Marqueurs inconnus dans le squelette : {', '.join(sorted(unknown))}")
+
+    def render_document(self, fields):
+        values = {name: _xml_text(fields[name]) for name in CONTRACT_FIELDS}
+        segments = list(self.segments)
+        segments[1::2] = [values[name] for name in segments[1::2]]
+        return ''.join(segments).encode('utf-8')
+
+    def render(self, fields):
+        """Contenu .docx (bytes) rempli avec les valeurs d'un contrat"""
+        document = self.render_document(fields)
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            for filename, date_time, compress_type, data in self.parts:
+                # ZipInfo neuf à chaque écriture : writestr le modifie
+                info = zipfile.ZipInfo(filename, date_time)
+                info.compress_type = compress_type
+                archive.writestr(info, document if filename == DOCUMENT_PART else data)
+        return buffer.getvalue()
+
+
+def skeleton_path(entity, contract_type, gender):
+    directory = getattr(settings, 'CONTRACT_TEMPLATE_CACHE_DIR', '')
+    if not directory:
+        return None
+    return os.path.join(directory, f'cdd_v{SKELETON_VERSION}_{entity}_{contract_type}_{gender}.docx')
+
+
+def build_skeleton(entity, contract_type, gender):
+    """Squelette .docx d'une variante (python-docx), marqueurs à la place des valeurs"""
+    from .utils import build_contract_document
+
+    return build_contract_document(entity, contract_type, gender, placeholder_fields())
+
+
+def load_skeleton(entity, contract_type, gender):
+    """Squelette depuis le disque s'il y est, sinon construit (et enregistré si un dossier est configuré)"""
+    path = skeleton_path(entity, contract_type, gender)
+    if path and os.path.exists(path):
+        with open(path, 'rb') as skeleton_file:
+            return skeleton_file.read()
+
+    content = build_skeleton(entity, contract_type, gender)
+    if path:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Écriture atomique : d'autres processus peuvent lire le même fichier
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as skeleton_file:
+            skeleton_file.write(content)
+        os.replace(temporary, path)
+    return content
+
+
+_lock = threading.Lock()
+_templates = OrderedDict()
+
+
+def get_compiled_template(entity, contract_type, gender):
+    """Squelette compilé d'une variante, construit à la demande et gardé en LRU"""
+    key = (entity, contract_type, gender)
+    with _lock:
+        template = _templates.get(key)
+        if template is not None:
+            _templates.move_to_end(key)
+            return template
+
+    template = CompiledContractTemplate(load_skeleton(entity, contract_type, gender))
+    with _lock:
+        _templates[key] = template
+        while len(_templates) > getattr(settings, 'CONTRACT_TEMPLATE_CACHE_SIZE', 8):
+            _templates.popitem(last=False)
+    return template
+
+
+def clear_template_cache():
+    """Oublier les squelettes compilés du processus (les fichiers sur disque sont conservés)"""
+    with _lock:
+        _templates.clear()
+
+
+def render_contract(entity, contract_type, gender, fields):
+    """Contenu .docx d'un contrat à partir du squelette de sa variante"""
+    return get_compiled_template(entity, contract_type, gender).render(fields)
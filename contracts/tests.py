@@ -1,9 +1,24 @@
-from django.test import TestCase
+import importlib.util
+import io
+import pickle
+import re
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from unittest import mock, skipUnless
+
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.utils import timezone
 from django.core.exceptions import ValidationError
-from employees.models import Profession, Employee
-from .models import Contract
+from employees.models import Profession, Employee, MedicalVisit
+from tests.factories import ContractFactory, EmployeeFactory, UserFactory
+from . import batch as contract_batch, skeletons
+from .models import Contract, ContractBatch
 
 User = get_user_model()
 
@@ -78,3 +93,255 @@ class ContractTestCase(TestCase):
                 end_date=timezone.now().date() - timezone.timedelta(days=1),
                 hourly_rate=12.50
             )
+
+
+def _docx(document_xml):
+    """Archive .docx minimale (sans python-docx)"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', '<Types/>')
+        archive.writestr(skeletons.DOCUMENT_PART, document_xml)
+    return buffer.getvalue()
+
+
+def _document_text(content):
+    """Texte des runs de word/document.xml"""
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        xml = archive.read(skeletons.DOCUMENT_PART).decode('utf-8')
+    return ''.join(re.findall(r'<w:t(?: [^>]*)?>([^<]*)</w:t>', xml))
+
+
+SKELETON_XML = (
+    '<w:document><w:p><w:r><w:t>Monsieur {{first_name}} {{last_name}} </w:t></w:r></w:p>'
+    '<w:p><w:r><w:t xml:space="preserve">{{address}},</w:t></w:r></w:p>'
+    + ''.join('<w:p><w:r><w:t>{{%s}}</w:t></w:r></w:p>' % name for name in skeletons.CONTRACT_FIELDS[3:])
+    + '</w:document>'
+)
+
+
+class ContractSkeletonTestCase(TestCase):
+    """Tests pour les squelettes compilés de CDD"""
+
+    def setUp(self):
+        skeletons.clear_template_cache()
+        self.fields = {name: name for name in skeletons.CONTRACT_FIELDS}
+        self.fields.update(first_name='Zoé', last_name='Durand & Fils', address='1 <rue>\nBât. B')
+
+    def tearDown(self):
+        skeletons.clear_template_cache()
+
+    def test_render_fills_and_escapes(self):
+        """Les marqueurs sont remplacés par les valeurs échappées, le reste de l'archive est conservé"""
+        content = skeletons.CompiledContractTemplate(_docx(SKELETON_XML)).render(self.fields)
+
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertEqual(archive.read('[Content_Types].xml'), b'<Types/>')
+            xml = archive.read(skeletons.DOCUMENT_PART).decode('utf-8')
+        self.assertIn('Monsieur Zoé Durand &amp; Fils ', xml)
+        self.assertIn('1 &lt;rue&gt;</w:t><w:br/><w:t xml:space="preserve">Bât. B,', xml)
+        self.assertNotIn('{{', xml)
+
+    def test_unknown_placeholder(self):
+        """Un marqueur inconnu est refusé à la compilation"""
+        with self.assertRaises(ValueError):
+            skeletons.CompiledContractTemplate(_docx('<w:t>{{salary}}</w:t>'))
+
+    @override_settings(CONTRACT_TEMPLATE_CACHE_SIZE=2, CONTRACT_TEMPLATE_CACHE_DIR='')
+    def test_lru_eviction(self):
+        """Un squelette est construit une fois par variante, le moins récent est évincé"""
+        with mock.patch.object(skeletons, 'build_skeleton', return_value=_docx(SKELETON_XML)) as build:
+            for variant in [('nantes_urgences', 'cdd', 'M'), ('nantes_urgences', 'cdd', 'F'),
+                            ('nantes_urgences', 'cdd', 'M'), ('ambulances_sansoucy', 'cdd', 'M'),
+                            ('nantes_urgences', 'cdd', 'M'), ('nantes_urgences', 'cdd', 'F')]:
+                skeletons.render_contract(*variant, self.fields)
+        # M, F, (M en cache), A (évince F), (M en cache), F (reconstruit)
+        self.assertEqual(build.call_count, 4)
+
+    def test_disk_cache(self):
+        """Le squelette enregistré sur disque est réutilisé après un redémarrage"""
+        with tempfile.TemporaryDirectory() as directory, override_settings(CONTRACT_TEMPLATE_CACHE_DIR=directory):
+            with mock.patch.object(skeletons, 'build_skeleton', return_value=_docx(SKELETON_XML)) as build:
+                first = skeletons.render_contract('nantes_urgences', 'cdd', 'F', self.fields)
+                skeletons.clear_template_cache()
+                second = skeletons.render_contract('nantes_urgences', 'cdd', 'F', self.fields)
+
+        self.assertEqual(build.call_count, 1)
+        self.assertEqual(first, second)
+
+    @skipUnless(importlib.util.find_spec('docx'), 'python-docx non installé')
+    def test_matches_builder(self):
+        """Le contrat rempli depuis le squelette a le même texte que le contrat construit"""
+        from .utils import generate_contract_document
+
+        for entity, gender in [('nantes_urgences', 'M'), ('ambulances_sansoucy', 'F')]:
+            contract = ContractFactory(
+                contract_type='cdd', entity_template=entity,
+                start_date=date(2026, 1, 5), end_date=date(2026, 6, 30),
+                employee__gender=gender, employee__address='3 rue <Haute> & Basse',
+            )
+            built = generate_contract_document(contract, use_cache=False)
+            cached = generate_contract_document(contract)
+
+            self.assertEqual(cached[0], built[0])
+            self.assertEqual(_document_text(cached[1]), _document_text(built[1]))
+            contract.delete()
+
+
+def _fake_render_job(contract):
+    """Données de rendu de test (sans python-docx)"""
+    fields = {'last_name': contract.employee.user.last_name}
+    return f'CDD_{contract.contract_number}.docx', ('nantes_urgences', contract.contract_type, 'M', fields)
+
+
+def _fake_contract_document(entity, contract_type, gender, fields):
+    """Rendu de test (picklable, pour le pool de processus) : échoue pour le salarié « Erreur »"""
+    if fields['last_name'] == 'Erreur':
+        raise ValueError('Modèle indisponible')
+    return b'PK contrat'
+
+
+@override_settings(CONTRACT_BATCH_ASYNC=False)
+class ContractBatchTestCase(TestCase):
+    """Tests pour les lots de contrats"""
+
+    def setUp(self):
+        self.rh = UserFactory(role='rh')
+        self.client.force_login(self.rh)
+        for name, fake in [('render_job', _fake_render_job), ('_render_contract', _fake_contract_document)]:
+            patcher = mock.patch.object(contract_batch, name, fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+    def _parameters(self, employees, **extra):
+        parameters = {
+            'employees': [employee.id for employee in employees],
+            'contract_type': 'cdd',
+            'entity_template': 'nantes_urgences',
+            'start_date': '2026-07-01',
+            'end_date': '2026-08-31',
+            'hourly_rate': '12.50',
+        }
+        parameters.update(extra)
+        return parameters
+
+    def test_batch_api(self):
+        """Le lot crée les contrats, génère les documents et relève les erreurs par salarié"""
+        employees = [EmployeeFactory() for _ in range(2)]
+        failing = EmployeeFactory(user__last_name='Erreur')
+        busy = ContractFactory().employee
+
+        response = self.client.post(
+            '/api/contracts/batches/',
+            self._parameters(employees + [failing, busy, employees[0]], number_prefix='CDD-ETE26'),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 202)
+
+        batch = ContractBatch.objects.get(pk=response.json()['id'])
+        self.assertEqual((batch.status, batch.total, batch.processed), ('completed', 4, 4))
+        self.assertEqual((batch.succeeded, batch.failed), (2, 2))
+        self.assertEqual(sorted(error['employee'] for error in batch.errors), sorted([failing.id, busy.id]))
+
+        contracts = Contract.objects.filter(batch=batch)
+        self.assertEqual(contracts.count(), 3)
+        for employee in employees:
+            contract = contracts.get(employee=employee)
+            self.assertEqual(contract.contract_number, f'CDD-ETE26-{employee.employee_id}')
+            self.assertTrue(contract.contract_file.name.endswith('.docx'))
+        self.assertFalse(contracts.get(employee=failing).contract_file)
+        self.assertEqual(MedicalVisit.objects.filter(employee__in=employees + [failing], visit_type='embauche').count(), 3)
+
+        progress = self.client.get(f'/api/contracts/batches/{batch.id}/').json()
+        self.assertEqual(progress['progress'], 100)
+        self.assertEqual(len(progress['contracts']), 3)
+
+    def test_renewal(self):
+        """Un renouvellement reprend les conditions du contrat actif et l'expire"""
+        previous = ContractFactory(
+            contract_type='cdd', entity_template='ambulances_sansoucy',
+            start_date=date(2026, 1, 1), end_date=date(2026, 6, 30), hourly_rate='13.00'
+        )
+        batch = ContractBatch.objects.create(
+            parameters={'employees': [previous.employee_id], 'renewal': True, 'end_date': '2026-12-31'},
+            total=1, created_by=self.rh
+        )
+        contract_batch.run_contract_batch(batch, workers=1)
+
+        previous.refresh_from_db()
+        renewed = Contract.objects.get(batch=batch)
+        self.assertEqual(previous.status, 'expired')
+        self.assertEqual((renewed.start_date, renewed.end_date), (date(2026, 7, 1), date(2026, 12, 31)))
+        self.assertEqual((renewed.entity_template, renewed.hourly_rate), ('ambulances_sansoucy', previous.hourly_rate))
+        self.assertEqual(renewed.contract_status, 'confirmed')
+
+    def test_creation_queries_independent_of_size(self):
+        """La création des contrats se fait en un nombre fixe de requêtes"""
+        def creation_queries(count):
+            employees = [EmployeeFactory() for _ in range(count)]
+            batch = ContractBatch.objects.create(
+                parameters=self._parameters(employees, number_prefix=f'LOT{count}'), total=count, created_by=self.rh
+            )
+            with CaptureQueriesContext(connection) as queries:
+                contract_batch.create_batch_contracts(batch)
+            return len(queries)
+
+        self.assertEqual(creation_queries(2), creation_queries(6))
+
+    def test_process_pool(self):
+        """Les documents rendus dans un pool de processus sont enregistrés comme en rendu séquentiel"""
+        employees = [EmployeeFactory() for _ in range(3)] + [EmployeeFactory(user__last_name='Erreur')]
+        batch = ContractBatch.objects.create(parameters=self._parameters(employees), total=4, created_by=self.rh)
+        submitted = []
+
+        class RecordingExecutor(ProcessPoolExecutor):
+            def submit(self, fn, *args, **kwargs):
+                submitted.append(args)
+                return super().submit(fn, *args, **kwargs)
+
+        with mock.patch.object(contract_batch, 'ProcessPoolExecutor', RecordingExecutor):
+            contract_batch.run_contract_batch(batch, workers=2)
+
+        self.assertEqual((batch.status, batch.succeeded, batch.failed), ('completed', 3, 1))
+        self.assertEqual(batch.errors[0]['error'], 'Modèle indisponible')
+        self.assertEqual(Contract.objects.filter(batch=batch).exclude(contract_file='').count(), 3)
+        # Données simples seulement : rendu possible hors fork (spawn, forkserver)
+        self.assertEqual(len(submitted), 4)
+        self.assertNotIn(b'django', pickle.dumps(submitted))
+
+    def test_interrupted_batch_is_resumed(self):
+        """Un lot « en cours » sans signe de vie est repris : seuls les documents manquants sont générés"""
+        employees = [EmployeeFactory() for _ in range(3)]
+        batch = ContractBatch.objects.create(parameters=self._parameters(employees), total=3, created_by=self.rh)
+        contracts, _ = contract_batch.create_batch_contracts(batch)
+        contract_batch.render_batch_documents(batch, contracts[:1], workers=1)
+        stale = timezone.now() - timedelta(hours=1)
+        ContractBatch.objects.filter(pk=batch.pk).update(status='running', started_at=stale, heartbeat_at=stale)
+        first_file = Contract.objects.get(pk=contracts[0].pk).contract_file.name
+
+        with mock.patch.object(contract_batch, '_render_contract', wraps=_fake_contract_document) as render:
+            call_command('run_contract_batches', workers=1, stdout=io.StringIO())
+
+        self.assertEqual(render.call_count, 2)
+        batch.refresh_from_db()
+        self.assertEqual((batch.status, batch.processed, batch.succeeded, batch.failed), ('completed', 3, 3, 0))
+        self.assertEqual(batch.started_at, stale)
+        self.assertEqual(Contract.objects.filter(batch=batch).count(), 3)
+        self.assertEqual(Contract.objects.filter(batch=batch).exclude(contract_file='').count(), 3)
+        self.assertEqual(Contract.objects.get(pk=contracts[0].pk).contract_file.name, first_file)
+
+    def test_running_batch_with_recent_heartbeat_is_not_claimed(self):
+        """Un lot « en cours » encore actif n'est pas repris par un autre processus"""
+        batch = ContractBatch.objects.create(
+            parameters=self._parameters([EmployeeFactory()]), total=1, created_by=self.rh,
+            status='running', started_at=timezone.now(), heartbeat_at=timezone.now()
+        )
+        self.assertFalse(contract_batch.claimable_batches().filter(pk=batch.pk).exists())
+        self.assertFalse(contract_batch.claim_batch(batch))
+
+        with override_settings(CONTRACT_BATCH_STALE_AFTER=0):
+            self.assertTrue(contract_batch.claim_batch(batch))
@@ -1,8 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .viewsets import ContractViewSet
+from .viewsets import ContractBatchViewSet, ContractViewSet
 
 router = DefaultRouter()
+# Avant les contrats : 'batches' serait sinon lu comme un identifiant de contrat
+router.register(r'batches', ContractBatchViewSet, basename='contract-batch')
 router.register(r'', ContractViewSet, basename='contract')
 
 app_name = 'contracts'
@@ -2,6 +2,7 @@
 Utilitaires pour la génération de contrats de travail
 """
 import os
+import re
 from datetime import datetime
 from decimal import Decimal
 from django.conf import settings
@@ -690,16 +691,13 @@ def create_specific_template(entity_name, contract_type, gender):
 
 
 
-def generate_contract_document(contract):
-    
-    from docx import Document
-    from docx.shared import Pt, Inches
-    from docx.enum.text import WD_ALIGN_PARAGRAPH
-    from contracts.cdd_templates_generator import get_gender_agreements, set_cell_background
-    import re
-    from datetime import datetime
-    from io import BytesIO
+def contract_variant(contract):
+    """
+    Variante de modèle d'un CDD : (entité, type de contrat, genre)
     
+    Raises:
+        ValueError: si le contrat n'est pas un CDD (pas de date de fin)
+    """
     # Vérifier que c'est bien un contrat CDD
     if not contract.end_date:
         raise ValueError("Cette fonction ne génère que des contrats CDD (avec une date de fin)")
@@ -707,11 +705,72 @@ def generate_contract_document(contract):
     employee = contract.employee
     gender = employee.gender if hasattr(employee, 'gender') and employee.gender else 'M'
     entity = contract.entity_template if contract.entity_template else 'nantes_urgences'
-    contract_type = contract.contract_type
+    return entity, contract.contract_type, gender
+
+
+def format_date_long(date):
+    mois = ['janvier', 'février', 'mars', 'avril', 'mai', 'juin',
+            'juillet', 'août', 'septembre', 'octobre', 'novembre', 'décembre']
+    return f"{date.day:02d} {mois[date.month - 1]} {date.year}"
+
+
+def format_date_short(date):
+    return date.strftime("%d/%m/%Y")
+
+
+def format_ssn(ssn):
+    ssn_clean = re.sub(r'\s+', '', str(ssn))
+    if len(ssn_clean) == 15:
+        return f"{ssn_clean[0]} {ssn_clean[1:3]} {ssn_clean[3:5]} {ssn_clean[5:7]} {ssn_clean[7:10]} {ssn_clean[10:13]} {ssn_clean[13:15]}"
+    return ssn
+
+
+def contract_fields(contract):
+    """
+    Valeurs propres au salarié et au contrat, mises en forme pour le document
+    (tout le reste du texte ne dépend que de la variante, voir contract_variant)
+    """
+    employee = contract.employee
+    return {
+        'first_name': employee.user.first_name,
+        'last_name': employee.user.last_name,
+        'address': employee.address,
+        'postal_code': employee.postal_code,
+        'city': employee.city,
+        'birth_date': format_date_short(employee.birth_date),
+        'birth_place': employee.birth_place,
+        'ssn': format_ssn(employee.social_security_number),
+        'start_date': format_date_long(contract.start_date),
+        'end_date': format_date_long(contract.end_date),
+        # Période d'essai (en jours)
+        'trial_period_days': contract.trial_period_days if hasattr(contract, 'trial_period_days') else 12,
+        'signature_date': format_date_short(contract.start_date),
+    }
+
+
+def build_contract_document(entity, contract_type, gender, fields):
+    """
+    Construit le document Word d'un CDD paragraphe par paragraphe
+    
+    Args:
+        entity, contract_type, gender: variante (voir contract_variant)
+        fields: valeurs du salarié et du contrat (voir contract_fields)
+        
+    Returns:
+        bytes: contenu du fichier .docx
+    """
+    from docx import Document
+    from docx.shared import Pt, Inches
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from contracts.cdd_templates_generator import get_gender_agreements, set_cell_background
+    from io import BytesIO
     
     # Obtenir les accords grammaticaux selon le genre
     agreements = get_gender_agreements(gender)
     
+    first_name = fields['first_name']
+    last_name = fields['last_name']
+    
     # Créer le document
     doc = Document()
     
@@ -782,7 +841,7 @@ def generate_contract_document(contract):
         monthly_salary = "1833.12"
         salary_base_date = "1er janvier 2025"
         city_signature = "St-Nazaire"
-        taxi_mention = f"Il est précisé qu'il pourra également être demandé à {agreements['civility']} {employee.user.first_name} {employee.user.last_name} de passer l'examen relatif à la conduite de taxi."
+        taxi_mention = f"Il est précisé qu'il pourra également être demandé à {agreements['civility']} {first_name} {last_name} de passer l'examen relatif à la conduite de taxi."
         planning_mention = "les plannings qui seront établis par les régulateurs"
         
         if gender == 'M':
@@ -790,31 +849,12 @@ def generate_contract_document(contract):
         else:
             absence_text = f"Elle s'oblige à prévenir sans délai la société {entity_full_name} de toute absence quelle qu'en soit la cause et, en cas de maladie, lui faire parvenir un arrêt de travail dans les 48 heures de l'arrêt. Sinon cela correspondra à une absence injustifiée, qui, répétée, peut engendrer une sanction disciplinaire. "
     
-    # Formatter les dates
-    def format_date_long(date):
-        
-        mois = ['janvier', 'février', 'mars', 'avril', 'mai', 'juin',
-                'juillet', 'août', 'septembre', 'octobre', 'novembre', 'décembre']
-        return f"{date.day:02d} {mois[date.month - 1]} {date.year}"
-    
-    def format_date_short(date):
-        
-        return date.strftime("%d/%m/%Y")
-    
-    start_date_long = format_date_long(contract.start_date)
-    end_date_long = format_date_long(contract.end_date)
-    birth_date_short = format_date_short(employee.birth_date)
-    signature_date = format_date_short(contract.start_date)
-    
-    # Formater le numéro de sécurité sociale
-    def format_ssn(ssn):
-        
-        ssn_clean = re.sub(r'\s+', '', str(ssn))
-        if len(ssn_clean) == 15:
-            return f"{ssn_clean[0]} {ssn_clean[1:3]} {ssn_clean[3:5]} {ssn_clean[5:7]} {ssn_clean[7:10]} {ssn_clean[10:13]} {ssn_clean[13:15]}"
-        return ssn
-    
-    ssn_formatted = format_ssn(employee.social_security_number)
+    start_date_long = fields['start_date']
+    end_date_long = fields['end_date']
+    birth_date_short = fields['birth_date']
+    signature_date = fields['signature_date']
+    ssn_formatted = fields['ssn']
+    trial_period_days = fields['trial_period_days']
     
     # Déterminer le motif CDD
     if contract_type == 'accroissement_temporaire':
@@ -822,9 +862,6 @@ def generate_contract_document(contract):
     else:
         contract_reason = "pour le remplacement d'un salarié absent"
     
-    # Calculer la période d'essai (en jours)
-    trial_period_days = contract.trial_period_days if hasattr(contract, 'trial_period_days') else 12
-    
     # ==================== CONSTRUCTION DU DOCUMENT ====================
     
     # EN-TÊTE DU CONTRAT
@@ -868,20 +905,20 @@ def generate_contract_document(contract):
     
     # Informations de l'employé
     p = doc.add_paragraph()
-    run = p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name}")
+    run = p.add_run(f"{agreements['civility']} {first_name} {last_name}")
     run.bold = True
     p.alignment = WD_ALIGN_PARAGRAPH.CENTER
     
     p = doc.add_paragraph()
-    p.add_run(f"{employee.address},").bold = True
+    p.add_run(f"{fields['address']},").bold = True
     p.alignment = WD_ALIGN_PARAGRAPH.CENTER
     
     p = doc.add_paragraph()
-    p.add_run(f"{employee.postal_code} {employee.city}").bold = True
+    p.add_run(f"{fields['postal_code']} {fields['city']}").bold = True
     p.alignment = WD_ALIGN_PARAGRAPH.CENTER
     
     p = doc.add_paragraph()
-    p.add_run(f"Né{agreements['ne']} le : {birth_date_short} à {employee.birth_place}").bold = True
+    p.add_run(f"Né{agreements['ne']} le : {birth_date_short} à {fields['birth_place']}").bold = True
     p.alignment = WD_ALIGN_PARAGRAPH.CENTER
     
     p = doc.add_paragraph()
@@ -899,7 +936,7 @@ def generate_contract_document(contract):
     
     # Paragraphe d'embauche initial
     p = doc.add_paragraph()
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name} ").bold = True
     p.add_run(f"est {agreements['engage']} en qualité d'ambulancier. ")
     p.alignment = WD_ALIGN_PARAGRAPH.LEFT
     doc.add_paragraph()
@@ -907,9 +944,9 @@ def generate_contract_document(contract):
     # DPAE
     p = doc.add_paragraph()
     p.add_run("La déclaration préalable à l'embauche de ")
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name} ").bold = True
     p.add_run("a été effectuée à l'URSSAF de Nantes et ")
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name} ").bold = True
     p.add_run("pourra exercer auprès de cet organisme son droit d'accès et de rectification que lui confère la loi 78.17 du 6 janvier 1978.")
     p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
     doc.add_paragraph()
@@ -923,16 +960,16 @@ def generate_contract_document(contract):
     
     # Paragraphe d'engagement
     p = doc.add_paragraph()
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name} ").bold = True
     p.add_run(f"est {agreements['engage']} à durée déterminée à partir du {start_date_long} jusqu'au {end_date_long}, avec une période d'essai de {trial_period_days} jours. ")
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name} ").bold = True
     p.add_run(f"est {agreements['engage']} à durée déterminée, {contract_reason}. ")
     p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
     doc.add_paragraph()
     
     # Fonctions à effectuer
     p = doc.add_paragraph()
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name} ").bold = True
     p.add_run("effectuera notamment au sein de notre entreprise les fonctions définies à l'annexe 1 du présent contrat (dont copie ci-jointe).")
     p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
     doc.add_paragraph()
@@ -945,7 +982,7 @@ def generate_contract_document(contract):
     doc.add_paragraph()
     
     p = doc.add_paragraph()
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name} ").bold = True
     p.add_run(f"est {agreements['engage']} par la société {entity_full_name} en qualité d'ambulancier, de la convention collective des transports routiers (IDCC 16), applicable à l'activité.")
     p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
     doc.add_paragraph()
@@ -953,7 +990,7 @@ def generate_contract_document(contract):
     # Missions
     p = doc.add_paragraph()
     p.add_run("En cette qualité ")
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name} ").bold = True
     p.add_run("aura pour mission :")
     p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
     
@@ -972,7 +1009,7 @@ def generate_contract_document(contract):
     
     # Autorité hiérarchique
     p = doc.add_paragraph()
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name} ").bold = True
     p.add_run(authority_text)
     p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
     doc.add_paragraph()
@@ -996,14 +1033,14 @@ def generate_contract_document(contract):
     doc.add_paragraph()
     
     p = doc.add_paragraph()
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name} ").bold = True
     p.add_run(f"exercera ses fonctions {location_work}.")
     p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
     doc.add_paragraph()
     
     p = doc.add_paragraph()
     p.add_run("Toutefois, ")
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name} ").bold = True
     if gender == 'M':
         p.add_run(f"{agreements['accepte']} par avance qu'en fonction des nécessités de l'entreprise, il soit amené à changer de lieu de travail, et ce, dans les zones géographiques où la société exerce ou exercera son activité. ")
     else:
@@ -1038,7 +1075,7 @@ def generate_contract_document(contract):
     doc.add_paragraph()
     
     p = doc.add_paragraph()
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name} ").bold = True
     p.add_run(f"sera {agreements['affilie']} :")
     p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
     doc.add_paragraph()
@@ -1062,47 +1099,47 @@ def generate_contract_document(contract):
     doc.add_paragraph()
     
     p = doc.add_paragraph()
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name} ").bold = True
     p.add_run(f"s'engage à se conformer strictement aux instructions de la direction concernant les conditions d'exécution du travail, et à respecter {planning_mention}.")
     p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
     doc.add_paragraph()
     
     # Suite des paragraphes 2.4 concernant le permis
     p = doc.add_paragraph()
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name} ").bold = True
     p.add_run("declare ne faire l'objet d'aucune restriction administrative ou judiciaire quant à l'utilisation de son permis de conduire, toutes catégories confondues.")
     p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
     doc.add_paragraph()
     
     p = doc.add_paragraph()
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name} ").bold = True
     p.add_run("s'engage également à produire chaque année, à la date anniversaire de son contrat de travail, son permis de conduire, de même qu'à toute époque de l'année, sur simple demande de la direction.")
     p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
     doc.add_paragraph()
     
     p = doc.add_paragraph()
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name} ").bold = True
     p.add_run("s'engage à avertir immédiatement son employeur de toute suspension de permis ou de tout événement susceptible de remettre en cause sa faculté de conduire les véhicules de l'entreprise.")
     p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
     doc.add_paragraph()
     
     p = doc.add_paragraph()
     p.add_run("Il est également rappelé à ")
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name} ").bold = True
     p.add_run("que toute suspension ou invalidation de son permis de conduire sera susceptible d'entraîner la rupture de son contrat de travail.")
     p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
     doc.add_paragraph()
     
     p = doc.add_paragraph()
     p.add_run("Il est enfin rappelé à ")
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name} ").bold = True
     p.add_run(f"que les véhicules appartenant à la société {entity_full_name} ne peuvent, sauf accord écrit de la direction, être utilisés à des fins personnelles ou servir à transporter des personnes étrangères à la société (hormis les clients).")
     p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
     doc.add_paragraph()
     
     p = doc.add_paragraph()
     p.add_run("Il est également rappelé à ")
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name} ").bold = True
     if gender == 'M':
         p.add_run("qu'il est tenu de nettoyer et de laisser propre les locaux mis à sa disposition.")
     else:
@@ -1127,7 +1164,7 @@ def generate_contract_document(contract):
     doc.add_paragraph()
     
     p = doc.add_paragraph()
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name} ").bold = True
     p.add_run("déclare que toutes les coordonnées figurant à l'entête des présentes sont exactes, et s'oblige à prévenir l'employeur de toutes modifications les affectant.")
     p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
     doc.add_paragraph()
@@ -1148,7 +1185,7 @@ def generate_contract_document(contract):
     doc.add_paragraph()
     
     p = doc.add_paragraph()
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name} ").bold = True
     p.add_run("reconnaît avoir pris connaissance du règlement intérieur en vigueur dans l'établissement. Tout manquement au présent règlement pourra donner lieu à des poursuites disciplinaires et à un éventuel licenciement pour faute. ")
     p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
     doc.add_paragraph()
@@ -1162,7 +1199,7 @@ def generate_contract_document(contract):
     
     p = doc.add_paragraph()
     p.add_run("Compte tenu des fonctions confiées à ")
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name}, ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name}, ").bold = True
     p.add_run("celui-ci est tenu par un secret professionnel tant en ce qui concerne l'identité des clients transportés que leur destination.")
     p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
     doc.add_paragraph()
@@ -1177,7 +1214,7 @@ def generate_contract_document(contract):
     
     p = doc.add_paragraph()
     p.add_run("Le salaire de ")
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name}, ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name}, ").bold = True
     p.add_run("SMPG (Salaire Minimum Professionnel Garanti), se décompose comme suit :")
     p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
     doc.add_paragraph()
@@ -1219,7 +1256,7 @@ def generate_contract_document(contract):
     # Indemnités
     p = doc.add_paragraph()
     p.add_run("En sus du SMPG, il pourra être versé à ")
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name} ").bold = True
     p.add_run("les indemnités suivantes, dans les termes de l'accord du 04 mai 2000 :")
     p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
     
@@ -1282,7 +1319,7 @@ def generate_contract_document(contract):
     # Indemnité d'ancienneté
     p = doc.add_paragraph()
     p.add_run("Enfin, il sera versé à ")
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name} ").bold = True
     p.add_run(":")
     p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
     
@@ -1310,7 +1347,7 @@ def generate_contract_document(contract):
     
     p = doc.add_paragraph()
     p.add_run("Il pourra être demandé à ")
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name} ").bold = True
     p.add_run("d'effectuer des permanences dans les lieux désignés par l'entreprise.")
     p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
     
@@ -1332,20 +1369,20 @@ def generate_contract_document(contract):
     doc.add_paragraph()
     
     p = doc.add_paragraph()
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name} ").bold = True
     p.add_run(f"devra tenir des feuilles de route sur lesquelles {agreements['il_elle']} fera figurer les éléments nécessaires à l'établissement de {agreements['son_sa']} temps de travail. Ces feuilles de route lui seront fournies, en support, par l'entreprise. Elles devront être remplies de façon quotidienne et seront visées par l'entreprise.")
     p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
     
     p = doc.add_paragraph()
     p.add_run("Ces feuilles de route seront à dispositions du salarié, afin de permettre à ")
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name} ").bold = True
     p.add_run("d'effectuer tout contrôle qui lui paraîtra utile sur l'établissement du salaire.")
     p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
     doc.add_paragraph()
     
     p = doc.add_paragraph()
     p.add_run("Il pourra être demandé à ")
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name} ").bold = True
     p.add_run("d'effectuer des heures supplémentaires. Elles seront décomptées et rémunérées dans les termes de l'accord du 04 mai 2000, et en toute hypothèse, dans les termes des dispositions légales et réglementaires régissant notre profession. ")
     p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
     doc.add_paragraph()
@@ -1373,7 +1410,7 @@ def generate_contract_document(contract):
     
     p = doc.add_paragraph()
     p.add_run("Lorsque, à l'issue d'un contrat de travail à durée déterminée, les relations contractuelles de travail ne se poursuivent pas par un contrat à durée indéterminée, ")
-    p.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} ").bold = True
+    p.add_run(f"{agreements['civility']} {first_name} {last_name} ").bold = True
     p.add_run("a droit, à titre de complément de salaire, à une indemnité de fin de contrat destinée à compenser la précarité de sa situation.")
     p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
     
@@ -1425,7 +1462,7 @@ def generate_contract_document(contract):
     # Première ligne - titres
     cell_employee = sig_table.cell(0, 0)
     p_emp = cell_employee.paragraphs[0]
-    p_emp.add_run(f"{agreements['civility']} {employee.user.first_name} {employee.user.last_name} :").bold = True
+    p_emp.add_run(f"{agreements['civility']} {first_name} {last_name} :").bold = True
     cell_employee.add_paragraph('Mention "Bon pour accord, lu et approuvé" ')
     
     cell_company = sig_table.cell(0, 1)
@@ -1444,11 +1481,33 @@ def generate_contract_document(contract):
     # Sauvegarder dans un buffer BytesIO
     file_buffer = BytesIO()
     doc.save(file_buffer)
-    file_buffer.seek(0)
+    return file_buffer.getvalue()
+
+
+def generate_contract_document(contract, use_cache=True):
+    """
+    Génère le document Word d'un CDD avec les données du salarié
     
-    # Générer le nom du fichier
-    start_date_filename = format_date_short(contract.start_date).replace('/', '-')
-    filename = f"CDD_{employee.user.last_name}_{employee.user.first_name}_{entity}_{start_date_filename}.docx"
+    Par défaut, le squelette compilé de la variante (entité, type, genre) est
+    simplement rempli (contracts.skeletons) ; use_cache=False reconstruit tout
+    le document avec build_contract_document.
     
-    return filename, file_buffer.getvalue()
+    Returns:
+        tuple: (nom du fichier, contenu .docx en bytes)
+    """
+    entity, contract_type, gender = contract_variant(contract)
+    fields = contract_fields(contract)
+    if use_cache:
+        from .skeletons import render_contract
+        content = render_contract(entity, contract_type, gender, fields)
+    else:
+        content = build_contract_document(entity, contract_type, gender, fields)
+    
+    return contract_document_filename(contract, entity), content
 
+
+def contract_document_filename(contract, entity):
+    """Nom du fichier Word d'un CDD"""
+    employee = contract.employee
+    start_date_filename = format_date_short(contract.start_date).replace('/', '-')
+    return f"CDD_{employee.user.last_name}_{employee.user.first_name}_{entity}_{start_date_filename}.docx"
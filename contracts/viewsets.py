@@ -1,10 +1,12 @@
-from rest_framework import viewsets, status
+from rest_framework import mixins, viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from .models import Contract
-from .serializers import ContractSerializer
+from .batch import batch_parameters, start_contract_batch
+from .models import Contract, ContractBatch
+from .serializers import ContractBatchCreateSerializer, ContractBatchSerializer, ContractSerializer
 from accounts.permissions import IsRH, IsAdmin
+from sirh_core.query_plan import plan_queryset
 
 
 class ContractViewSet(viewsets.ModelViewSet):
@@ -24,14 +26,16 @@ class ContractViewSet(viewsets.ModelViewSet):
         """Les salariés ne voient que leurs contrats, les RH voient tous"""
         user = self.request.user
         if user.role in ['rh', 'admin']:
-            return Contract.objects.all()
-        # Les salariés ne peuvent voir que leurs contrats
-        try:
-            from employees.models import Employee
-            employee = Employee.objects.get(user=user)
-            return Contract.objects.filter(employee=employee)
-        except Employee.DoesNotExist:
-            return Contract.objects.none()
+            queryset = Contract.objects.all()
+        else:
+            # Les salariés ne peuvent voir que leurs contrats
+            try:
+                from employees.models import Employee
+                employee = Employee.objects.get(user=user)
+                queryset = Contract.objects.filter(employee=employee)
+            except Employee.DoesNotExist:
+                queryset = Contract.objects.none()
+        return plan_queryset(queryset, self.get_serializer_class())
 
     def perform_create(self, serializer):
         contract = serializer.save()
@@ -111,3 +115,32 @@ class ContractViewSet(viewsets.ModelViewSet):
             return Response({
                 'error': f"Erreur lors de la génération: {str(e)}"
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ContractBatchViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    Lots de contrats : POST lance la création et la génération des documents en
+    arrière-plan (202), GET /<id>/ donne l'avancement et les erreurs par salarié
+    """
+    
+    queryset = ContractBatch.objects.prefetch_related('contracts')
+    serializer_class = ContractBatchSerializer
+    permission_classes = [IsRH]
+    
+    def get_serializer_class(self):
+        if self.action == 'create':
+            return ContractBatchCreateSerializer
+        return ContractBatchSerializer
+    
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        parameters = batch_parameters(serializer.validated_data)
+        batch = ContractBatch.objects.create(
+            parameters=parameters,
+            total=len(parameters['employees']),
+            created_by=request.user
+        )
+        batch = start_contract_batch(batch)
+        return Response(ContractBatchSerializer(batch).data, status=status.HTTP_202_ACCEPTED)
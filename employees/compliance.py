@@ -0,0 +1,108 @@
+"""
+Conformité documentaire (GED) : pièces obligatoires manquantes par salarié
+
+La table DocumentCompliance contient une ligne par salarié actif avec la
+liste des types obligatoires (EmployeeDocument.REQUIRED_DOCUMENT_TYPES) absents
+de sa GED. Elle est tenue à jour de façon incrémentale :
+    - ajout, modification ou suppression d'un document : ligne du salarié recalculée ;
+    - enregistrement d'un salarié (changement de statut) : ligne créée,
+      recalculée ou supprimée s'il n'est plus actif.
+Les recalculs sont faits après validation de la transaction (signals.py) ;
+les modifications en masse qui ne passent pas par save()/delete()
+(QuerySet.update, import SQL) sont rattrapées par rebuild_document_compliance.
+Le dashboard et la liste GED lisent directement cette table.
+"""
+from collections import defaultdict
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Sum
+
+from .models import DocumentCompliance, Employee, EmployeeDocument
+
+
+REQUIRED_DOCUMENT_TYPES = EmployeeDocument.REQUIRED_DOCUMENT_TYPES
+
+
+def expected_compliance(employee_ids):
+    """
+    Types manquants attendus {salarié actif: [types]} pour les salariés donnés
+    (les salariés inactifs ou inexistants sont absents du résultat)
+    """
+    active = Employee.objects.filter(status='active')
+    if employee_ids is not None:
+        active = active.filter(id__in=employee_ids)
+    active_ids = list(active.values_list('id', flat=True))
+    if not active_ids:
+        return {}
+
+    present = defaultdict(set)
+    documents = EmployeeDocument.objects.filter(
+        employee_id__in=active_ids,
+        document_type__in=REQUIRED_DOCUMENT_TYPES
+    ).values_list('employee_id', 'document_type').distinct()
+    for employee_id, document_type in documents:
+        present[employee_id].add(document_type)
+    return {
+        employee_id: [t for t in REQUIRED_DOCUMENT_TYPES if t not in present[employee_id]]
+        for employee_id in active_ids
+    }
+
+
+def _save_compliance(expected):
+    DocumentCompliance.objects.bulk_create(
+        [
+            DocumentCompliance(employee_id=employee_id, missing_types=missing, missing_count=len(missing))
+            for employee_id, missing in expected.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['employee'],
+        update_fields=['missing_types', 'missing_count', 'updated_at'],
+    )
+
+
+def refresh_compliance(employee_ids):
+    """Recalculer la conformité des salariés donnés (lignes des salariés inactifs supprimées)"""
+    employee_ids = set(employee_ids)
+    if not employee_ids:
+        return
+    expected = expected_compliance(employee_ids)
+    with transaction.atomic():
+        inactive = employee_ids - set(expected)
+        if inactive:
+            DocumentCompliance.objects.filter(employee_id__in=inactive).delete()
+        if expected:
+            _save_compliance(expected)
+
+
+def schedule_refresh(employee_id):
+    """Recalculer la conformité d'un salarié une fois la transaction en cours validée"""
+    transaction.on_commit(partial(refresh_compliance, [employee_id]))
+
+
+def rebuild_compliance():
+    """
+    Réconcilier toute la table avec la GED : seules les lignes différentes
+    sont écrites. Retourne le nombre de lignes créées, corrigées et supprimées.
+    """
+    expected = expected_compliance(None)
+    current = dict(DocumentCompliance.objects.values_list('employee_id', 'missing_types'))
+    stale = [employee_id for employee_id in current if employee_id not in expected]
+    changed = {
+        employee_id: missing
+        for employee_id, missing in expected.items()
+        if current.get(employee_id) != missing
+    }
+    with transaction.atomic():
+        if stale:
+            DocumentCompliance.objects.filter(employee_id__in=stale).delete()
+        if changed:
+            _save_compliance(changed)
+
+    created = sum(1 for employee_id in changed if employee_id not in current)
+    return {'created': created, 'updated': len(changed) - created, 'deleted': len(stale)}
+
+
+def pending_documents_count():
+    """Nombre total de pièces obligatoires manquantes (salariés actifs)"""
+    return DocumentCompliance.objects.aggregate(total=Sum('missing_count'))['total'] or 0
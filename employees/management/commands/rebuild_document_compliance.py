@@ -0,0 +1,18 @@
+"""
+Management command pour réconcilier la table de conformité documentaire avec la GED
+(à lancer après un import ou une modification en masse des documents ou des salariés)
+"""
+from django.core.management.base import BaseCommand
+
+from employees.compliance import rebuild_compliance
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les pièces obligatoires manquantes de chaque salarié actif'
+
+    def handle(self, *args, **options):
+        result = rebuild_compliance()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Conformité documentaire : {result['created']} ligne(s) créée(s), "
+            f"{result['updated']} corrigée(s), {result['deleted']} supprimée(s)"
+        ))
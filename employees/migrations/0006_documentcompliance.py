@@ -0,0 +1,56 @@
+# Generated by Django 4.2.8 on 2026-10-17 10:00
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+REQUIRED_DOCUMENT_TYPES = [
+    'contract', 'id_card', 'diploma', 'attestation',
+    'cpam_attestation', 'rib', 'driving_license', 'dpae',
+]
+
+
+def populate_compliance(apps, schema_editor):
+    Employee = apps.get_model('employees', 'Employee')
+    EmployeeDocument = apps.get_model('employees', 'EmployeeDocument')
+    DocumentCompliance = apps.get_model('employees', 'DocumentCompliance')
+
+    present = defaultdict(set)
+    documents = EmployeeDocument.objects.filter(
+        employee__status='active',
+        document_type__in=REQUIRED_DOCUMENT_TYPES
+    ).values_list('employee_id', 'document_type')
+    for employee_id, document_type in documents:
+        present[employee_id].add(document_type)
+
+    compliance = []
+    for employee_id in Employee.objects.filter(status='active').values_list('id', flat=True):
+        missing = [t for t in REQUIRED_DOCUMENT_TYPES if t not in present[employee_id]]
+        compliance.append(DocumentCompliance(employee_id=employee_id, missing_types=missing, missing_count=len(missing)))
+    DocumentCompliance.objects.bulk_create(compliance, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0005_add_employee_gender'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentCompliance',
+            fields=[
+                ('employee', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='document_compliance', serialize=False, to='employees.employee', verbose_name='Employé')),
+                ('missing_types', models.JSONField(default=list, verbose_name='Types de documents manquants')),
+                ('missing_count', models.PositiveSmallIntegerField(db_index=True, default=0, verbose_name='Nombre de documents manquants')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Mis à jour le')),
+            ],
+            options={
+                'verbose_name': 'Conformité documentaire',
+                'verbose_name_plural': 'Conformités documentaires',
+            },
+        ),
+        migrations.RunPython(populate_compliance, migrations.RunPython.noop),
+    ]
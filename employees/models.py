@@ -2,6 +2,7 @@ from django.db import models
 from django.core.validators import RegexValidator
 from django.utils import timezone
 from accounts.models import CustomUser
+from sirh_core.tracking import TrackedModelMixin
 
 
 class Profession(models.Model):
@@ -50,8 +51,10 @@ class Profession(models.Model):
         return self.label
 
 
-class Employee(models.Model):
+class Employee(TrackedModelMixin, models.Model):
     """Modèle pour les salariés"""
+
+    AUDIT_MASKED_FIELDS = ('social_security_number', 'rib')
     
     STATUS_CHOICES = [
         ('active', 'Actif'),
@@ -259,6 +262,12 @@ class EmployeeDocument(models.Model):
         ('insurance', 'Assurance'),
         ('other', 'Autre'),
     ]
+
+    # Pièces obligatoires du dossier salarié (suivies par DocumentCompliance)
+    REQUIRED_DOCUMENT_TYPES = [
+        'contract', 'id_card', 'diploma', 'attestation',
+        'cpam_attestation', 'rib', 'driving_license', 'dpae',
+    ]
     
     employee = models.ForeignKey(
         Employee,
@@ -315,7 +324,44 @@ class EmployeeDocument(models.Model):
         return 0
 
 
-class MedicalVisit(models.Model):
+class DocumentCompliance(models.Model):
+    """
+    Pièces obligatoires manquantes d'un salarié actif (une ligne par salarié actif).
+    Tenue à jour par employees.compliance (signaux des documents et des salariés),
+    réconciliée par la commande rebuild_document_compliance.
+    """
+
+    employee = models.OneToOneField(
+        Employee,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='document_compliance',
+        verbose_name='Employé'
+    )
+    missing_types = models.JSONField(
+        default=list,
+        verbose_name='Types de documents manquants'
+    )
+    missing_count = models.PositiveSmallIntegerField(
+        default=0,
+        db_index=True,
+        verbose_name='Nombre de documents manquants'
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Mis à jour le')
+
+    class Meta:
+        verbose_name = 'Conformité documentaire'
+        verbose_name_plural = 'Conformités documentaires'
+
+    def __str__(self):
+        return f"{self.employee} - {self.missing_count} document(s) manquant(s)"
+
+    def get_missing_types_display(self):
+        labels = dict(EmployeeDocument.DOCUMENT_TYPE_CHOICES)
+        return [labels.get(document_type, document_type) for document_type in self.missing_types]
+
+
+class MedicalVisit(TrackedModelMixin, models.Model):
     """Visites médicales des salariés"""
     
     VISIT_TYPE_CHOICES = [
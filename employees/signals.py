@@ -0,0 +1,22 @@
+"""
+Signaux de l'application employees
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .compliance import schedule_refresh
+from .models import Employee, EmployeeDocument
+
+
+@receiver([post_save, post_delete], sender=EmployeeDocument)
+def document_changed(sender, instance, **kwargs):
+    """Recalculer la conformité documentaire du salarié quand un de ses documents change"""
+    schedule_refresh(instance.employee_id)
+
+
+@receiver(post_save, sender=Employee)
+def employee_saved(sender, instance, update_fields=None, **kwargs):
+    """Créer, recalculer ou supprimer la ligne de conformité selon le statut du salarié"""
+    if update_fields is not None and 'status' not in update_fields:
+        return
+    schedule_refresh(instance.pk)
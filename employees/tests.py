@@ -1,7 +1,12 @@
-from django.test import TestCase
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from .models import Profession, Employee
+from tests.factories import EmployeeFactory, UserFactory
+from .compliance import pending_documents_count, rebuild_compliance
+from .models import DocumentCompliance, Profession, Employee, EmployeeDocument
 
 User = get_user_model()
 
@@ -69,3 +74,158 @@ class EmployeeTestCase(TestCase):
     def test_is_active_employee(self):
         """Vérifie la propriété is_active_employee"""
         self.assertTrue(self.employee.is_active_employee())
+
+
+class DocumentServingTestCase(TestCase):
+    """Tests pour l'envoi des documents GED (sirh_core.files)"""
+
+    content = bytes(range(256)) * 4
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.employee = EmployeeFactory()
+        self.document = EmployeeDocument.objects.create(
+            employee=self.employee,
+            document_type='other',
+            title='Attestation',
+            file=SimpleUploadedFile('attestation.pdf', self.content)
+        )
+        self.url = f'/documents/{self.document.id}/preview/'
+        self.client.force_login(UserFactory(role='admin'))
+
+    def test_full_download_streamed(self):
+        """Le fichier complet est envoyé en flux avec ETag et Last-Modified"""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Content-Length'], str(len(self.content)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('inline', response['Content-Disposition'])
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_byte_ranges(self):
+        """Les plages d'octets sont servies en 206, ou 416 hors du fichier"""
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:20])
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.content)}')
+
+        suffix = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(suffix.streaming_content), self.content[-5:])
+
+        outside = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(outside.status_code, 416)
+        self.assertEqual(outside['Content-Range'], f'bytes */{len(self.content)}')
+
+        # Fichier modifié depuis (If-Range périmé) : fichier complet
+        stale = self.client.get(self.url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"0-0"')
+        self.assertEqual(stale.status_code, 200)
+
+    @override_settings(FILE_SERVING_MODE='x-accel-redirect', FILE_SERVING_ACCEL_PREFIX='/protected-media/')
+    def test_accel_redirect(self):
+        """En mode nginx, seul l'en-tête de délégation est renvoyé, après contrôle des droits"""
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.document.file.name}')
+        self.assertEqual(response.content, b'')
+
+        self.client.force_login(EmployeeFactory().user)
+        denied = self.client.get(self.url)
+        self.assertEqual(denied.status_code, 302)
+        self.assertFalse(denied.has_header('X-Accel-Redirect'))
+
+
+class DocumentComplianceTestCase(TestCase):
+    """Tests pour la table de conformité documentaire (employees.compliance)"""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.employee = EmployeeFactory()
+            self.other = EmployeeFactory()
+
+    def add_document(self, employee, document_type):
+        with self.captureOnCommitCallbacks(execute=True):
+            return EmployeeDocument.objects.create(
+                employee=employee,
+                document_type=document_type,
+                title=document_type,
+                file=SimpleUploadedFile(f'{document_type}.pdf', b'%PDF')
+            )
+
+    def test_documents_update_compliance(self):
+        """Ajout et suppression d'un document mettent à jour les pièces manquantes"""
+        required = len(EmployeeDocument.REQUIRED_DOCUMENT_TYPES)
+        self.assertEqual(self.employee.document_compliance.missing_count, required)
+
+        document = self.add_document(self.employee, 'rib')
+        self.add_document(self.employee, 'other')
+        compliance = DocumentCompliance.objects.get(employee=self.employee)
+        self.assertEqual(compliance.missing_count, required - 1)
+        self.assertNotIn('rib', compliance.missing_types)
+        self.assertEqual(pending_documents_count(), 2 * required - 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            document.delete()
+        self.assertIn('rib', DocumentCompliance.objects.get(employee=self.employee).missing_types)
+
+    def test_status_change(self):
+        """Un salarié qui n'est plus actif sort de la table, et y revient s'il est réactivé"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.employee.status = 'inactive'
+            self.employee.save()
+        self.assertFalse(DocumentCompliance.objects.filter(employee=self.employee).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.employee.status = 'active'
+            self.employee.save(update_fields=['status'])
+        self.assertTrue(DocumentCompliance.objects.filter(employee=self.employee).exists())
+
+    def test_employee_deletion(self):
+        """La suppression d'un salarié et de ses documents ne recrée pas de ligne"""
+        self.add_document(self.employee, 'rib')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.employee.delete()
+        self.assertEqual(DocumentCompliance.objects.count(), 1)
+
+    def test_rebuild_reconciles_bulk_changes(self):
+        """La reconstruction rattrape les modifications qui contournent les signaux"""
+        self.add_document(self.employee, 'rib')
+        EmployeeDocument.objects.filter(employee=self.employee).update(document_type='dpae')
+        Employee.objects.filter(pk=self.other.pk).update(status='inactive')
+
+        self.assertEqual(rebuild_compliance(), {'created': 0, 'updated': 1, 'deleted': 1})
+        compliance = DocumentCompliance.objects.get(employee=self.employee)
+        self.assertIn('rib', compliance.missing_types)
+        self.assertNotIn('dpae', compliance.missing_types)
+        self.assertEqual(rebuild_compliance(), {'created': 0, 'updated': 0, 'deleted': 0})
+
+    def test_documents_view_filters(self):
+        """La liste GED lit la table et filtre les dossiers incomplets ou complets"""
+        for document_type in EmployeeDocument.REQUIRED_DOCUMENT_TYPES:
+            self.add_document(self.other, document_type)
+        self.client.force_login(UserFactory(role='admin'))
+
+        with self.assertNumQueries(7):
+            response = self.client.get('/documents/?compliance=incomplete')
+        self.assertEqual([employee.pk for employee in response.context['employees']], [self.employee.pk])
+        self.assertEqual(response.context['stats']['incomplete_employees'], 1)
+
+        response = self.client.get('/documents/?compliance=complete')
+        self.assertEqual([employee.missing_documents for employee in response.context['employees']], [0])
+
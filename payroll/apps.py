@@ -5,3 +5,6 @@ class PayrollConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'payroll'
     verbose_name = 'Gestion de la paie'
+
+    def ready(self):
+        from . import signals  # noqa: F401
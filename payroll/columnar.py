@@ -0,0 +1,108 @@
+"""
+Calcul colonnaire des cotisations pour toute une période
+
+Les salaires bruts de la période forment une colonne, le barème compilé une
+ligne : la matrice des bases (assiette, plafond, tranche) est calculée en une
+seule passe puis sommée par cotisation.
+
+Avec NumPy, la matrice est calculée en entiers (brut en centimes, bases en
+micro-euros) : les totaux sont exactement ceux du calcul Decimal fiche par
+fiche, le taux étant appliqué une seule fois sur la somme des bases.
+Sans NumPy (ou si une valeur sort de la représentation entière), le calcul
+retombe sur une somme Decimal exacte, colonne par colonne.
+"""
+from decimal import Decimal
+
+try:
+    import numpy
+except ImportError:  # NumPy est optionnel
+    numpy = None
+
+
+# Échelles entières : brut en centimes, assiette en 1/10000, bases en micro-euros
+CENTS = 100
+RATIO_SCALE = 10000
+MICRO = CENTS * RATIO_SCALE
+
+INT64_MAX = 2 ** 63 - 1
+
+
+def contribution_totals(gross_salaries, contributions, use_numpy=None):
+    """
+    Totaux {nom: montant} de chaque cotisation pour une liste de salaires bruts.
+
+    `contributions` est une séquence de CompiledContribution (barème compilé).
+    `use_numpy` force (True/False) ou laisse choisir (None) le mode NumPy.
+    """
+    gross_salaries = list(gross_salaries)
+    if not gross_salaries or not contributions:
+        return {}
+
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    if use_numpy and numpy is not None:
+        base_sums = _numpy_base_sums(gross_salaries, contributions)
+        if base_sums is not None:
+            return _apply_factors(contributions, base_sums)
+    return _decimal_totals(gross_salaries, contributions)
+
+
+def _apply_factors(contributions, base_sums):
+    """Appliquer le taux de chaque cotisation à la somme de ses bases (micro-euros)"""
+    totals = {}
+    for contribution, base_sum in zip(contributions, base_sums):
+        amount = Decimal(base_sum).scaleb(-6) * contribution.factor
+        totals[contribution.name] = totals.get(contribution.name, Decimal('0.00')) + amount
+    return totals
+
+
+def _decimal_totals(gross_salaries, contributions):
+    """Repli exact : somme Decimal des montants, colonne par colonne"""
+    totals = {}
+    for contribution in contributions:
+        amount = sum((contribution.amount(gross) for gross in gross_salaries), Decimal('0.00'))
+        totals[contribution.name] = totals.get(contribution.name, Decimal('0.00')) + amount
+    return totals
+
+
+def _to_int(value, scale):
+    """Valeur Decimal mise à l'échelle entière, ou None si elle n'est pas exacte"""
+    scaled = value * scale
+    if scaled != scaled.to_integral_value():
+        return None
+    return int(scaled)
+
+
+def _numpy_base_sums(gross_salaries, contributions):
+    """
+    Somme des bases (micro-euros) par cotisation, matrice calculée en int64.
+    Retourne None si les valeurs ne tiennent pas exactement en entiers.
+    """
+    cents = [_to_int(gross, CENTS) for gross in gross_salaries]
+    if None in cents:
+        return None
+
+    ratios, tranches, ceilings, has_tranche = [], [], [], []
+    for contribution in contributions:
+        ratio = RATIO_SCALE if contribution.assiette_ratio is None else _to_int(contribution.assiette_ratio, RATIO_SCALE)
+        # Même sémantique que CompiledContribution.base : 0 ou None = pas de tranche/plafond
+        tranche = _to_int(contribution.tranche_min, MICRO) if contribution.tranche_min else 0
+        ceiling = _to_int(contribution.ceiling, MICRO) if contribution.ceiling else INT64_MAX
+        if ratio is None or tranche is None or ceiling is None:
+            return None
+        ratios.append(ratio)
+        tranches.append(tranche)
+        ceilings.append(ceiling)
+        has_tranche.append(bool(contribution.tranche_min))
+
+    # Garde anti-débordement : la somme d'une colonne doit tenir en int64
+    largest = max(abs(c) for c in cents) * max(ratios) + max(tranches)
+    if largest * len(cents) > INT64_MAX:
+        return None
+
+    gross_column = numpy.array(cents, dtype=numpy.int64)[:, None]
+    assiette = gross_column * numpy.array(ratios, dtype=numpy.int64)[None, :]
+    bases = numpy.minimum(assiette, numpy.array(ceilings, dtype=numpy.int64)[None, :])
+    bases = bases - numpy.array(tranches, dtype=numpy.int64)[None, :]
+    bases = numpy.where(numpy.array(has_tranche)[None, :], numpy.maximum(bases, 0), bases)
+    return [int(total) for total in bases.sum(axis=0, dtype=numpy.int64)]
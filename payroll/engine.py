@@ -0,0 +1,185 @@
+"""
+Moteur de calcul de paie par lot pour une période (année, mois)
+
+Toutes les données nécessaires (feuilles de temps avec leurs totaux d'heures
+stockés, contrats, fiches existantes) sont chargées en un nombre fixe de
+requêtes, les cotisations et variables viennent du barème compilé
+(payroll.rules), les fiches sont calculées en mémoire puis écrites avec
+bulk_create/bulk_update.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from contracts.models import active_contracts_by_employee
+from sirh_core.stats_cache import invalidate_stats
+from timesheets.models import HOUR_TYPE_TOTAL_FIELDS, TimeSheet
+from .models import Payroll, PayrollItem
+from .rules import get_rule_set
+
+
+# Feuilles de temps prises en compte pour la paie
+PAYABLE_TIMESHEET_STATUSES = ['submitted', 'approved', 'paid']
+
+PAYROLL_COMPUTED_FIELDS = [
+    'status', 'calculated_at',
+    'total_hours', 'normal_hours', 'night_hours', 'sunday_hours', 'holiday_hours', 'overtime_hours',
+    'gross_salary', 'normal_salary', 'night_salary', 'sunday_salary', 'holiday_salary', 'overtime_salary',
+    'social_security', 'taxes', 'total_deductions', 'net_salary', 'calculation_snapshot', 'updated_at',
+]
+
+
+def timesheet_hours(timesheet):
+    """Heures par type lues sur les totaux stockés de la feuille de temps (sans requête)"""
+    return {
+        hour_type: getattr(timesheet, field)
+        for hour_type, field in HOUR_TYPE_TOTAL_FIELDS.items()
+    }
+
+
+def compute_payroll(payroll, hours, hourly_rate, rule_set):
+    """
+    Calcule une fiche de paie en mémoire (heures, brut, cotisations, net).
+    Retourne les lignes de cotisations (nom, montant) à tracer.
+    """
+    payroll.normal_hours = hours.get('normal', Decimal('0.00'))
+    payroll.night_hours = hours.get('night', Decimal('0.00'))
+    payroll.sunday_hours = hours.get('sunday', Decimal('0.00'))
+    payroll.holiday_hours = hours.get('holiday', Decimal('0.00'))
+    payroll.overtime_hours = hours.get('overtime', Decimal('0.00'))
+    payroll.total_hours = (
+        payroll.normal_hours
+        + payroll.night_hours
+        + payroll.sunday_hours
+        + payroll.holiday_hours
+        + payroll.overtime_hours
+    )
+
+    rates = rule_set.rates
+    payroll.normal_salary = payroll.normal_hours * hourly_rate
+    payroll.night_salary = payroll.night_hours * hourly_rate * rates['night']
+    payroll.sunday_salary = payroll.sunday_hours * hourly_rate * rates['sunday']
+    payroll.holiday_salary = payroll.holiday_hours * hourly_rate * rates['holiday']
+    payroll.overtime_salary = payroll.overtime_hours * hourly_rate * rates['overtime']
+    payroll.gross_salary = (
+        payroll.normal_salary
+        + payroll.night_salary
+        + payroll.sunday_salary
+        + payroll.holiday_salary
+        + payroll.overtime_salary
+    )
+
+    return rule_set.apply(payroll)
+
+
+def run_payroll_period(year, month):
+    """
+    Calcule les fiches de paie de tous les employés actifs ayant une feuille
+    de temps soumise/approuvée/payée pour la période.
+    Le nombre de requêtes ne dépend pas de l'effectif.
+
+    Retourne un dict : {'processed', 'created', 'updated', 'errors', 'payrolls'}
+    """
+    period = f'{year}-{month:02d}'
+    now = timezone.now()
+
+    timesheets = list(
+        TimeSheet.objects.filter(
+            year=year,
+            month=month,
+            status__in=PAYABLE_TIMESHEET_STATUSES,
+            employee__status='active'
+        ).select_related('employee__user').order_by('employee_id')
+    )
+    employee_ids = [timesheet.employee_id for timesheet in timesheets]
+
+    contracts_by_employee = active_contracts_by_employee(employee_ids)
+    rule_set = get_rule_set()
+    existing_payrolls = {
+        payroll.employee_id: payroll
+        for payroll in Payroll.objects.filter(employee_id__in=employee_ids, period=period)
+    }
+
+    errors = []
+    to_create = []
+    to_update = []
+    lines_by_payroll = []
+
+    for timesheet in timesheets:
+        employee = timesheet.employee
+        contract = contracts_by_employee.get(employee.id)
+        if not contract or not contract.hourly_rate:
+            errors.append(f'{employee.user.get_full_name()}: pas de contrat actif ou taux horaire')
+            continue
+
+        payroll = existing_payrolls.get(employee.id)
+        if payroll is None:
+            payroll = Payroll(employee=employee, year=year, month=month, period=period)
+            to_create.append(payroll)
+        else:
+            to_update.append(payroll)
+
+        lines = compute_payroll(
+            payroll,
+            timesheet_hours(timesheet),
+            Decimal(str(contract.hourly_rate)),
+            rule_set,
+        )
+        payroll.status = 'calculated'
+        payroll.calculated_at = now
+        payroll.updated_at = now
+        lines_by_payroll.append((payroll, lines))
+
+    with transaction.atomic():
+        if to_create:
+            Payroll.objects.bulk_create(to_create)
+        if to_update:
+            Payroll.objects.bulk_update(to_update, PAYROLL_COMPUTED_FIELDS)
+        _write_contribution_items(lines_by_payroll, rule_set.salarial_names)
+    if to_create or to_update:
+        invalidate_stats('payroll')
+
+    return {
+        'processed': len(lines_by_payroll),
+        'created': len(to_create),
+        'updated': len(to_update),
+        'errors': errors,
+        'payrolls': [payroll for payroll, _ in lines_by_payroll],
+    }
+
+
+def _write_contribution_items(lines_by_payroll, contribution_names):
+    """Crée ou met à jour les lignes de cotisations de toutes les fiches en lot"""
+    if not lines_by_payroll or not contribution_names:
+        return
+
+    existing_items = {
+        (item.payroll_id, item.description): item
+        for item in PayrollItem.objects.filter(
+            payroll_id__in=[payroll.id for payroll, _ in lines_by_payroll],
+            item_type='deduction',
+            description__in=list(contribution_names)
+        )
+    }
+
+    items_to_create = []
+    items_to_update = []
+    for payroll, lines in lines_by_payroll:
+        for name, amount in lines:
+            item = existing_items.get((payroll.id, name))
+            if item is None:
+                items_to_create.append(PayrollItem(
+                    payroll=payroll,
+                    item_type='deduction',
+                    description=name,
+                    amount=amount
+                ))
+            else:
+                item.amount = amount
+                items_to_update.append(item)
+
+    if items_to_create:
+        PayrollItem.objects.bulk_create(items_to_create)
+    if items_to_update:
+        PayrollItem.objects.bulk_update(items_to_update, ['amount'])
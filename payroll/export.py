@@ -0,0 +1,177 @@
+"""
+Export des bulletins de paie en PDF, unitaire ou pour toute une période
+
+Pour une période, les fiches sont lues par paquets (iterator + prefetch des
+éléments de paie), converties en données simples puis rendues en PDF dans un
+pool de processus (payroll.pdf ne dépend pas de Django). Au plus
+`workers * PENDING_PER_WORKER` bulletins sont en cours à un instant donné :
+la mémoire reste bornée quel que soit le nombre de fiches. Chaque PDF est
+écrit dans l'archive ZIP dès qu'il est prêt, puis libéré ; l'archive est
+écrite dans un fichier ou diffusée en flux (StreamingHttpResponse).
+Le pool de processus est réservé à la commande export_payslips : la vue
+d'export diffuse avec un rendu séquentiel (workers=1).
+"""
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+from django.conf import settings
+
+from .models import Payroll
+from .pdf import render_payslip
+
+
+# Bulletins en attente par processus de rendu (borne la mémoire)
+PENDING_PER_WORKER = 4
+
+# Fiches lues par requête
+EXPORT_CHUNK_SIZE = 200
+
+HOUR_LINES = [
+    ('Heures normales', 'normal_hours', 'normal_salary'),
+    ('Heures de nuit', 'night_hours', 'night_salary'),
+    ('Heures dimanche', 'sunday_hours', 'sunday_salary'),
+    ('Heures fériés', 'holiday_hours', 'holiday_salary'),
+    ('Heures supplémentaires', 'overtime_hours', 'overtime_salary'),
+]
+
+
+def format_amount(value):
+    """Montant au format français : 1 234,56"""
+    value = Decimal(str(value or 0)).quantize(Decimal('0.01'))
+    return f'{value:,.2f}'.replace(',', ' ').replace('.', ',')
+
+
+def payslip_filename(payroll):
+    return f'bulletin_{payroll.period}_{payroll.employee.employee_id}.pdf'
+
+
+def payslip_data(payroll):
+    """
+    Données d'un bulletin (chaînes uniquement, sérialisables vers un processus de rendu).
+    Les cotisations viennent du calcul figé de la fiche (Payroll.calculation_snapshot).
+    """
+    employee = payroll.employee
+    snapshot = payroll.calculation_snapshot or {}
+    contribution_names = {line['name'] for line in snapshot.get('lines', [])}
+    items = [
+        [item.description, item.get_item_type_display(), format_amount(item.amount)]
+        for item in payroll.items.all()
+        if item.description not in contribution_names
+    ]
+    footer = ''
+    if snapshot:
+        footer = f"Calcul figé le {snapshot['computed_at'][:16].replace('T', ' ')} (barème {snapshot['rules_version']})"
+    return {
+        'period_label': f'{payroll.month:02d}/{payroll.year}',
+        'employee': [
+            ('Salarié', employee.user.get_full_name() or employee.user.username),
+            ('Matricule', employee.employee_id),
+            ('Emploi', str(employee.profession) if employee.profession_id else '—'),
+            ('Statut de la fiche', payroll.get_status_display()),
+        ],
+        'earnings': [
+            [label, format_amount(getattr(payroll, hours)), format_amount(getattr(payroll, salary))]
+            for label, hours, salary in HOUR_LINES
+            if getattr(payroll, hours)
+        ],
+        'total_hours': format_amount(payroll.total_hours),
+        'gross_salary': format_amount(payroll.gross_salary),
+        'contributions': [
+            [line['name'], format_amount(line['base']), format_amount(line['rate']), format_amount(line['amount'])]
+            for line in snapshot.get('lines', [])
+        ],
+        'total_contributions': format_amount(snapshot.get('total_contributions')),
+        'items': items,
+        'totals': [
+            ('Total déductions', f'{format_amount(payroll.total_deductions)} €'),
+            ('NET À PAYER', f'{format_amount(payroll.net_salary)} €'),
+        ],
+        'footer': footer,
+    }
+
+
+def render_payroll_pdf(payroll):
+    """PDF d'une fiche de paie (dans le processus courant)"""
+    return render_payslip(payslip_data(payroll))
+
+
+def period_payrolls(year, month):
+    return (
+        Payroll.objects.filter(year=year, month=month)
+        .select_related('employee__user', 'employee__profession')
+        .prefetch_related('items')
+        .order_by('employee__employee_id')
+    )
+
+
+def default_workers():
+    return getattr(settings, 'PAYSLIP_EXPORT_WORKERS', 0) or os.cpu_count() or 1
+
+
+def render_period(year, month, workers=None):
+    """
+    Itérateur de (nom de fichier, PDF) pour toutes les fiches de la période, dans l'ordre.
+    workers <= 1 : rendu dans le processus courant.
+    """
+    workers = default_workers() if workers is None else workers
+    jobs = (
+        (payslip_filename(payroll), payslip_data(payroll))
+        for payroll in period_payrolls(year, month).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    if workers <= 1:
+        for filename, data in jobs:
+            yield filename, render_payslip(data)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for filename, data in jobs:
+            pending.append((filename, executor.submit(render_payslip, data)))
+            if len(pending) >= workers * PENDING_PER_WORKER:
+                filename, future = pending.popleft()
+                yield filename, future.result()
+        while pending:
+            filename, future = pending.popleft()
+            yield filename, future.result()
+
+
+def write_period_zip(year, month, fileobj, workers=None):
+    """Écrire l'archive ZIP des bulletins de la période dans `fileobj`. Retourne le nombre de bulletins."""
+    count = 0
+    with zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for filename, pdf in render_period(year, month, workers):
+            archive.writestr(filename, pdf)
+            count += 1
+    return count
+
+
+class _ChunkBuffer:
+    """Flux en écriture seule dont le contenu est vidé après chaque bulletin"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_period_zip(year, month, workers=None):
+    """Archive ZIP des bulletins de la période produite par morceaux (pour StreamingHttpResponse)"""
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for filename, pdf in render_period(year, month, workers):
+            archive.writestr(filename, pdf)
+            yield buffer.drain()
+    yield buffer.drain()
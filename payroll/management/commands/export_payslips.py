@@ -0,0 +1,34 @@
+"""
+Management command pour exporter les bulletins de paie d'une période dans une archive ZIP
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from payroll.export import default_workers, write_period_zip
+
+
+class Command(BaseCommand):
+    help = "Génère les bulletins PDF d'une période en parallèle et les écrit dans une archive ZIP"
+
+    def add_arguments(self, parser):
+        today = timezone.now().date()
+        parser.add_argument('--year', type=int, default=today.year, help='Année (par défaut : année courante)')
+        parser.add_argument('--month', type=int, default=today.month, help='Mois 1-12 (par défaut : mois courant)')
+        parser.add_argument('--output', help='Fichier ZIP (par défaut : bulletins_YYYY-MM.zip)')
+        parser.add_argument('--workers', type=int, default=None, help='Processus de rendu (par défaut : PAYSLIP_EXPORT_WORKERS ou nombre de CPU)')
+
+    def handle(self, *args, **options):
+        year, month = options['year'], options['month']
+        output = options['output'] or f'bulletins_{year}-{month:02d}.zip'
+        workers = default_workers() if options['workers'] is None else options['workers']
+
+        started = time.perf_counter()
+        with open(output, 'wb') as fileobj:
+            count = write_period_zip(year, month, fileobj, workers)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {count} bulletin(s) écrit(s) dans {output} en {elapsed:.1f}s ({workers} processus)'
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-17 11:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0005_payroll_payroll_pay_year_4629aa_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payroll',
+            name='calculation_snapshot',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='Calcul figé'),
+        ),
+    ]
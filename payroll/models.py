@@ -262,6 +262,14 @@ class Payroll(models.Model):
         verbose_name='Notes'
     )
     
+    # Détail du calcul figé au moment du calcul (lignes, bases, taux, version des taux)
+    calculation_snapshot = models.JSONField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Calcul figé'
+    )
+    
     class Meta:
         verbose_name = 'Fiche de paie'
         verbose_name_plural = 'Fiches de paie'
@@ -345,72 +353,28 @@ class Payroll(models.Model):
         - Tranches correctes (T1, T2)
         - Calcul explicite et traçable
         """
-        self.social_security = Decimal('0.00')
-        self.taxes = Decimal('0.00')
-        
-        # Récupère les cotisations actives salariales UNIQUEMENT
-        active_contributions = PayrollContribution.objects.filter(
-            is_active=True,
-            is_patronal=False
-        )
+        contribution_lines = self.apply_payroll_rules()
         
-        for contribution in active_contributions:
-            rate = contribution.rate / Decimal('100')  # Convertir % en décimal
-            
-            # 1️⃣ DÉTERMINER L'ASSIETTE selon le type
-            if contribution.assiette_type == 'ABATTUE_9825':
-                # CSG/CRDS : assiette = 98.25% du brut
-                assiette_base = self.gross_salary * Decimal('0.9825')
-            else:
-                # BRUT ou PLAFONNEE : assiette = brut
-                assiette_base = self.gross_salary
-            
-            # 2️⃣ APPLIQUER LES PLAFONDS ET TRANCHES
-            if contribution.tranche_min:
-                # Cotisation par TRANCHE (ex: T2 = entre 4005€ et 32040€)
-                if contribution.ceiling:
-                    # Tranche entre min et max
-                    tranche_haute = min(assiette_base, contribution.ceiling)
-                    tranche_basse = contribution.tranche_min
-                    applicable_base = max(Decimal('0'), tranche_haute - tranche_basse)
-                else:
-                    # Tranche au-dessus du min sans limite
-                    applicable_base = max(Decimal('0'), assiette_base - contribution.tranche_min)
-            elif contribution.ceiling:
-                # Cotisation PLAFONNÉE (ex: vieillesse, retraite T1)
-                applicable_base = min(assiette_base, contribution.ceiling)
-            else:
-                # Cotisation DÉPLAFONNÉE (ex: CSG, vieillesse déplafonnée)
-                applicable_base = assiette_base
-            
-            # 3️⃣ CALCULER LE MONTANT
-            amount = applicable_base * rate
-            
-            # 4️⃣ AJOUTER AUX DÉDUCTIONS
-            self.social_security += amount
-            
-            # 5️⃣ CRÉER LIGNE DÉTAILLÉE (pour traçabilité)
+        # CRÉER LES LIGNES DÉTAILLÉES (pour traçabilité)
+        for name, amount in contribution_lines:
             PayrollItem.objects.update_or_create(
                 payroll=self,
                 item_type='deduction',
-                description=contribution.name,
+                description=name,
                 defaults={'amount': amount}
             )
         
-        # Calculer les éventuelles variables de paie (primes, indemnités)
-        active_variables = PayrollVariable.objects.filter(is_active=True)
-        bonus_total = Decimal('0.00')
-        
-        for variable in active_variables:
-            # Ne traiter que les variables en €, pas les %
-            if variable.unit == '€' and variable.name in ['Indemnité de transport', 'Prime de production']:
-                bonus_total += variable.value
-        
-        # Appliquer les déductions et bonus
-        self.total_deductions = self.social_security + self.taxes + self.other_deductions - bonus_total
-        self.net_salary = self.gross_salary - self.total_deductions
-        
         return self.net_salary
+    
+    def apply_payroll_rules(self, rule_set=None):
+        """
+        Applique le barème compilé (cotisations salariales et primes) au brut, sans requête.
+        Retourne la liste des lignes (nom de la cotisation, montant) à tracer.
+        """
+        from .rules import get_rule_set
+        
+        rule_set = rule_set or get_rule_set()
+        return rule_set.apply(self)
 
 
 class PayrollItem(models.Model):
@@ -549,4 +513,14 @@ class PayrollContribution(models.Model):
         ordering = ["name"]
 
     def __str__(self):
-        return f"{self.name} ({self.rate}%){'[PATRONALE]' if self.is_patronal else '[SALARIALE]'}"
\ No newline at end of file
+        return f"{self.name} ({self.rate}%){'[PATRONALE]' if self.is_patronal else '[SALARIALE]'}"
+    
+    def applicable_base(self, gross_salary):
+        """Base de calcul après assiette, plafond et tranche pour un salaire brut"""
+        from .rules import compile_contribution
+        return compile_contribution(self).base(gross_salary)
+    
+    def compute_amount(self, gross_salary):
+        """Montant de la cotisation pour un salaire brut"""
+        from .rules import compile_contribution
+        return compile_contribution(self).amount(gross_salary)
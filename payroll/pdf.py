@@ -0,0 +1,172 @@
+"""
+Rendu PDF des bulletins de paie, sans dépendance externe
+
+Petit générateur PDF 1.4 : polices standard Helvetica (encodage WinAnsi, qui
+couvre les accents français), texte et filets, pagination automatique.
+Le module n'importe pas Django : render_payslip ne reçoit que des données
+simples (dict de chaînes, voir payroll.export.payslip_data) et peut donc
+tourner dans un processus de travail d'un pool.
+"""
+import zlib
+
+
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+MARGIN = 50
+LINE_HEIGHT = 14
+
+FONTS = {'regular': 'Helvetica', 'bold': 'Helvetica-Bold'}
+
+
+def _escape(text):
+    """Texte PDF littéral encodé en WinAnsi (cp1252)"""
+    encoded = str(text).encode('cp1252', errors='replace')
+    return encoded.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def _text_width(text, size):
+    """Largeur approchée d'un texte Helvetica (alignement à droite des montants)"""
+    return len(str(text)) * size * 0.5
+
+
+class PdfCanvas:
+    """Pages de texte et de filets, sérialisées en un document PDF"""
+
+    def __init__(self):
+        self.pages = []
+        self.new_page()
+
+    def new_page(self):
+        self.commands = []
+        self.pages.append(self.commands)
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def text(self, x, y, value, size=10, bold=False, align='left'):
+        if align == 'right':
+            x -= _text_width(value, size)
+        font = b'/F2' if bold else b'/F1'
+        self.commands.append(
+            b'BT ' + font + b' %d Tf %.2f %.2f Td (' % (size, x, y) + _escape(value) + b') Tj ET'
+        )
+
+    def rule(self, x1, y1, x2, y2, width=0.5):
+        self.commands.append(b'%.2f w %.2f %.2f m %.2f %.2f l S' % (width, x1, y1, x2, y2))
+
+    def ensure_space(self, height):
+        """Changer de page s'il ne reste pas `height` points avant la marge basse"""
+        if self.y - height < MARGIN:
+            self.new_page()
+
+    def render(self):
+        """Document PDF complet (bytes)"""
+        objects = []
+
+        def add(body):
+            objects.append(body)
+            return len(objects)
+
+        catalog = add(None)
+        pages_id = add(None)
+        fonts = [
+            add(b'<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>' % name.encode())
+            for name in FONTS.values()
+        ]
+        resources = b'<< /Font << /F1 %d 0 R /F2 %d 0 R >> >>' % tuple(fonts)
+
+        page_ids = []
+        for commands in self.pages:
+            stream = zlib.compress(b'\n'.join(commands))
+            content = add(
+                b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(stream) + stream + b'\nendstream'
+            )
+            page_ids.append(add(
+                b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Resources %s /Contents %d 0 R >>'
+                % (pages_id, PAGE_WIDTH, PAGE_HEIGHT, resources, content)
+            ))
+        objects[catalog - 1] = b'<< /Type /Catalog /Pages %d 0 R >>' % pages_id
+        objects[pages_id - 1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+            b' '.join(b'%d 0 R' % page_id for page_id in page_ids), len(page_ids)
+        )
+
+        output = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(len(output))
+            output += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+        xref = len(output)
+        output += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+        for offset in offsets:
+            output += b'%010d 00000 n \n' % offset
+        output += b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+            len(objects) + 1, catalog, xref
+        )
+        return bytes(output)
+
+
+def _table(canvas, title, columns, rows, total=None):
+    """
+    Tableau : titre, en-têtes et lignes. `columns` : [(libellé, x, alignement)].
+    `total` : ligne finale en gras (mêmes colonnes) ou None.
+    """
+    canvas.ensure_space(4 * LINE_HEIGHT)
+    canvas.text(MARGIN, canvas.y, title, size=11, bold=True)
+    canvas.y -= LINE_HEIGHT + 2
+    for label, x, align in columns:
+        canvas.text(x, canvas.y, label, size=9, bold=True, align=align)
+    canvas.rule(MARGIN, canvas.y - 4, PAGE_WIDTH - MARGIN, canvas.y - 4)
+    canvas.y -= LINE_HEIGHT + 2
+
+    for row in rows + ([total] if total else []):
+        canvas.ensure_space(LINE_HEIGHT)
+        bold = row is total
+        if bold:
+            canvas.rule(MARGIN, canvas.y + LINE_HEIGHT - 4, PAGE_WIDTH - MARGIN, canvas.y + LINE_HEIGHT - 4)
+        for value, (_, x, align) in zip(row, columns):
+            canvas.text(x, canvas.y, value, size=9, bold=bold, align=align)
+        canvas.y -= LINE_HEIGHT
+    canvas.y -= LINE_HEIGHT
+
+
+def render_payslip(data):
+    """Bulletin de paie PDF (bytes) à partir des données préparées par payroll.export.payslip_data"""
+    canvas = PdfCanvas()
+    right = PAGE_WIDTH - MARGIN
+
+    canvas.text(MARGIN, canvas.y, 'BULLETIN DE PAIE', size=16, bold=True)
+    canvas.text(right, canvas.y, f"Période : {data['period_label']}", size=11, bold=True, align='right')
+    canvas.y -= 2 * LINE_HEIGHT
+    for label, value in data['employee']:
+        canvas.text(MARGIN, canvas.y, label, size=10, bold=True)
+        canvas.text(MARGIN + 130, canvas.y, value, size=10)
+        canvas.y -= LINE_HEIGHT
+    canvas.y -= LINE_HEIGHT
+
+    _table(
+        canvas, 'Rémunération',
+        [('Élément', MARGIN, 'left'), ('Heures', 380, 'right'), ('Montant (€)', right, 'right')],
+        data['earnings'],
+        total=['Salaire brut', data['total_hours'], data['gross_salary']],
+    )
+    _table(
+        canvas, 'Cotisations salariales',
+        [('Cotisation', MARGIN, 'left'), ('Base (€)', 330, 'right'), ('Taux (%)', 410, 'right'),
+         ('Montant (€)', right, 'right')],
+        data['contributions'],
+        total=['Total cotisations', '', '', data['total_contributions']],
+    )
+    if data['items']:
+        _table(
+            canvas, 'Autres éléments',
+            [('Libellé', MARGIN, 'left'), ('Type', 380, 'left'), ('Montant (€)', right, 'right')],
+            data['items'],
+        )
+
+    canvas.ensure_space(4 * LINE_HEIGHT)
+    for label, value in data['totals']:
+        canvas.text(MARGIN, canvas.y, label, size=11, bold=True)
+        canvas.text(right, canvas.y, value, size=11, bold=True, align='right')
+        canvas.y -= LINE_HEIGHT + 2
+    canvas.y -= LINE_HEIGHT
+    if data['footer']:
+        canvas.text(MARGIN, canvas.y, data['footer'], size=8)
+    return canvas.render()
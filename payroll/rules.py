@@ -0,0 +1,224 @@
+"""
+Barème de cotisations compilé et mis en cache par version des taux
+
+Les cotisations et variables actives sont compilées une seule fois en un jeu
+de règles immuable. Le calcul d'une fiche de paie (ou d'un détail, d'un
+rapport) devient alors de l'arithmétique pure, sans requête.
+
+Le cache est propre au processus, indexé sur la version des taux
+(max(updated_at) et nombre de lignes) et invalidé par signal à chaque
+enregistrement/suppression d'une cotisation ou d'une variable.
+"""
+import threading
+from collections import namedtuple
+from decimal import Decimal
+from types import MappingProxyType
+
+from django.db.models import Count, Max
+from django.utils import timezone
+
+
+ABATTEMENT_9825 = Decimal('0.9825')
+
+# Majorations : type d'heures -> (fragment du nom de la variable, valeur par défaut)
+RATE_VARIABLES = {
+    'night': ('Taux nuit', Decimal('1.25')),
+    'sunday': ('Taux dimanche', Decimal('1.50')),
+    'holiday': ('Taux jours fériés', Decimal('2.00')),
+    'overtime': ('Taux heures supplémentaires', Decimal('1.50')),
+}
+
+# Variables en € ajoutées au net (primes, indemnités)
+BONUS_VARIABLES = ['Indemnité de transport', 'Prime de production']
+
+# Version du format de Payroll.calculation_snapshot
+SNAPSHOT_SCHEMA = 1
+
+
+class CompiledContribution(namedtuple('CompiledContribution', [
+    'name', 'rate', 'factor', 'assiette_ratio', 'tranche_min', 'ceiling',
+    'is_patronal', 'organisme', 'description',
+])):
+    """Cotisation compilée (immuable) : assiette, tranche et plafond pré-calculés"""
+    __slots__ = ()
+
+    def base(self, gross_salary):
+        """Base de calcul après assiette, plafond et tranche"""
+        # 1️⃣ ASSIETTE : brut ou abattu (CSG/CRDS à 98.25%)
+        assiette_base = gross_salary if self.assiette_ratio is None else gross_salary * self.assiette_ratio
+
+        # 2️⃣ PLAFONDS ET TRANCHES
+        if self.tranche_min:
+            # Cotisation par TRANCHE (ex: T2 = entre 4005€ et 32040€)
+            if self.ceiling:
+                return max(Decimal('0'), min(assiette_base, self.ceiling) - self.tranche_min)
+            return max(Decimal('0'), assiette_base - self.tranche_min)
+        if self.ceiling:
+            # Cotisation PLAFONNÉE (ex: vieillesse, retraite T1)
+            return min(assiette_base, self.ceiling)
+        # Cotisation DÉPLAFONNÉE
+        return assiette_base
+
+    def amount(self, gross_salary):
+        """Montant de la cotisation pour un salaire brut"""
+        return self.base(gross_salary) * self.factor
+
+
+def compile_contribution(contribution):
+    """Compiler une PayrollContribution en règle immuable"""
+    from .models import PayrollContribution
+
+    is_abattue = contribution.assiette_type == PayrollContribution.ASSIETTE_ABATTUE_9825
+    return CompiledContribution(
+        name=contribution.name,
+        rate=contribution.rate,
+        factor=contribution.rate / Decimal('100'),
+        assiette_ratio=ABATTEMENT_9825 if is_abattue else None,
+        tranche_min=contribution.tranche_min,
+        ceiling=contribution.ceiling,
+        is_patronal=contribution.is_patronal,
+        organisme=contribution.organisme,
+        description=contribution.description,
+    )
+
+
+def get_rate_from_variables(variables, variable_name, default_value):
+    """Récupère le taux depuis les variables de paie actives ou utilise la valeur par défaut"""
+    needle = variable_name.lower()
+    for variable in variables:
+        if needle in variable.name.lower():
+            # Si l'unité est en %, diviser par 100 pour obtenir le multiplicateur
+            if variable.unit == '%':
+                return variable.value / Decimal('100')
+            return variable.value
+    return default_value
+
+
+class PayrollRuleSet:
+    """Jeu de règles de paie compilé pour une version des taux"""
+
+    def __init__(self, version, contributions, variables):
+        self.version = version
+        compiled = [compile_contribution(contribution) for contribution in contributions]
+        self.salarial = tuple(c for c in compiled if not c.is_patronal)
+        self.patronal = tuple(c for c in compiled if c.is_patronal)
+        self.salarial_names = frozenset(c.name for c in self.salarial)
+        self.rates = MappingProxyType({
+            hour_type: get_rate_from_variables(variables, variable_name, default_value)
+            for hour_type, (variable_name, default_value) in RATE_VARIABLES.items()
+        })
+        self.bonus_total = sum(
+            (v.value for v in variables if v.unit == '€' and v.name in BONUS_VARIABLES),
+            Decimal('0.00')
+        )
+
+    def contributions(self, patronal=False):
+        return self.patronal if patronal else self.salarial
+
+    def evaluate(self, gross_salary, patronal=False):
+        """Lignes de cotisations (nom, taux, plafond, base, montant) pour un brut"""
+        lines = []
+        for contribution in self.contributions(patronal):
+            base = contribution.base(gross_salary)
+            lines.append({
+                'name': contribution.name,
+                'rate': contribution.rate,
+                'ceiling': contribution.ceiling,
+                'base': base,
+                'amount': base * contribution.factor,
+                'description': contribution.description,
+            })
+        return lines
+
+    @property
+    def version_label(self):
+        """Version des taux sous forme de texte (tracée dans les calculs figés)"""
+        return '|'.join(
+            value.isoformat() if hasattr(value, 'isoformat') else str(value)
+            for value in self.version
+        )
+
+    def snapshot(self, gross_salary, lines=None):
+        """
+        Calcul figé d'une fiche (JSON) : lignes de cotisations salariales avec
+        base, taux, plafond et montant, total et version des taux.
+        Les montants sont stockés en texte pour rester exacts.
+        """
+        lines = self.evaluate(gross_salary) if lines is None else lines
+        return {
+            'schema': SNAPSHOT_SCHEMA,
+            'rules_version': self.version_label,
+            'computed_at': timezone.now().isoformat(),
+            'gross_salary': str(Decimal(gross_salary).quantize(Decimal('0.01'))),
+            'lines': [
+                {
+                    key: value if key in ('name', 'description') or value is None else str(value)
+                    for key, value in line.items()
+                }
+                for line in lines
+            ],
+            'total_contributions': str(sum((line['amount'] for line in lines), Decimal('0'))),
+        }
+
+    def apply(self, payroll):
+        """
+        Applique les cotisations salariales et primes à une fiche de paie (sans requête)
+        et fige le détail du calcul dans payroll.calculation_snapshot.
+        Retourne les lignes (nom, montant) à tracer.
+        """
+        lines = self.evaluate(payroll.gross_salary)
+        payroll.social_security = Decimal('0.00')
+        payroll.taxes = Decimal('0.00')
+        contribution_lines = []
+        for line in lines:
+            payroll.social_security += line['amount']
+            contribution_lines.append((line['name'], line['amount']))
+
+        payroll.total_deductions = (
+            payroll.social_security + payroll.taxes + payroll.other_deductions - self.bonus_total
+        )
+        payroll.net_salary = payroll.gross_salary - payroll.total_deductions
+        payroll.calculation_snapshot = self.snapshot(payroll.gross_salary, lines)
+        return contribution_lines
+
+
+_lock = threading.Lock()
+_cached_rule_set = None
+
+
+def current_rules_version():
+    """Version des taux : dernière modification et nombre de cotisations/variables"""
+    from .models import PayrollContribution, PayrollVariable
+
+    contributions = PayrollContribution.objects.aggregate(last=Max('updated_at'), count=Count('id'))
+    variables = PayrollVariable.objects.aggregate(last=Max('updated_at'), count=Count('id'))
+    return (contributions['last'], contributions['count'], variables['last'], variables['count'])
+
+
+def get_rule_set():
+    """Jeu de règles compilé pour la version courante des taux (cache processus)"""
+    from .models import PayrollContribution, PayrollVariable
+
+    global _cached_rule_set
+    version = current_rules_version()
+    rule_set = _cached_rule_set
+    if rule_set is not None and rule_set.version == version:
+        return rule_set
+
+    with _lock:
+        rule_set = _cached_rule_set
+        if rule_set is None or rule_set.version != version:
+            rule_set = PayrollRuleSet(
+                version,
+                PayrollContribution.objects.filter(is_active=True),
+                list(PayrollVariable.objects.filter(is_active=True)),
+            )
+            _cached_rule_set = rule_set
+    return rule_set
+
+
+def invalidate_rule_set(**kwargs):
+    """Vider le cache (branché sur post_save/post_delete des cotisations et variables)"""
+    global _cached_rule_set
+    with _lock:
+        _cached_rule_set = None
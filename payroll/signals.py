@@ -0,0 +1,15 @@
+"""
+Signaux de l'application paie
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import PayrollContribution, PayrollVariable
+from .rules import invalidate_rule_set
+
+
+@receiver([post_save, post_delete], sender=PayrollContribution)
+@receiver([post_save, post_delete], sender=PayrollVariable)
+def payroll_rules_changed(sender, **kwargs):
+    """Invalider le barème compilé quand une cotisation ou une variable change"""
+    invalidate_rule_set()
@@ -1,3 +1,298 @@
+import io
+import zipfile
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.test import APIClient
+
+from tests.factories import ContractFactory, TimeSheetFactory, TimeSheetEntryFactory, UserFactory
+from . import columnar
+from .engine import run_payroll_period
+from .export import render_payroll_pdf, write_period_zip
+from .models import Payroll, PayrollItem, PayrollContribution, PayrollVariable
+from .rules import get_rule_set
+
+
+class PayrollEngineTestCase(TestCase):
+    """Tests pour le moteur de paie par lot"""
+
+    def setUp(self):
+        PayrollContribution.objects.create(name='Vieillesse plafonnée', rate=Decimal('6.90'), ceiling=Decimal('4005.00'))
+        PayrollContribution.objects.create(
+            name='CSG déductible',
+            rate=Decimal('6.80'),
+            assiette_type=PayrollContribution.ASSIETTE_ABATTUE_9825
+        )
+        PayrollContribution.objects.create(name='Maladie patronale', rate=Decimal('7.00'), is_patronal=True)
+        PayrollVariable.objects.create(name='Taux nuit (heures 22h-6h)', value=Decimal('125'), unit='%')
+
+    def _staff_period(self, count, month):
+        """Créer `count` salariés avec contrat et feuille de temps soumise"""
+        for _ in range(count):
+            contract = ContractFactory()
+            timesheet = TimeSheetFactory(employee=contract.employee, month=month)
+            TimeSheetEntryFactory(timesheet=timesheet, hours_worked=Decimal('100.00'))
+            TimeSheetEntryFactory(timesheet=timesheet, hour_type='night', hours_worked=Decimal('10.00'))
+
+    def test_payroll_values(self):
+        """Le lot calcule les mêmes montants que le calcul unitaire"""
+        self._staff_period(1, month=3)
+        result = run_payroll_period(2026, 3)
+
+        self.assertEqual(result['created'], 1)
+        payroll = Payroll.objects.get(period='2026-03')
+        self.assertEqual(payroll.status, 'calculated')
+        self.assertEqual(payroll.total_hours, Decimal('110.00'))
+        # 100h × 12 + 10h × 12 × 1.25
+        self.assertEqual(payroll.gross_salary, Decimal('1350.00'))
+
+        reference = Payroll(gross_salary=payroll.gross_salary)
+        reference.apply_payroll_rules()
+        self.assertEqual(payroll.net_salary, reference.net_salary.quantize(Decimal('0.01')))
+        self.assertEqual(
+            set(payroll.items.values_list('description', flat=True)),
+            {'Vieillesse plafonnée', 'CSG déductible'}
+        )
+
+    def test_rerun_updates_existing(self):
+        """Un second calcul met à jour les fiches et lignes existantes"""
+        self._staff_period(2, month=3)
+        run_payroll_period(2026, 3)
+        result = run_payroll_period(2026, 3)
+
+        self.assertEqual(result['created'], 0)
+        self.assertEqual(result['updated'], 2)
+        self.assertEqual(Payroll.objects.count(), 2)
+        self.assertEqual(PayrollItem.objects.count(), 4)
+
+    def test_missing_contract_reported(self):
+        """Les salariés sans contrat actif sont signalés"""
+        TimeSheetFactory(month=3)
+        result = run_payroll_period(2026, 3)
+        self.assertEqual(result['processed'], 0)
+        self.assertEqual(len(result['errors']), 1)
+
+    def test_query_count_is_constant(self):
+        """Le nombre de requêtes ne dépend pas de l'effectif"""
+        self._staff_period(1, month=3)
+        self._staff_period(5, month=4)
+        get_rule_set()
+
+        with CaptureQueriesContext(connection) as small_run:
+            run_payroll_period(2026, 3)
+        with CaptureQueriesContext(connection) as large_run:
+            run_payroll_period(2026, 4)
+
+        self.assertEqual(len(small_run), len(large_run))
+
+
+class PayrollRuleSetTestCase(TestCase):
+    """Tests pour le barème de cotisations compilé"""
+
+    def setUp(self):
+        PayrollContribution.objects.create(
+            name='Retraite T2',
+            rate=Decimal('8.64'),
+            tranche_min=Decimal('4005.00'),
+            ceiling=Decimal('32040.00')
+        )
+        PayrollContribution.objects.create(
+            name='CRDS',
+            rate=Decimal('0.50'),
+            assiette_type=PayrollContribution.ASSIETTE_ABATTUE_9825
+        )
+        PayrollVariable.objects.create(name='Indemnité de transport', value=Decimal('50'), unit='€')
+
+    def test_rule_set_is_cached(self):
+        """Le barème est compilé une seule fois par version des taux"""
+        self.assertIs(get_rule_set(), get_rule_set())
+
+    def test_rule_set_invalidated_on_save(self):
+        """Modifier une cotisation produit un nouveau barème"""
+        rule_set = get_rule_set()
+        contribution = PayrollContribution.objects.get(name='CRDS')
+        contribution.rate = Decimal('0.60')
+        contribution.save()
+
+        refreshed = get_rule_set()
+        self.assertIsNot(rule_set, refreshed)
+        crds = next(c for c in refreshed.salarial if c.name == 'CRDS')
+        self.assertEqual(crds.rate, Decimal('0.60'))
+
+    def test_tranche_and_assiette(self):
+        """Tranche T2 et assiette abattue sont appliquées"""
+        lines = {line['name']: line for line in get_rule_set().evaluate(Decimal('5000.00'))}
+        self.assertEqual(lines['Retraite T2']['base'], Decimal('995.00'))
+        self.assertEqual(lines['CRDS']['base'], Decimal('4912.5000'))
+
+    def test_apply_without_queries(self):
+        """Appliquer le barème à une fiche ne fait aucune requête"""
+        rule_set = get_rule_set()
+        payroll = Payroll(gross_salary=Decimal('5000.00'))
+        with self.assertNumQueries(0):
+            rule_set.apply(payroll)
+        self.assertEqual(payroll.total_deductions, payroll.social_security - Decimal('50'))
+
+
+class PayrollSnapshotTestCase(TestCase):
+    """Tests pour le calcul figé des fiches de paie"""
+
+    def setUp(self):
+        self.contribution = PayrollContribution.objects.create(
+            name='CSG déductible',
+            rate=Decimal('6.80'),
+            assiette_type=PayrollContribution.ASSIETTE_ABATTUE_9825
+        )
+        contract = ContractFactory()
+        timesheet = TimeSheetFactory(employee=contract.employee)
+        TimeSheetEntryFactory(timesheet=timesheet, hours_worked=Decimal('100.00'))
+        run_payroll_period(2026, 3)
+        self.payroll = Payroll.objects.get(period='2026-03')
+        self.admin = UserFactory(role='admin')
+
+    def test_snapshot_stored(self):
+        """Le calcul enregistre lignes, bases, taux et version des taux"""
+        snapshot = self.payroll.calculation_snapshot
+        self.assertEqual(snapshot['rules_version'], get_rule_set().version_label)
+        self.assertEqual(snapshot['gross_salary'], '1200.00')
+        line, = snapshot['lines']
+        self.assertEqual(line['name'], 'CSG déductible')
+        self.assertEqual(Decimal(line['rate']), Decimal('6.80'))
+        self.assertEqual(Decimal(line['base']), Decimal('1179.00'))
+        self.assertEqual(Decimal(snapshot['total_contributions']), Decimal('80.172'))
+
+    def test_views_served_from_snapshot(self):
+        """Détail, API et export lisent le calcul figé sans interroger le barème"""
+        self.contribution.rate = Decimal('9.00')
+        self.contribution.save()
+
+        self.client.force_login(self.admin)
+        api_client = APIClient()
+        api_client.force_authenticate(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            detail = self.client.get(f'/payroll/{self.payroll.id}/detail/')
+            calculation = self.client.get(f'/payroll/{self.payroll.id}/api/calculation/')
+            export = api_client.get(f'/api/payroll/payrolls/{self.payroll.id}/export/')
+
+        self.assertEqual(detail.status_code, 200)
+        self.assertEqual(Decimal(detail.context['contribution_details'][0]['rate']), Decimal('6.80'))
+        self.assertEqual(calculation.json()['contributions'][0]['rate'], 6.8)
+        self.assertEqual(export.data['total_contributions'], 80.172)
+        self.assertFalse([query for query in queries if 'payroll_payrollcontribution' in query['sql']])
+
+    def test_recompute_on_request(self):
+        """Seul un recalcul explicite met à jour le calcul figé"""
+        self.contribution.rate = Decimal('9.00')
+        self.contribution.save()
+        self.payroll.calculate_with_payroll_rules()
+        self.payroll.save()
+
+        self.payroll.refresh_from_db()
+        self.assertEqual(Decimal(self.payroll.calculation_snapshot['lines'][0]['rate']), Decimal('9.00'))
+
+
+class PayslipExportTestCase(TestCase):
+    """Tests pour l'export PDF des bulletins de paie"""
+
+    def setUp(self):
+        PayrollContribution.objects.create(name='Vieillesse plafonnée', rate=Decimal('6.90'), ceiling=Decimal('4005.00'))
+        for _ in range(3):
+            contract = ContractFactory()
+            timesheet = TimeSheetFactory(employee=contract.employee)
+            TimeSheetEntryFactory(timesheet=timesheet, hours_worked=Decimal('100.00'))
+        run_payroll_period(2026, 3)
+        self.admin = UserFactory(role='admin')
+
+    def test_payslip_pdf(self):
+        """Le bulletin est un PDF valide contenant le net à payer"""
+        payroll = Payroll.objects.select_related('employee__user').first()
+        pdf = render_payroll_pdf(payroll)
+
+        self.assertTrue(pdf.startswith(b'%PDF-1.4'))
+        self.assertTrue(pdf.rstrip().endswith(b'%%EOF'))
+
+        self.client.force_login(self.admin)
+        response = self.client.get(f'/payroll/{payroll.id}/export/')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response.content, pdf)
+
+    def test_period_zip_in_process_pool(self):
+        """Le rendu parallèle produit les mêmes bulletins que le rendu séquentiel"""
+        sequential = io.BytesIO()
+        parallel = io.BytesIO()
+        self.assertEqual(write_period_zip(2026, 3, sequential, workers=1), 3)
+        self.assertEqual(write_period_zip(2026, 3, parallel, workers=2), 3)
+
+        with zipfile.ZipFile(sequential) as first, zipfile.ZipFile(parallel) as second:
+            self.assertEqual(first.namelist(), second.namelist())
+            for name in first.namelist():
+                self.assertEqual(first.read(name), second.read(name))
+
+    def test_period_zip_streamed(self):
+        """L'archive de la période est diffusée en flux, sans pool de processus dans la requête"""
+        self.client.force_login(self.admin)
+        with mock.patch('payroll.export.ProcessPoolExecutor') as pool:
+            response = self.client.get('/payroll/export/', {'year': 2026, 'month': 3})
+            content = b''.join(response.streaming_content)
+
+        self.assertTrue(response.streaming)
+        pool.assert_not_called()
+        archive = zipfile.ZipFile(io.BytesIO(content))
+        self.assertEqual(len(archive.namelist()), 3)
+        self.assertTrue(all(name.startswith('bulletin_2026-03_') for name in archive.namelist()))
+
+
+class ColumnarContributionTestCase(TestCase):
+    """Tests pour le calcul colonnaire des cotisations (rapport financier)"""
+
+    def setUp(self):
+        PayrollContribution.objects.create(name='Vieillesse plafonnée', rate=Decimal('6.90'), ceiling=Decimal('4005.00'))
+        PayrollContribution.objects.create(
+            name='Retraite T2',
+            rate=Decimal('8.64'),
+            tranche_min=Decimal('4005.00'),
+            ceiling=Decimal('32040.00')
+        )
+        PayrollContribution.objects.create(
+            name='CSG déductible',
+            rate=Decimal('6.80'),
+            assiette_type=PayrollContribution.ASSIETTE_ABATTUE_9825
+        )
+        PayrollContribution.objects.create(name='Maladie patronale', rate=Decimal('7.0000'), is_patronal=True)
+        self.rule_set = get_rule_set()
+        self.gross_salaries = [
+            Decimal('1350.00') + Decimal(i) * Decimal('7.31') for i in range(2000)
+        ] + [Decimal('0.00'), Decimal('4005.00'), Decimal('40000.00')]
+
+    def _scalar_totals(self, patronal):
+        """Référence : somme fiche par fiche via evaluate()"""
+        totals = {}
+        for gross in self.gross_salaries:
+            for line in self.rule_set.evaluate(gross, patronal=patronal):
+                totals[line['name']] = totals.get(line['name'], Decimal('0.00')) + line['amount']
+        return totals
+
+    def test_decimal_fallback_matches_scalar(self):
+        """Le repli Decimal donne exactement les totaux fiche par fiche"""
+        for patronal in (False, True):
+            self.assertEqual(
+                columnar.contribution_totals(self.gross_salaries, self.rule_set.contributions(patronal), use_numpy=False),
+                self._scalar_totals(patronal)
+            )
+
+    @skipUnless(columnar.numpy is not None, 'NumPy non installé')
+    def test_numpy_matches_scalar(self):
+        """Le mode NumPy donne exactement les totaux fiche par fiche"""
+        for patronal in (False, True):
+            self.assertEqual(
+                columnar.contribution_totals(self.gross_salaries, self.rule_set.contributions(patronal), use_numpy=True),
+                self._scalar_totals(patronal)
+            )
 
-# À compléter
+    def test_empty_period(self):
+        """Aucune fiche : aucun total"""
+        self.assertEqual(columnar.contribution_totals([], self.rule_set.salarial), {})
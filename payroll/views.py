@@ -12,6 +12,7 @@ from .serializers import SalaryScaleSerializer, PayrollSerializer, PayrollItemSe
 from accounts.permissions import IsRH, IsAdmin
 from timesheets.models import TimeSheet
 from employees.models import Employee
+from sirh_core.query_plan import plan_queryset
 
 
 class SalaryScaleViewSet(viewsets.ModelViewSet):
@@ -31,6 +32,7 @@ class PayrollViewSet(viewsets.ModelViewSet):
     queryset = Payroll.objects.all()
     serializer_class = PayrollSerializer
     permission_classes = [IsAuthenticated, IsRH]
+    cursor_ordering = ('-year', '-month', '-id')
     
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -40,9 +42,10 @@ class PayrollViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """Filtrer les fiches de paie selon l'utilisateur"""
         user = self.request.user
+        queryset = Payroll.objects.all()
         if hasattr(user, 'employee') and user.role == 'employee':
-            return Payroll.objects.select_related('employee__user').filter(employee=user.employee)
-        return Payroll.objects.select_related('employee__user')
+            queryset = queryset.filter(employee=user.employee)
+        return plan_queryset(queryset, self.get_serializer_class())
     
     @action(detail=False, methods=['post'], permission_classes=[IsRH])
     def create_payroll(self, request):
@@ -223,6 +226,7 @@ class PayrollViewSet(viewsets.ModelViewSet):
     def export(self, request, pk=None):
         """Exporter une fiche de paie (format JSON pour future intégration CSV/PDF)"""
         payroll = self.get_object()
+        snapshot = payroll.calculation_snapshot or {}
         
         export_data = {
             'employee_name': f"{payroll.employee.user.first_name} {payroll.employee.user.last_name}",
@@ -250,6 +254,18 @@ class PayrollViewSet(viewsets.ModelViewSet):
                 'other': float(payroll.other_deductions),
                 'total': float(payroll.total_deductions),
             },
+            # Cotisations du calcul figé (aucun recalcul à l'export)
+            'contributions': [
+                {
+                    'name': line['name'],
+                    'rate': float(line['rate']),
+                    'base': float(line['base']),
+                    'amount': float(line['amount']),
+                }
+                for line in snapshot.get('lines', [])
+            ],
+            'total_contributions': float(snapshot.get('total_contributions', 0)),
+            'rules_version': snapshot.get('rules_version'),
             'net_salary': float(payroll.net_salary),
             'notes': payroll.notes,
         }
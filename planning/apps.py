@@ -5,3 +5,6 @@ class PlanningConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'planning'
     verbose_name = 'Gestion du planning et des shifts'
+
+    def ready(self):
+        from . import signals  # noqa: F401
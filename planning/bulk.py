@@ -0,0 +1,285 @@
+"""
+Import en masse du planning (CSV/JSON) et réplication d'une semaine type
+
+Toutes les lignes sont validées en mémoire avant écriture :
+    - références (type de quart, employé, véhicule) chargées en une requête chacune,
+    - quarts existants réutilisés selon unique_shift_per_date_time_type,
+    - unicité (quart, employé) et unique_vehicle_per_shift,
+    - chevauchements, repos quotidien et double réservation de véhicule
+      contre l'index du planning (planning.conflicts) et contre les lignes
+      déjà acceptées du même lot.
+Les quarts puis les assignations sont insérés avec bulk_create dans une seule
+transaction. Le résultat contient les erreurs ligne par ligne, et les
+avertissements (repos quotidien insuffisant, sauf PLANNING_ENFORCE_DAILY_REST)
+qui n'empêchent pas l'import de la ligne.
+"""
+import csv
+import io
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from django.db import transaction
+
+from employees.models import Employee
+from sirh_core.stats_cache import invalidate_stats
+from vehicles.models import Vehicle
+from .conflicts import (
+    MIN_DAILY_REST, ShiftInterval, SortedIntervals, enforce_daily_rest, get_planning_index,
+    invalidate_planning_index, shift_interval_bounds,
+)
+from .models import Assignment, Shift, ShiftType
+
+
+ASSIGNMENT_STATUSES = {value for value, _ in Assignment.STATUS_CHOICES}
+
+
+def rows_from_csv(content):
+    """Lignes d'un CSV (en-tête : date, start_time, end_time, shift_type, employee, vehicle, status, notes)"""
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    reader = csv.DictReader(io.StringIO(content), delimiter=';' if ';' in content.split('\n', 1)[0] else ',')
+    return [{key.strip(): (value or '').strip() for key, value in row.items() if key} for row in reader]
+
+
+def _parse_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+def _parse_time(value):
+    if hasattr(value, 'hour'):
+        return value
+    value = str(value)
+    return datetime.strptime(value, '%H:%M:%S' if value.count(':') == 2 else '%H:%M').time()
+
+
+class _References:
+    """Types de quart, employés et véhicules référencés par le lot (une requête par modèle)"""
+
+    def __init__(self, rows):
+        self.shift_types = {}
+        for shift_type in ShiftType.objects.all():
+            self.shift_types[str(shift_type.id)] = shift_type
+            self.shift_types[shift_type.name] = shift_type
+
+        employee_refs = {str(row.get('employee') or '') for row in rows} - {''}
+        vehicle_refs = {str(row.get('vehicle') or '') for row in rows} - {''}
+        ids = lambda refs: [int(ref) for ref in refs if ref.isdigit()]
+
+        self.employees = {}
+        for employee in Employee.objects.filter(id__in=ids(employee_refs)) | Employee.objects.filter(employee_id__in=employee_refs):
+            self.employees[str(employee.id)] = employee
+            self.employees[employee.employee_id] = employee
+
+        self.vehicles = {}
+        for vehicle in (
+            Vehicle.objects.filter(id__in=ids(vehicle_refs))
+            | Vehicle.objects.filter(vehicle_id__in=vehicle_refs)
+            | Vehicle.objects.filter(registration_number__in=vehicle_refs)
+        ):
+            self.vehicles[str(vehicle.id)] = vehicle
+            self.vehicles[vehicle.vehicle_id] = vehicle
+            self.vehicles[vehicle.registration_number] = vehicle
+
+
+def _parse_row(row, references):
+    """Valeurs typées d'une ligne, ou liste d'erreurs"""
+    errors = []
+    parsed = {'notes': row.get('notes') or '', 'status': row.get('status') or 'assigned'}
+    try:
+        parsed['date'] = _parse_date(row.get('date'))
+    except (TypeError, ValueError):
+        errors.append('Date invalide (format YYYY-MM-DD)')
+    for field in ('start_time', 'end_time'):
+        try:
+            parsed[field] = _parse_time(row.get(field))
+        except (TypeError, ValueError):
+            errors.append(f'{field} invalide (format HH:MM)')
+    if not errors and parsed['start_time'] == parsed['end_time']:
+        errors.append('L\'heure de fin doit être différente de l\'heure de début')
+
+    parsed['shift_type'] = references.shift_types.get(str(row.get('shift_type') or ''))
+    if parsed['shift_type'] is None:
+        errors.append(f"Type de quart inconnu : {row.get('shift_type')}")
+    parsed['employee'] = references.employees.get(str(row.get('employee') or ''))
+    if parsed['employee'] is None:
+        errors.append(f"Employé inconnu : {row.get('employee')}")
+    parsed['vehicle'] = None
+    if row.get('vehicle'):
+        parsed['vehicle'] = references.vehicles.get(str(row['vehicle']))
+        if parsed['vehicle'] is None:
+            errors.append(f"Véhicule inconnu : {row['vehicle']}")
+        elif parsed['vehicle'].status != 'available':
+            errors.append('Véhicule indisponible (maintenance ou hors service).')
+    if parsed['status'] not in ASSIGNMENT_STATUSES:
+        errors.append(f"Statut d'assignation invalide : {parsed['status']}")
+    return parsed, errors
+
+
+def import_planning(rows, user=None, dry_run=False, partial=False):
+    """
+    Valider puis insérer un lot de lignes quart + assignation.
+
+    - dry_run : valider sans écrire
+    - partial : insérer les lignes valides même si d'autres sont en erreur
+      (par défaut, tout ou rien)
+
+    Retourne un dict : {'rows', 'created_shifts', 'created_assignments', 'errors', 'warnings', 'dry_run'}
+    """
+    rows = list(rows)
+    references = _References(rows)
+    parsed_rows = []
+    errors = []
+    for number, row in enumerate(rows, start=1):
+        parsed, row_errors = _parse_row(row, references)
+        if row_errors:
+            errors.append({'row': number, 'errors': row_errors})
+        else:
+            parsed_rows.append((number, parsed))
+
+    warnings = []
+    result = {
+        'rows': len(rows), 'created_shifts': 0, 'created_assignments': 0,
+        'errors': errors, 'warnings': warnings, 'dry_run': dry_run,
+    }
+    if not parsed_rows:
+        return result
+
+    dates = [parsed['date'] for _, parsed in parsed_rows]
+    index = get_planning_index(min(dates), max(dates))
+
+    # Quarts existants (clé unique : date, heure de début, type) et leurs assignations
+    existing_shifts = {
+        (shift.date, shift.start_time, shift.shift_type_id): shift
+        for shift in Shift.objects.filter(date__in=set(dates))
+    }
+    taken_employees = set()
+    taken_vehicles = set()
+    for shift_id, employee_id, vehicle_id in Assignment.objects.filter(
+        shift_id__in=[shift.id for shift in existing_shifts.values()]
+    ).values_list('shift_id', 'employee_id', 'vehicle_id'):
+        taken_employees.add((shift_id, employee_id))
+        if vehicle_id:
+            taken_vehicles.add((shift_id, vehicle_id))
+
+    new_shifts = {}
+    pending_by_employee = defaultdict(SortedIntervals)
+    pending_by_vehicle = defaultdict(SortedIntervals)
+    accepted = []
+    for number, parsed in parsed_rows:
+        key = (parsed['date'], parsed['start_time'], parsed['shift_type'].id)
+        shift = existing_shifts.get(key) or new_shifts.get(key)
+        if shift is not None and shift.end_time != parsed['end_time']:
+            errors.append({'row': number, 'errors': ['Un quart existe déjà à cette date/heure avec ce type et une autre heure de fin']})
+            continue
+        # Clé du quart pour l'unicité : id existant ou clé du quart à créer
+        shift_key = shift.id if shift is not None and shift.pk else key
+        employee = parsed['employee']
+        vehicle = parsed['vehicle']
+        start, end = shift_interval_bounds(parsed['date'], parsed['start_time'], parsed['end_time'])
+
+        row_errors = []
+        row_warnings = []
+        if (shift_key, employee.id) in taken_employees:
+            row_errors.append(f'{employee} est déjà assigné à ce quart')
+        elif index.employee_overlaps(employee.id, start, end) or pending_by_employee[employee.id].overlapping(start, end):
+            row_errors.append(f'{employee} a déjà un quart sur ce créneau')
+        elif _short_rest(index, pending_by_employee[employee.id], employee.id, start, end):
+            message = f'{employee} n\'a pas le repos quotidien minimal autour de ce quart'
+            (row_errors if enforce_daily_rest() else row_warnings).append(message)
+        if vehicle is not None:
+            if (shift_key, vehicle.id) in taken_vehicles:
+                row_errors.append(f'Le véhicule {vehicle} est déjà affecté à ce quart')
+            elif index.vehicle_overlaps(vehicle.id, start, end) or pending_by_vehicle[vehicle.id].overlapping(start, end):
+                row_errors.append(f'Le véhicule {vehicle} est déjà réservé sur ce créneau')
+        if row_errors:
+            errors.append({'row': number, 'errors': row_errors})
+            continue
+        if row_warnings:
+            warnings.append({'row': number, 'warnings': row_warnings})
+
+        if shift is None:
+            shift = Shift(
+                shift_type=parsed['shift_type'],
+                date=parsed['date'],
+                start_time=parsed['start_time'],
+                end_time=parsed['end_time'],
+                created_by=user
+            )
+            new_shifts[key] = shift
+        taken_employees.add((shift_key, employee.id))
+        interval = ShiftInterval(start, end, shift_key, None, employee.id, vehicle.id if vehicle else None)
+        pending_by_employee[employee.id].add(interval)
+        if vehicle is not None:
+            taken_vehicles.add((shift_key, vehicle.id))
+            pending_by_vehicle[vehicle.id].add(interval)
+        accepted.append((shift, parsed))
+
+    errors.sort(key=lambda error: error['row'])
+    if dry_run or (errors and not partial) or not accepted:
+        return result
+
+    with transaction.atomic():
+        created_shifts = Shift.objects.bulk_create(list(new_shifts.values()))
+        assignments = Assignment.objects.bulk_create([
+            Assignment(
+                shift=shift,
+                employee=parsed['employee'],
+                vehicle=parsed['vehicle'],
+                status=parsed['status'],
+                notes=parsed['notes']
+            )
+            for shift, parsed in accepted
+        ])
+    # bulk_create n'envoie pas de signaux
+    invalidate_planning_index()
+    invalidate_stats('planning')
+
+    result.update(created_shifts=len(created_shifts), created_assignments=len(assignments))
+    return result
+
+
+def _short_rest(index, pending, employee_id, start, end):
+    """Repos quotidien insuffisant vis-à-vis du planning existant ou du lot en cours"""
+    if index.rest_violations(employee_id, start, end):
+        return True
+    previous, following = pending.neighbours(start, end)
+    return bool(
+        (previous and start - previous.end < MIN_DAILY_REST)
+        or (following and following.start - end < MIN_DAILY_REST)
+    )
+
+
+def week_template_rows(template_week_start, weeks, target_week_start=None):
+    """
+    Lignes d'import qui recopient les assignations actives d'une semaine type
+    sur `weeks` semaines consécutives (par défaut à partir de la semaine suivante).
+    """
+    template_week_start = template_week_start - timedelta(days=template_week_start.weekday())
+    target_week_start = target_week_start or template_week_start + timedelta(days=7)
+    target_week_start = target_week_start - timedelta(days=target_week_start.weekday())
+
+    template = (
+        Assignment.objects.filter(
+            shift__date__gte=template_week_start,
+            shift__date__lte=template_week_start + timedelta(days=6)
+        )
+        .exclude(status__in=['cancelled', 'absent'])
+        .exclude(shift__status='cancelled')
+        .select_related('shift')
+        .order_by('shift__date', 'shift__start_time')
+    )
+    rows = []
+    for assignment in template:
+        shift = assignment.shift
+        offset = shift.date - template_week_start
+        for week in range(weeks):
+            rows.append({
+                'date': target_week_start + timedelta(weeks=week) + offset,
+                'start_time': shift.start_time,
+                'end_time': shift.end_time,
+                'shift_type': shift.shift_type_id,
+                'employee': assignment.employee_id,
+                'vehicle': assignment.vehicle_id or '',
+                'notes': assignment.notes,
+            })
+    return rows
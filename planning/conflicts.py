@@ -0,0 +1,247 @@
+"""
+Index des quarts par employé et par véhicule pour détecter les conflits
+
+Pour une fenêtre de planning (dates), les assignments actifs sont chargés en
+une requête et rangés, par employé et par véhicule, en intervalles
+[début, fin) triés par début (un quart qui passe minuit se termine le
+lendemain). Un quart dure moins de 24h : les intervalles qui peuvent
+chevaucher [s, e) commencent donc dans [s - 24h, e), trouvés par bisect en
+O(log n) (+ nombre de résultats).
+
+L'index est construit à la demande et gardé par processus pour quelques
+fenêtres. Il est invalidé par une version stockée dans le cache Django,
+incrémentée à chaque enregistrement/suppression de Shift ou d'Assignment
+(planning.signals), puis à nouveau à la validation de la transaction, donc
+partagée entre processus si le cache l'est.
+"""
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, defaultdict, namedtuple
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+# Repos quotidien minimal entre deux quarts (Code du travail, L3131-1)
+MIN_DAILY_REST = timedelta(hours=11)
+
+# Types de conflit signalés comme avertissements (bloquants si PLANNING_ENFORCE_DAILY_REST)
+WARNING_CONFLICT_TYPES = ['rest']
+
+MAX_SHIFT_DURATION = timedelta(hours=24)
+
+# Statuts ignorés pour les conflits
+INACTIVE_ASSIGNMENT_STATUSES = ['cancelled', 'absent']
+INACTIVE_SHIFT_STATUSES = ['cancelled']
+
+VERSION_CACHE_KEY = 'planning:conflict_index:version'
+
+# Fenêtres gardées en mémoire par processus
+MAX_CACHED_WINDOWS = 8
+
+
+ShiftInterval = namedtuple('ShiftInterval', [
+    'start', 'end', 'shift_id', 'assignment_id', 'employee_id', 'vehicle_id',
+])
+
+
+def shift_interval_bounds(shift_date, start_time, end_time):
+    """Début et fin d'un quart, fin au lendemain s'il passe minuit"""
+    start = datetime.combine(shift_date, start_time)
+    end = datetime.combine(shift_date, end_time)
+    if end <= start:
+        end += timedelta(days=1)
+    return start, end
+
+
+class SortedIntervals:
+    """Intervalles d'une même ressource triés par début"""
+
+    def __init__(self, intervals=()):
+        self.intervals = sorted(intervals, key=lambda interval: (interval.start, interval.end))
+        self.starts = [interval.start for interval in self.intervals]
+
+    def add(self, interval):
+        """Insérer un intervalle en gardant l'ordre (lots en cours de validation)"""
+        position = bisect_right(self.starts, interval.start)
+        self.starts.insert(position, interval.start)
+        self.intervals.insert(position, interval)
+
+    def overlapping(self, start, end, exclude_shift_id=None):
+        """Intervalles qui chevauchent [start, end)"""
+        low = bisect_left(self.starts, start - MAX_SHIFT_DURATION)
+        high = bisect_left(self.starts, end)
+        return [
+            interval for interval in self.intervals[low:high]
+            if interval.end > start and interval.shift_id != exclude_shift_id
+        ]
+
+    def neighbours(self, start, end, exclude_shift_id=None):
+        """Quart précédent (fini avant start) et suivant (commençant après end)"""
+        previous = None
+        for interval in reversed(self.intervals[:bisect_right(self.starts, start)]):
+            if interval.shift_id != exclude_shift_id and interval.end <= start:
+                previous = interval
+                break
+        following = None
+        for interval in self.intervals[bisect_left(self.starts, end):]:
+            if interval.shift_id != exclude_shift_id:
+                following = interval
+                break
+        return previous, following
+
+
+class PlanningIndex:
+    """Index des quarts actifs d'une fenêtre de dates, par employé et par véhicule"""
+
+    def __init__(self, start_date, end_date, version=None):
+        from .models import Assignment
+
+        self.start_date = start_date
+        self.end_date = end_date
+        self.version = version
+        # Marge d'un jour : quarts de la veille passant minuit et repos quotidien
+        assignments = (
+            Assignment.objects.filter(
+                shift__date__gte=start_date - timedelta(days=1),
+                shift__date__lte=end_date + timedelta(days=1)
+            )
+            .exclude(status__in=INACTIVE_ASSIGNMENT_STATUSES)
+            .exclude(shift__status__in=INACTIVE_SHIFT_STATUSES)
+            .values_list('id', 'employee_id', 'vehicle_id', 'shift_id',
+                         'shift__date', 'shift__start_time', 'shift__end_time')
+        )
+        by_employee = defaultdict(list)
+        by_vehicle = defaultdict(list)
+        for assignment_id, employee_id, vehicle_id, shift_id, shift_date, start_time, end_time in assignments:
+            start, end = shift_interval_bounds(shift_date, start_time, end_time)
+            interval = ShiftInterval(start, end, shift_id, assignment_id, employee_id, vehicle_id)
+            by_employee[employee_id].append(interval)
+            if vehicle_id:
+                by_vehicle[vehicle_id].append(interval)
+        self.by_employee = {key: SortedIntervals(values) for key, values in by_employee.items()}
+        self.by_vehicle = {key: SortedIntervals(values) for key, values in by_vehicle.items()}
+
+    def covers(self, start_date, end_date):
+        return self.start_date <= start_date and end_date <= self.end_date
+
+    def employee_overlaps(self, employee_id, start, end, exclude_shift_id=None):
+        intervals = self.by_employee.get(int(employee_id))
+        return intervals.overlapping(start, end, exclude_shift_id) if intervals else []
+
+    def vehicle_overlaps(self, vehicle_id, start, end, exclude_shift_id=None):
+        intervals = self.by_vehicle.get(int(vehicle_id))
+        return intervals.overlapping(start, end, exclude_shift_id) if intervals else []
+
+    def rest_violations(self, employee_id, start, end, exclude_shift_id=None, min_rest=MIN_DAILY_REST):
+        """Quarts voisins laissant moins de `min_rest` de repos avant ou après [start, end)"""
+        intervals = self.by_employee.get(int(employee_id))
+        if not intervals:
+            return []
+        previous, following = intervals.neighbours(start, end, exclude_shift_id)
+        violations = []
+        if previous and start - previous.end < min_rest:
+            violations.append(previous)
+        if following and following.start - end < min_rest:
+            violations.append(following)
+        return violations
+
+    def validate(self, min_rest=MIN_DAILY_REST):
+        """
+        Conflits des quarts commençant dans la fenêtre, en un seul parcours
+        de chaque ressource : chevauchements et repos insuffisant par employé,
+        double réservation par véhicule.
+        """
+        conflicts = []
+        for employee_id, intervals in self.by_employee.items():
+            for first, second in self._consecutive_pairs(intervals.intervals):
+                if second.start < first.end:
+                    conflicts.append(self._conflict('overlap', first, second, employee_id=employee_id))
+                elif second.start - first.end < min_rest:
+                    conflicts.append(self._conflict('rest', first, second, employee_id=employee_id))
+        for vehicle_id, intervals in self.by_vehicle.items():
+            for first, second in self._consecutive_pairs(intervals.intervals):
+                if second.start < first.end:
+                    conflicts.append(self._conflict('vehicle', first, second, vehicle_id=vehicle_id))
+        conflicts.sort(key=lambda conflict: conflict['start'])
+        return conflicts
+
+    def _consecutive_pairs(self, intervals):
+        """Paires à contrôler : chaque quart avec celui qui finit le plus tard avant lui"""
+        latest = None
+        for interval in intervals:
+            if latest is not None and self._in_window(interval):
+                yield latest, interval
+            if latest is None or interval.end > latest.end:
+                latest = interval
+
+    def _in_window(self, interval):
+        return self.start_date <= interval.start.date() <= self.end_date
+
+    @staticmethod
+    def _conflict(kind, first, second, **resource):
+        conflict = {
+            'type': kind,
+            'start': second.start,
+            'assignment_ids': [first.assignment_id, second.assignment_id],
+            'shift_ids': [first.shift_id, second.shift_id],
+            'gap_hours': round((second.start - first.end).total_seconds() / 3600, 2),
+        }
+        conflict.update(resource)
+        return conflict
+
+
+def enforce_daily_rest():
+    """Repos quotidien bloquant (réglage PLANNING_ENFORCE_DAILY_REST) ou simple avertissement"""
+    return getattr(settings, 'PLANNING_ENFORCE_DAILY_REST', False)
+
+
+_lock = threading.Lock()
+_indexes = OrderedDict()
+
+
+def current_version():
+    return cache.get(VERSION_CACHE_KEY, 0)
+
+
+def get_planning_index(start_date, end_date=None):
+    """Index couvrant [start_date, end_date], construit à la demande et mis en cache"""
+    end_date = end_date or start_date
+    version = current_version()
+    with _lock:
+        for key, index in list(_indexes.items()):
+            if index.version != version:
+                del _indexes[key]
+            elif index.covers(start_date, end_date):
+                _indexes.move_to_end(key)
+                return index
+
+    index = PlanningIndex(start_date, end_date, version)
+    with _lock:
+        _indexes[(start_date, end_date)] = index
+        while len(_indexes) > MAX_CACHED_WINDOWS:
+            _indexes.popitem(last=False)
+    return index
+
+
+def bump_planning_version():
+    """Nouvelle version de l'index : les index construits avant sont abandonnés"""
+    try:
+        cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(VERSION_CACHE_KEY, 1, timeout=None)
+    with _lock:
+        _indexes.clear()
+
+
+def invalidate_planning_index(**kwargs):
+    """
+    Invalider l'index, tout de suite et à nouveau une fois la transaction
+    validée : un autre processus a pu reconstruire l'index avec les données
+    d'avant la validation sous la nouvelle version (branché sur
+    post_save/post_delete de Shift et Assignment)
+    """
+    bump_planning_version()
+    transaction.on_commit(bump_planning_version)
@@ -0,0 +1,14 @@
+"""
+Management command pour passer à 'completed' les assignations des quarts terminés
+"""
+from django.core.management.base import BaseCommand
+
+from planning.transitions import complete_past_assignments
+
+
+class Command(BaseCommand):
+    help = "Passe à 'completed' les assignations actives des quarts terminés (à planifier toutes les 15 minutes)"
+
+    def handle(self, *args, **options):
+        updated = complete_past_assignments()
+        self.stdout.write(self.style.SUCCESS(f'✅ {updated} assignation(s) passée(s) à complété'))
@@ -242,7 +242,7 @@ class Assignment(models.Model):
         active_contract = Contract.objects.filter(
             employee=self.employee,
             start_date__lte=self.shift.date,
-            is_active=True
+            status='active'
         ).first()
         
         if not active_contract:
@@ -250,27 +250,41 @@ class Assignment(models.Model):
                 f'L\'employé {self.employee} n\'a pas de contrat actif à la date du shift'
             )
         
-        # Vérifier que l'employé n'a pas d'autre assignment le même jour
-        existing = Assignment.objects.filter(
-            employee=self.employee,
-            shift__date=self.shift.date
-        ).exclude(id=self.id)
+        # Vérifier les chevauchements (y compris les quarts passant minuit) via l'index du planning
+        from .conflicts import enforce_daily_rest, get_planning_index, shift_interval_bounds
+        shift = self.shift
+        start, end = shift_interval_bounds(shift.date, shift.start_time, shift.end_time)
+        index = get_planning_index(shift.date)
+        
+        conflicts = [
+            interval for interval in index.employee_overlaps(self.employee_id, start, end)
+            if interval.assignment_id != self.id
+        ]
+        if conflicts:
+            raise ValidationError(
+                f'L\'employé {self.employee} a déjà une assignation sur ce créneau le {shift.date}'
+            )
         
-        if existing.exists():
+        # Repos quotidien minimal : bloquant seulement si PLANNING_ENFORCE_DAILY_REST,
+        # sinon signalé par validate-week et le rapport d'import
+        short_rest = enforce_daily_rest() and [
+            interval for interval in index.rest_violations(self.employee_id, start, end, exclude_shift_id=shift.id)
+            if interval.assignment_id != self.id
+        ]
+        if short_rest:
             raise ValidationError(
-                f'L\'employé {self.employee} a déjà une assignation le {self.shift.date}'
+                f'L\'employé {self.employee} n\'a pas le repos quotidien minimal autour du quart du {shift.date}'
             )
         
-        # Vérifier que le véhicule (s'il existe) n'est pas assigné à un autre employé le même jour
-        if self.vehicle:
-            vehicle_conflict = Assignment.objects.filter(
-                vehicle=self.vehicle,
-                shift__date=self.shift.date
-            ).exclude(id=self.id).exists()
-            
-            if vehicle_conflict:
+        # Vérifier que le véhicule (s'il existe) n'est pas déjà réservé sur ce créneau
+        if self.vehicle_id:
+            vehicle_conflicts = [
+                interval for interval in index.vehicle_overlaps(self.vehicle_id, start, end)
+                if interval.assignment_id != self.id
+            ]
+            if vehicle_conflicts:
                 raise ValidationError(
-                    f'Le véhicule {self.vehicle} est déjà assigné pour le {self.shift.date}'
+                    f'Le véhicule {self.vehicle} est déjà assigné sur ce créneau le {shift.date}'
                 )
     
     @property
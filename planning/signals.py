@@ -0,0 +1,15 @@
+"""
+Signaux de l'application planning
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .conflicts import invalidate_planning_index
+from .models import Shift, Assignment
+
+
+@receiver([post_save, post_delete], sender=Shift)
+@receiver([post_save, post_delete], sender=Assignment)
+def planning_changed(sender, **kwargs):
+    """Invalider l'index des conflits quand un quart ou une assignation change"""
+    invalidate_planning_index()
@@ -1,10 +1,18 @@
-from django.test import TestCase
+from django.core.exceptions import ValidationError
+from django.test import TestCase, override_settings
 from django.utils import timezone
-from datetime import time, timedelta
+from datetime import date, datetime, time, timedelta
+from rest_framework.test import APIClient
 from django.contrib.auth import get_user_model
 from employees.models import Employee, Profession
 from contracts.models import Contract
 from vehicles.models import Vehicle
+from tests.factories import (
+    AssignmentFactory, ContractFactory, EmployeeFactory, ShiftFactory, ShiftTypeFactory, UserFactory, VehicleFactory,
+)
+from .bulk import import_planning, rows_from_csv, week_template_rows
+from .conflicts import current_version, get_planning_index
+from .transitions import complete_past_assignments
 from .models import ShiftType, Shift, Assignment
 
 User = get_user_model()
@@ -194,3 +202,274 @@ class AssignmentTestCase(TestCase):
         assignment.save()
         
         self.assertTrue(assignment.is_confirmed)
+
+
+class PlanningIndexTestCase(TestCase):
+    """Tests pour l'index des conflits de planning"""
+
+    def setUp(self):
+        self.employee = EmployeeFactory()
+        self.vehicle = VehicleFactory()
+        # Lundi 22h - mardi 6h
+        self.night = AssignmentFactory(
+            employee=self.employee,
+            vehicle=self.vehicle,
+            shift=ShiftFactory(date=date(2026, 3, 2), start_time=time(22, 0), end_time=time(6, 0))
+        )
+
+    def test_overlap_across_midnight(self):
+        """Un quart du lendemain matin chevauche le quart de nuit de la veille"""
+        index = get_planning_index(date(2026, 3, 3))
+        overlaps = index.employee_overlaps(
+            self.employee.id, datetime(2026, 3, 3, 5, 0), datetime(2026, 3, 3, 13, 0)
+        )
+        self.assertEqual([interval.assignment_id for interval in overlaps], [self.night.id])
+        self.assertEqual(index.employee_overlaps(
+            self.employee.id, datetime(2026, 3, 3, 6, 0), datetime(2026, 3, 3, 14, 0)
+        ), [])
+
+    def test_rest_period(self):
+        """Moins de 11h de repos après le quart de nuit est signalé"""
+        index = get_planning_index(date(2026, 3, 3))
+        self.assertTrue(index.rest_violations(
+            self.employee.id, datetime(2026, 3, 3, 14, 0), datetime(2026, 3, 3, 22, 0)
+        ))
+        self.assertFalse(index.rest_violations(
+            self.employee.id, datetime(2026, 3, 3, 17, 0), datetime(2026, 3, 4, 1, 0)
+        ))
+
+    def test_index_invalidated_on_save(self):
+        """Une nouvelle assignation invalide l'index en cache"""
+        index = get_planning_index(date(2026, 3, 2))
+        self.assertIs(index, get_planning_index(date(2026, 3, 2)))
+        AssignmentFactory(shift=ShiftFactory(date=date(2026, 3, 2)))
+        self.assertIsNot(index, get_planning_index(date(2026, 3, 2)))
+
+    def test_index_invalidated_again_on_commit(self):
+        """Un index reconstruit avant la validation de la transaction est abandonné à la validation"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            AssignmentFactory(shift=ShiftFactory(date=date(2026, 3, 2)))
+            version = current_version()
+            # Reconstruction concurrente avant la validation, sous la nouvelle version
+            stale = get_planning_index(date(2026, 3, 2))
+            self.assertIs(stale, get_planning_index(date(2026, 3, 2)))
+        self.assertTrue(callbacks)
+        for callback in callbacks:
+            callback()
+        self.assertGreater(current_version(), version)
+        self.assertIsNot(stale, get_planning_index(date(2026, 3, 2)))
+
+    def test_short_rest_blocks_only_when_enforced(self):
+        """Le repos quotidien insuffisant n'empêche l'assignation que si PLANNING_ENFORCE_DAILY_REST"""
+        ContractFactory(employee=self.employee, start_date=date(2026, 1, 1))
+        assignment = Assignment(
+            employee=self.employee,
+            shift=ShiftFactory(date=date(2026, 3, 3), start_time=time(14, 0), end_time=time(22, 0))
+        )
+        assignment.clean()
+        with override_settings(PLANNING_ENFORCE_DAILY_REST=True):
+            with self.assertRaises(ValidationError):
+                assignment.clean()
+
+    def test_validate_week_endpoint(self):
+        """La validation de la semaine remonte chevauchements et double réservation de véhicule"""
+        AssignmentFactory(
+            employee=self.employee,
+            shift=ShiftFactory(date=date(2026, 3, 3), start_time=time(5, 0), end_time=time(13, 0))
+        )
+        AssignmentFactory(
+            vehicle=self.vehicle,
+            shift=ShiftFactory(date=date(2026, 3, 2), start_time=time(23, 0), end_time=time(7, 0))
+        )
+
+        client = APIClient()
+        client.force_authenticate(UserFactory(role='rh'))
+        response = client.get('/api/planning/shifts/validate-week/', {'week_start': '2026-03-04'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['is_valid'])
+        self.assertEqual(response.data['week_start'], date(2026, 3, 2))
+        self.assertEqual(
+            sorted(conflict['type'] for conflict in response.data['conflicts']),
+            ['overlap', 'vehicle']
+        )
+        self.assertEqual(response.data['warnings'], [])
+
+    def test_validate_week_reports_short_rest_as_warning(self):
+        """Un repos quotidien insuffisant est un avertissement, pas un conflit"""
+        AssignmentFactory(
+            employee=self.employee,
+            shift=ShiftFactory(date=date(2026, 3, 3), start_time=time(14, 0), end_time=time(22, 0))
+        )
+        client = APIClient()
+        client.force_authenticate(UserFactory(role='rh'))
+
+        response = client.get('/api/planning/shifts/validate-week/', {'week_start': '2026-03-02'})
+        self.assertTrue(response.data['is_valid'])
+        self.assertEqual([warning['type'] for warning in response.data['warnings']], ['rest'])
+
+        with override_settings(PLANNING_ENFORCE_DAILY_REST=True):
+            response = client.get('/api/planning/shifts/validate-week/', {'week_start': '2026-03-02'})
+        self.assertFalse(response.data['is_valid'])
+        self.assertEqual([conflict['type'] for conflict in response.data['conflicts']], ['rest'])
+
+
+class BulkPlanningTestCase(TestCase):
+    """Tests pour l'import en masse et la réplication de semaine type"""
+
+    def setUp(self):
+        self.shift_type = ShiftTypeFactory()
+        self.first = EmployeeFactory()
+        self.second = EmployeeFactory()
+        self.vehicle = VehicleFactory()
+
+    def _row(self, employee, day, start='08:00', end='16:00', **extra):
+        row = {
+            'date': day, 'start_time': start, 'end_time': end,
+            'shift_type': 'day', 'employee': employee.employee_id,
+        }
+        row.update(extra)
+        return row
+
+    def test_import_shares_shifts(self):
+        """Deux employés sur le même créneau partagent un seul quart"""
+        rows = [
+            self._row(self.first, '2026-03-02', vehicle=self.vehicle.vehicle_id),
+            self._row(self.second, '2026-03-02'),
+            self._row(self.first, '2026-03-03'),
+        ]
+        with self.assertNumQueries(9):
+            result = import_planning(rows)
+
+        self.assertEqual(result['errors'], [])
+        self.assertEqual(result['created_shifts'], 2)
+        self.assertEqual(result['created_assignments'], 3)
+        self.assertEqual(Assignment.objects.get(employee=self.first, shift__date=date(2026, 3, 2)).vehicle, self.vehicle)
+
+    def test_row_errors_all_or_nothing(self):
+        """Une ligne en erreur bloque tout le lot, sauf en mode partiel"""
+        AssignmentFactory(
+            employee=self.first,
+            shift=ShiftFactory(shift_type=self.shift_type, date=date(2026, 3, 2), start_time=time(22, 0), end_time=time(6, 0))
+        )
+        rows = [
+            self._row(self.second, '2026-03-03'),
+            self._row(self.first, '2026-03-03', start='05:00', end='13:00'),
+            self._row(self.second, '2026-03-03', start='14:00', end='22:00'),
+            self._row(self.second, '2026-03-04', vehicle='INCONNU'),
+            self._row(self.first, 'pas une date'),
+        ]
+        result = import_planning(rows)
+        self.assertEqual([error['row'] for error in result['errors']], [2, 3, 4, 5])
+        self.assertEqual(result['created_assignments'], 0)
+        self.assertEqual(Assignment.objects.count(), 1)
+
+        result = import_planning(rows, partial=True)
+        self.assertEqual(result['created_assignments'], 1)
+        self.assertEqual(Assignment.objects.count(), 2)
+
+    def test_short_rest_is_a_warning(self):
+        """Une ligne sans repos quotidien suffisant est importée avec un avertissement"""
+        rows = [
+            self._row(self.first, '2026-03-02', start='14:00', end='22:00'),
+            self._row(self.first, '2026-03-03', start='06:00', end='14:00'),
+        ]
+        with override_settings(PLANNING_ENFORCE_DAILY_REST=True):
+            result = import_planning(rows, dry_run=True)
+        self.assertEqual([error['row'] for error in result['errors']], [2])
+
+        result = import_planning(rows)
+        self.assertEqual(result['errors'], [])
+        self.assertEqual([warning['row'] for warning in result['warnings']], [2])
+        self.assertEqual(result['created_assignments'], 2)
+
+    def test_vehicle_double_booking(self):
+        """Un véhicule ne peut pas être réservé deux fois sur des créneaux qui se chevauchent"""
+        rows = [
+            self._row(self.first, '2026-03-02', vehicle=self.vehicle.registration_number),
+            self._row(self.second, '2026-03-02', start='12:00', end='20:00', vehicle=self.vehicle.id),
+        ]
+        result = import_planning(rows, dry_run=True)
+        self.assertEqual([error['row'] for error in result['errors']], [2])
+        self.assertFalse(Shift.objects.exists())
+
+    def test_csv_rows(self):
+        """Lecture d'un CSV séparé par des points-virgules avec BOM"""
+        content = '\ufeffdate;start_time;end_time;shift_type;employee\n2026-03-02;08:00;16:00;day;E1\n'.encode('utf-8')
+        self.assertEqual(rows_from_csv(content), [{
+            'date': '2026-03-02', 'start_time': '08:00', 'end_time': '16:00', 'shift_type': 'day', 'employee': 'E1',
+        }])
+
+    def test_replicate_week_endpoint(self):
+        """La semaine type est recopiée sur les semaines suivantes"""
+        AssignmentFactory(employee=self.first, shift=ShiftFactory(shift_type=self.shift_type, date=date(2026, 3, 3)))
+        AssignmentFactory(
+            employee=self.second, status='cancelled',
+            shift=ShiftFactory(shift_type=self.shift_type, date=date(2026, 3, 4), start_time=time(9, 0))
+        )
+        self.assertEqual(len(week_template_rows(date(2026, 3, 4), 3)), 3)
+
+        client = APIClient()
+        client.force_authenticate(UserFactory(role='rh'))
+        response = client.post('/api/planning/shifts/replicate-week/', {'week_start': '2026-03-02', 'weeks': 2}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created_assignments'], 2)
+        self.assertEqual(
+            sorted(Assignment.objects.filter(employee=self.first).values_list('shift__date', flat=True)),
+            [date(2026, 3, 3), date(2026, 3, 10), date(2026, 3, 17)]
+        )
+        response = client.post('/api/planning/shifts/replicate-week/', {'week_start': '2026-03-02', 'weeks': 2}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.data['errors']), 2)
+
+
+class AssignmentCompletionTestCase(TestCase):
+    """Tests pour le passage en lot des assignations à complété"""
+
+    def setUp(self):
+        self.now = timezone.make_aware(datetime(2026, 3, 3, 10, 0))
+        self.shift_type = ShiftTypeFactory()
+
+    def _assignment(self, day, start, end, **extra):
+        shift = ShiftFactory(shift_type=self.shift_type, date=day, start_time=start, end_time=end)
+        return AssignmentFactory(shift=shift, **extra)
+
+    def test_complete_past_assignments(self):
+        """Seules les assignations actives des quarts terminés sont complétées, en une requête"""
+        ended = [
+            self._assignment(date(2026, 2, 20), time(8, 0), time(16, 0)),
+            self._assignment(date(2026, 3, 2), time(22, 0), time(6, 0), status='confirmed'),
+            self._assignment(date(2026, 3, 3), time(2, 0), time(9, 0)),
+        ]
+        running = [
+            self._assignment(date(2026, 3, 2), time(23, 0), time(11, 0)),
+            self._assignment(date(2026, 3, 3), time(8, 0), time(16, 0)),
+            self._assignment(date(2026, 2, 21), time(8, 0), time(16, 0), status='absent'),
+        ]
+
+        with self.assertNumQueries(1):
+            updated = complete_past_assignments(self.now)
+
+        self.assertEqual(updated, len(ended))
+        for assignment in ended:
+            assignment.refresh_from_db()
+            self.assertEqual(assignment.status, 'completed')
+        self.assertEqual(
+            [Assignment.objects.get(pk=assignment.pk).status for assignment in running],
+            ['assigned', 'assigned', 'absent']
+        )
+
+    def test_planning_view_is_read_only(self):
+        """L'affichage du planning n'écrit rien et ne charge que la fenêtre demandée"""
+        past = self._assignment(date(2026, 2, 20), time(8, 0), time(16, 0))
+        self._assignment(date(2026, 1, 5), time(8, 0), time(16, 0))
+        self.client.force_login(UserFactory(role='rh'))
+
+        response = self.client.get('/planning/', {'start': '2026-02-18'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['shift'] for item in response.context['shifts_data']], [past.shift])
+        self.assertEqual(response.context['window_start'], date(2026, 2, 16))
+        past.refresh_from_db()
+        self.assertEqual(past.status, 'assigned')
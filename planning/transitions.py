@@ -0,0 +1,55 @@
+"""
+Transitions de statut des assignations en lot
+
+Les assignations actives des quarts terminés passent à 'completed' en une
+seule requête UPDATE (management command complete_assignments, à lancer
+périodiquement par cron ou Celery beat), au lieu d'être enregistrées une par
+une à l'affichage du planning.
+
+Un quart dure moins de 24h : il est terminé si
+    - il date d'avant-hier ou plus tôt,
+    - il date d'hier et ne passe pas minuit, ou se termine avant maintenant,
+    - il date d'aujourd'hui, ne passe pas minuit et se termine avant maintenant.
+"""
+from datetime import timedelta
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+from sirh_core.stats_cache import invalidate_stats
+from .models import Assignment
+
+
+# Statuts d'assignation passés à 'completed' une fois le quart terminé
+COMPLETABLE_ASSIGNMENT_STATUSES = ['assigned', 'confirmed', 'in_progress']
+
+
+def ended_shifts_q(now=None, prefix=''):
+    """Condition 'quart terminé à `now`' (heure locale), `prefix` pour filtrer via une relation"""
+    now = timezone.localtime(now)
+    today = now.date()
+    yesterday = today - timedelta(days=1)
+    current_time = now.time()
+
+    def field(name):
+        return f'{prefix}{name}'
+
+    overnight = Q(**{field('end_time') + '__lte': F(field('start_time'))})
+    return (
+        Q(**{field('date') + '__lt': yesterday})
+        | (Q(**{field('date'): yesterday}) & (~overnight | Q(**{field('end_time') + '__lt': current_time})))
+        | (Q(**{field('date'): today}) & ~overnight & Q(**{field('end_time') + '__lt': current_time}))
+    )
+
+
+def complete_past_assignments(now=None):
+    """Passer à 'completed' les assignations actives des quarts terminés (une requête). Retourne le nombre."""
+    completed = (
+        Assignment.objects.filter(status__in=COMPLETABLE_ASSIGNMENT_STATUSES)
+        .exclude(shift__status='cancelled')
+        .filter(ended_shifts_q(now, prefix='shift__'))
+        .update(status='completed', updated_at=timezone.now())
+    )
+    if completed:
+        invalidate_stats('planning')
+    return completed
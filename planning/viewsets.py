@@ -1,3 +1,4 @@
+import csv
 from rest_framework import viewsets, status, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -6,7 +7,14 @@ from django.utils import timezone
 from datetime import timedelta
 from .models import ShiftType, Shift, Assignment
 from .serializers import ShiftTypeSerializer, ShiftSerializer, AssignmentSerializer
+from .conflicts import WARNING_CONFLICT_TYPES, enforce_daily_rest, get_planning_index
+from .bulk import import_planning, rows_from_csv, week_template_rows
 from accounts.permissions import IsRH, IsAdmin
+from sirh_core.query_plan import plan_queryset
+
+
+def _as_bool(value):
+    return str(value).lower() in ['1', 'true', 'yes', 'on']
 
 
 class ShiftTypeViewSet(viewsets.ReadOnlyModelViewSet):
@@ -28,6 +36,8 @@ class ShiftViewSet(viewsets.ModelViewSet):
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy', 'cancel']:
             return [IsRH(), IsAdmin()]
+        if self.action in ['validate_week', 'bulk_import', 'replicate_week']:
+            return [IsRH()]
         return [IsAuthenticated()]
     filterset_fields = ['date', 'status', 'shift_type']
     search_fields = ['notes']
@@ -48,7 +58,7 @@ class ShiftViewSet(viewsets.ModelViewSet):
             today = timezone.now().date()
             queryset = queryset.filter(date__gte=today)
         
-        return queryset
+        return plan_queryset(queryset, self.get_serializer_class())
     
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def upcoming(self, request):
@@ -84,6 +94,99 @@ class ShiftViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
     
+    @action(detail=False, methods=['get'], url_path='validate-week', permission_classes=[IsRH | IsAdmin])
+    def validate_week(self, request):
+        """
+        Contrôler tout le planning d'une semaine : chevauchements et véhicules
+        (conflicts), repos quotidien insuffisant (warnings, sauf s'il est bloquant)
+        """
+        date_str = request.query_params.get('week_start', None)
+        try:
+            day = (
+                timezone.datetime.strptime(date_str, '%Y-%m-%d').date()
+                if date_str else timezone.now().date()
+            )
+        except ValueError:
+            return Response(
+                {'error': 'Format de date invalide (utilisez YYYY-MM-DD)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        week_start = day - timedelta(days=day.weekday())
+        week_end = week_start + timedelta(days=6)
+        conflicts = get_planning_index(week_start, week_end).validate()
+        conflicts = [c for c in conflicts if week_start <= c['start'].date() <= week_end]
+        warning_types = [] if enforce_daily_rest() else WARNING_CONFLICT_TYPES
+        warnings = [c for c in conflicts if c['type'] in warning_types]
+        conflicts = [c for c in conflicts if c['type'] not in warning_types]
+        return Response(
+            {
+                'week_start': week_start,
+                'week_end': week_end,
+                'is_valid': not conflicts,
+                'conflicts': conflicts,
+                'warnings': warnings,
+            },
+            status=status.HTTP_200_OK
+        )
+    
+    @action(detail=False, methods=['post'], url_path='bulk-import', permission_classes=[IsRH | IsAdmin])
+    def bulk_import(self, request):
+        """
+        Importer un planning en masse (quart + assignation par ligne).
+        Corps JSON {"rows": [...], "dry_run": bool, "partial": bool} ou fichier CSV "file".
+        """
+        upload = request.FILES.get('file')
+        if upload is not None:
+            try:
+                rows = rows_from_csv(upload.read())
+            except (UnicodeDecodeError, csv.Error):
+                return Response(
+                    {'error': 'Fichier CSV illisible (UTF-8 attendu)'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        else:
+            rows = request.data.get('rows')
+            if not isinstance(rows, list):
+                return Response(
+                    {'error': 'Le champ "rows" (liste) ou un fichier CSV "file" est requis'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        return self._import_response(rows, request)
+    
+    @action(detail=False, methods=['post'], url_path='replicate-week', permission_classes=[IsRH | IsAdmin])
+    def replicate_week(self, request):
+        """Recopier les assignations d'une semaine type sur N semaines"""
+        try:
+            template_week_start = timezone.datetime.strptime(str(request.data.get('week_start')), '%Y-%m-%d').date()
+            target = request.data.get('target_week_start')
+            target_week_start = timezone.datetime.strptime(target, '%Y-%m-%d').date() if target else None
+            weeks = int(request.data.get('weeks', 1))
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'Paramètres invalides (week_start et target_week_start au format YYYY-MM-DD, weeks entier)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 1 <= weeks <= 52:
+            return Response(
+                {'error': 'Le nombre de semaines doit être compris entre 1 et 52'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        rows = week_template_rows(template_week_start, weeks, target_week_start)
+        return self._import_response(rows, request)
+    
+    def _import_response(self, rows, request):
+        result = import_planning(
+            rows,
+            user=request.user,
+            dry_run=_as_bool(request.data.get('dry_run')),
+            partial=_as_bool(request.data.get('partial'))
+        )
+        if result['errors'] and not (result['dry_run'] or result['created_assignments']):
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        created = result['created_assignments'] and not result['dry_run']
+        return Response(result, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+    
     @action(detail=True, methods=['post'], permission_classes=[IsRH | IsAdmin])
     def cancel(self, request, pk=None):
         """Annuler un shift"""
@@ -119,11 +222,12 @@ class AssignmentViewSet(viewsets.ModelViewSet):
     search_fields = ['employee__user__first_name', 'employee__user__last_name', 'notes']
     ordering_fields = ['shift__date', 'status', 'created_at']
     ordering = ['-shift__date', 'status']
+    cursor_ordering = ('-shift__date', '-id')
     
     def get_queryset(self):
         """Les employés ne voient que leurs assignments, les RH/Admins voient tous"""
         user = self.request.user
-        queryset = Assignment.objects.select_related('shift', 'employee__user', 'vehicle')
+        queryset = Assignment.objects.all()
         
         if user.role == 'employee':
             # Afficher seulement les assignments de l'employé
@@ -134,7 +238,7 @@ class AssignmentViewSet(viewsets.ModelViewSet):
             except:
                 queryset = Assignment.objects.none()
         
-        return queryset
+        return plan_queryset(queryset, self.get_serializer_class())
     
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def my_schedule(self, request):
@@ -1,3 +1,46 @@
-from django.test import TestCase
+import tempfile
 
-# À compléter
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from tests.factories import EmployeeFactory
+from .models import Document
+
+
+class DocumentDownloadTestCase(TestCase):
+    """Tests pour le téléchargement des documents du portail"""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.employee = EmployeeFactory()
+        self.document = Document.objects.create(
+            employee=self.employee,
+            document_type='other',
+            title='Attestation employeur',
+            file=SimpleUploadedFile('attestation.txt', b'Attestation employeur')
+        )
+
+    def test_download_own_document(self):
+        """Le salarié télécharge son document, en entier ou par plage"""
+        self.client.force_login(self.employee.user)
+        url = f'/api/portal/documents/{self.document.id}/download/'
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'Attestation employeur')
+        self.assertIn('attachment', response['Content-Disposition'])
+
+        partial = self.client.get(url, HTTP_RANGE='bytes=0-10')
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(b''.join(partial.streaming_content), b'Attestation')
+
+    def test_download_other_employee_document(self):
+        """Le document d'un autre salarié n'est pas accessible"""
+        self.client.force_login(EmployeeFactory().user)
+        response = self.client.get(f'/api/portal/documents/{self.document.id}/download/')
+        self.assertEqual(response.status_code, 404)
@@ -12,6 +12,8 @@ from .serializers import (
     DocumentSerializer, NotificationSerializer
 )
 from accounts.permissions import IsRH, IsAdmin, IsManager
+from sirh_core.files import serve_file
+from sirh_core.query_plan import plan_queryset
 from planning.models import Assignment
 from planning.serializers import AssignmentSerializer
 from timesheets.models import TimeSheet
@@ -124,18 +126,21 @@ class LeaveRequestViewSet(viewsets.ModelViewSet):
         
         # RH et Admin voient toutes les demandes
         if user.role in ['admin', 'rh']:
-            return LeaveRequest.objects.all()
+            queryset = LeaveRequest.objects.all()
         
         # Manager voit les demandes de son équipe
-        if user.role == 'manager' and hasattr(user, 'employee'):
+        elif user.role == 'manager' and hasattr(user, 'employee'):
             # TODO: Implémenter la logique d'équipe
-            return LeaveRequest.objects.filter(employee=user.employee)
+            queryset = LeaveRequest.objects.filter(employee=user.employee)
         
         # Employé voit seulement ses demandes
-        if hasattr(user, 'employee'):
-            return LeaveRequest.objects.filter(employee=user.employee)
+        elif hasattr(user, 'employee'):
+            queryset = LeaveRequest.objects.filter(employee=user.employee)
+        
+        else:
+            queryset = LeaveRequest.objects.none()
         
-        return LeaveRequest.objects.none()
+        return plan_queryset(queryset, self.get_serializer_class())
     
     def perform_create(self, serializer):
         """Créer une demande de congé pour l'employé connecté"""
@@ -300,12 +305,13 @@ class TimeOffBalanceViewSet(viewsets.ModelViewSet):
         user = self.request.user
         
         if user.role in ['admin', 'rh']:
-            return TimeOffBalance.objects.all()
-        
-        if hasattr(user, 'employee'):
-            return TimeOffBalance.objects.filter(employee=user.employee)
+            queryset = TimeOffBalance.objects.all()
+        elif hasattr(user, 'employee'):
+            queryset = TimeOffBalance.objects.filter(employee=user.employee)
+        else:
+            queryset = TimeOffBalance.objects.none()
         
-        return TimeOffBalance.objects.none()
+        return plan_queryset(queryset, self.get_serializer_class())
     
     @action(detail=False, methods=['get'])
     def my_balance(self, request):
@@ -343,12 +349,13 @@ class DocumentViewSet(viewsets.ModelViewSet):
         user = self.request.user
         
         if user.role in ['admin', 'rh']:
-            return Document.objects.all()
-        
-        if hasattr(user, 'employee'):
-            return Document.objects.filter(employee=user.employee)
+            queryset = Document.objects.all()
+        elif hasattr(user, 'employee'):
+            queryset = Document.objects.filter(employee=user.employee)
+        else:
+            queryset = Document.objects.none()
         
-        return Document.objects.none()
+        return plan_queryset(queryset, self.get_serializer_class())
     
     def perform_create(self, serializer):
         """Créer un document"""
@@ -384,6 +391,11 @@ class DocumentViewSet(viewsets.ModelViewSet):
         documents = Document.objects.filter(employee=request.user.employee)
         serializer = DocumentSerializer(documents, many=True)
         return Response(serializer.data)
+    
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Télécharger le fichier (droits vérifiés par get_queryset ; plages et requêtes conditionnelles)"""
+        return serve_file(request, self.get_object().file, as_attachment=True)
 
 
 class NotificationViewSet(viewsets.ModelViewSet):
@@ -397,9 +409,11 @@ class NotificationViewSet(viewsets.ModelViewSet):
         user = self.request.user
         
         if hasattr(user, 'employee'):
-            return Notification.objects.filter(employee=user.employee)
+            queryset = Notification.objects.filter(employee=user.employee)
+        else:
+            queryset = Notification.objects.none()
         
-        return Notification.objects.none()
+        return plan_queryset(queryset, self.get_serializer_class())
     
     @action(detail=False, methods=['get'])
     def unread(self, request):
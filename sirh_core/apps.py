@@ -5,3 +5,8 @@ class SirhCoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'sirh_core'
     verbose_name = 'SIRH Core'
+
+    def ready(self):
+        from .stats_cache import connect_signals
+
+        connect_signals()
@@ -0,0 +1,314 @@
+"""
+Écriture différée du journal d'audit
+
+record() prépare l'entrée d'audit (utilisateur, objet, IP, horodatage) sans
+requête puis, selon AUDIT_LOG_MODE :
+    - 'async' (défaut) : les entrées d'une transaction sont gardées en
+      mémoire et insérées ensemble dans AuditOutbox à sa validation
+      (on_commit, une insertion par transaction ; une action annulée, ou
+      annulée avec son point de sauvegarde, n'est pas journalisée). Leurs
+      identifiants sont alors mis en file : un thread d'écriture vide la file
+      par lots de AUDIT_LOG_BATCH_SIZE, au plus tard AUDIT_LOG_FLUSH_INTERVAL
+      secondes après la première entrée en attente, en déplaçant les entrées
+      vers AuditLog (bulk_create puis suppression, dans une transaction) ; la
+      file est vidée à l'arrêt du processus. Seul un arrêt brutal entre la
+      validation et l'insertion dans AuditOutbox perd des entrées ;
+    - 'sync' : l'entrée est écrite immédiatement dans AuditLog (scripts ;
+      défaut pendant les tests).
+Un lot en échec reste dans AuditOutbox : il est repris par le thread
+d'écriture AUDIT_LOG_RETRY_INTERVAL secondes plus tard, comme les entrées
+laissées par un processus arrêté (reprises au démarrage du thread).
+Les types de contenu sont résolus au moment de l'écriture, pour tout le lot,
+depuis le cache de ContentTypeManager (une requête par modèle et par processus).
+AuditRequestMiddleware rend la requête en cours accessible aux enregistrements
+automatiques (sirh_core.tracking) pour l'utilisateur, l'IP et le navigateur.
+"""
+import atexit
+import contextvars
+import logging
+import queue
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import AuditLog, AuditOutbox
+
+
+logger = logging.getLogger(__name__)
+
+_current_request = contextvars.ContextVar('audit_request', default=None)
+
+
+class AuditRequestMiddleware:
+    """Requête en cours, pour les entrées d'audit enregistrées hors des vues"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _current_request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _current_request.reset(token)
+
+
+def current_request():
+    return _current_request.get()
+
+
+def current_user():
+    request = _current_request.get()
+    user = getattr(request, 'user', None)
+    return user if user is not None and user.is_authenticated else None
+
+
+def _client_ip(request):
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        return x_forwarded_for.split(',')[0]
+    return request.META.get('REMOTE_ADDR')
+
+
+def audit_event(user, action, obj=None, changes=None, request=None):
+    """Entrée d'audit à écrire (dict), construite sans requête"""
+    event = {
+        'user_id': getattr(user, 'pk', None),
+        'action': action,
+        'changes': changes or {},
+        'model': None,
+        'object_id': None,
+        'object_repr': '',
+        'ip_address': None,
+        'user_agent': '',
+        'timestamp': timezone.now(),
+    }
+    if obj is not None:
+        event['model'] = obj._meta.concrete_model
+        event['object_id'] = obj.pk
+        event['object_repr'] = str(obj)[:255]
+    if request is not None:
+        event['ip_address'] = _client_ip(request)
+        event['user_agent'] = request.META.get('HTTP_USER_AGENT', '')[:255]
+    return event
+
+
+def write_events(events):
+    """Écrire des entrées d'audit en lots (bulk_create)"""
+    models = {event['model'] for event in events if event['model'] is not None}
+    content_types = ContentType.objects.get_for_models(*models) if models else {}
+    logs = []
+    for event in events:
+        fields = dict(event)
+        model = fields.pop('model')
+        fields['content_type'] = content_types.get(model)
+        logs.append(AuditLog(**fields))
+    batch_size = getattr(settings, 'AUDIT_LOG_BATCH_SIZE', 200)
+    return AuditLog.objects.bulk_create(logs, batch_size=batch_size)
+
+
+def _outbox_entry(event):
+    fields = dict(event)
+    model = fields.pop('model')
+    return AuditOutbox(model=model._meta.label_lower if model is not None else '', **fields)
+
+
+def _outbox_event(entry):
+    return {
+        'user_id': entry.user_id,
+        'action': entry.action,
+        'changes': entry.changes,
+        'model': apps.get_model(entry.model) if entry.model else None,
+        'object_id': entry.object_id,
+        'object_repr': entry.object_repr,
+        'ip_address': entry.ip_address,
+        'user_agent': entry.user_agent,
+        'timestamp': entry.timestamp,
+    }
+
+
+def write_outbox(ids=None):
+    """
+    Déplacer des entrées en attente (toutes, ou celles de `ids`) vers AuditLog,
+    dans une transaction ; renvoie le nombre d'entrées écrites. Les entrées
+    déjà prises par un autre processus sont ignorées.
+    """
+    with transaction.atomic():
+        entries = AuditOutbox.objects.select_for_update(skip_locked=True).order_by('id')
+        if ids is not None:
+            entries = entries.filter(id__in=ids)
+        else:
+            entries = entries[:getattr(settings, 'AUDIT_LOG_BATCH_SIZE', 200)]
+        entries = list(entries)
+        if not entries:
+            return 0
+        write_events([_outbox_event(entry) for entry in entries])
+        AuditOutbox.objects.filter(id__in=[entry.id for entry in entries]).delete()
+    return len(entries)
+
+
+def drain_outbox():
+    """Écrire toutes les entrées en attente dans AuditLog (lots en échec, processus arrêtés)"""
+    written = 0
+    while True:
+        count = write_outbox()
+        if not count:
+            return written
+        written += count
+
+
+class _OutboxBatch:
+    """Entrées d'audit d'une transaction (ou d'un point de sauvegarde), insérées ensemble à sa validation"""
+
+    def __init__(self, buffer, entries=None):
+        self.buffer = buffer
+        self.entries = entries or []
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        AuditOutbox.objects.bulk_create(self.entries)
+        for entry in self.entries:
+            self.buffer.put(entry.id)
+
+
+def _outbox_batch():
+    """
+    Lot de la transaction en cours, pour le point de sauvegarde courant : le
+    rappel on_commit d'un point de sauvegarde annulé est abandonné par Django,
+    avec les entrées de son lot.
+    """
+    connection = transaction.get_connection()
+    registered = {id(func) for _, func, _ in connection.run_on_commit}
+    # Lots encore attendus (ni exécutés, ni abandonnés par une annulation)
+    batches = {
+        key: batch for key, batch in getattr(connection, 'audit_outbox_batches', {}).items()
+        if not batch.done and id(batch) in registered
+    }
+    connection.audit_outbox_batches = batches
+    key = tuple(connection.savepoint_ids)
+    if key not in batches:
+        batches[key] = _OutboxBatch(_buffer)
+        transaction.on_commit(batches[key])
+    return batches[key]
+
+
+class AuditBuffer:
+    """File des entrées d'audit validées (identifiants AuditOutbox), vidée par un thread d'écriture"""
+
+    def __init__(self, autostart=True):
+        self.autostart = autostart
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._retry = False
+
+    def put(self, entry_id):
+        self._queue.put(entry_id)
+        if self.autostart and self._thread is None:
+            self._start()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+                self._thread.start()
+
+    def _next_batch(self, first):
+        """Entrées en attente, jusqu'à la taille d'un lot ou l'échéance d'écriture"""
+        batch = [first]
+        batch_size = getattr(settings, 'AUDIT_LOG_BATCH_SIZE', 200)
+        deadline = time.monotonic() + getattr(settings, 'AUDIT_LOG_FLUSH_INTERVAL', 1.0)
+        while len(batch) < batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        try:
+            write_outbox(batch)
+        except Exception:
+            # Les entrées restent dans AuditOutbox : reprises plus tard (_drain)
+            self._retry = True
+            logger.exception("Écriture de %d entrée(s) d'audit impossible, nouvel essai différé", len(batch))
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def _drain(self):
+        self._retry = False
+        try:
+            drain_outbox()
+        except Exception:
+            self._retry = True
+            logger.exception("Reprise des entrées d'audit en attente impossible, nouvel essai différé")
+
+    def _run(self):
+        # Entrées laissées par un processus arrêté avant de les écrire
+        close_old_connections()
+        self._drain()
+        while True:
+            try:
+                first = self._queue.get(timeout=getattr(settings, 'AUDIT_LOG_RETRY_INTERVAL', 30.0))
+            except queue.Empty:
+                if self._retry:
+                    close_old_connections()
+                    self._drain()
+                continue
+            batch = self._next_batch(first)
+            # Connexion propre au thread d'écriture : rouverte si elle a expiré
+            close_old_connections()
+            self._write(batch)
+
+    def flush(self):
+        """Écrire tout de suite les entrées en attente, y compris le lot en cours du thread"""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._write(batch)
+        self._queue.join()
+        if self._retry:
+            self._drain()
+
+    @property
+    def pending(self):
+        return self._queue.qsize()
+
+
+_buffer = AuditBuffer()
+
+
+def record(user, action, obj=None, changes=None, request=None):
+    """Journaliser une action (écriture immédiate ou différée selon AUDIT_LOG_MODE)"""
+    event = audit_event(user, action, obj, changes, request or current_request())
+    if getattr(settings, 'AUDIT_LOG_MODE', 'async') == 'sync':
+        write_events([event])
+        return
+    entry = _outbox_entry(event)
+    if transaction.get_connection().in_atomic_block:
+        _outbox_batch().entries.append(entry)
+    else:
+        # Autocommit : l'action est déjà validée
+        _OutboxBatch(_buffer, [entry])()
+
+
+def flush():
+    """Écrire les entrées d'audit en attente (fin de commande, tests)"""
+    _buffer.flush()
+
+
+atexit.register(flush)
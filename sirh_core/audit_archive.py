@@ -0,0 +1,157 @@
+"""
+Rétention du journal d'audit : archives mensuelles compressées
+
+Les entrées plus anciennes que AUDIT_LOG_RETENTION_DAYS sont déplacées de la
+table AuditLog vers des fichiers JSON Lines compressés, un par mois
+(AUDIT_LOG_ARCHIVE_DIR/audit-AAAA-MM.jsonl.gz) :
+    - lecture par lots de AUDIT_LOG_ARCHIVE_CHUNK lignes, par clé (id > dernier
+      id lu), sans OFFSET ni chargement de toute la table ;
+    - chaque lot est ajouté aux fichiers de ses mois (un membre gzip par
+      lot, fichier synchronisé sur disque) puis supprimé de la table.
+Une interruption entre l'écriture et la suppression laisse au pire des
+entrées en double dans l'archive, ignorées à la lecture (même id).
+audit_logs_for_month() lit un mois de façon transparente : table et archive,
+page par page (clé (horodatage, id)) : seules les `limit` entrées de la page
+sont gardées en mémoire, l'archive étant parcourue en flux.
+"""
+import gzip
+import heapq
+import json
+import os
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import AuditLog
+
+
+ARCHIVED_FIELDS = [
+    'id', 'user_id', 'action', 'content_type_id', 'object_id', 'object_repr',
+    'changes', 'ip_address', 'user_agent', 'timestamp',
+]
+
+
+def archive_dir():
+    return getattr(settings, 'AUDIT_LOG_ARCHIVE_DIR', os.path.join(settings.BASE_DIR, 'archives', 'audit'))
+
+
+def archive_path(year, month):
+    return os.path.join(archive_dir(), f'audit-{year:04d}-{month:02d}.jsonl.gz')
+
+
+def archived_months():
+    """Mois archivés [(année, mois)], du plus ancien au plus récent"""
+    directory = archive_dir()
+    if not os.path.isdir(directory):
+        return []
+    months = []
+    for name in os.listdir(directory):
+        if name.startswith('audit-') and name.endswith('.jsonl.gz'):
+            year, month = name[len('audit-'):-len('.jsonl.gz')].split('-')
+            months.append((int(year), int(month)))
+    return sorted(months)
+
+
+def _month_of(timestamp):
+    local = timezone.localtime(timestamp) if timezone.is_aware(timestamp) else timestamp
+    return local.year, local.month
+
+
+def _append(year, month, rows):
+    path = archive_path(year, month)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'ab') as archive_file:
+        with gzip.GzipFile(fileobj=archive_file, mode='wb') as archive:
+            for row in rows:
+                # isoformat : DjangoJSONEncoder tronquerait les microsecondes
+                row = dict(row, timestamp=row['timestamp'].isoformat())
+                archive.write(json.dumps(row, cls=DjangoJSONEncoder).encode('utf-8') + b'\n')
+        archive_file.flush()
+        os.fsync(archive_file.fileno())
+
+
+def archive_audit_logs(before=None, chunk_size=None):
+    """
+    Archiver puis supprimer les entrées antérieures à `before` (par défaut :
+    maintenant moins AUDIT_LOG_RETENTION_DAYS). Retourne {(année, mois): nombre}.
+    """
+    if before is None:
+        before = timezone.now() - timedelta(days=getattr(settings, 'AUDIT_LOG_RETENTION_DAYS', 365))
+    chunk_size = chunk_size or getattr(settings, 'AUDIT_LOG_ARCHIVE_CHUNK', 1000)
+
+    archived = {}
+    last_id = 0
+    while True:
+        rows = list(
+            AuditLog.objects.filter(timestamp__lt=before, id__gt=last_id)
+            .order_by('id')
+            .values(*ARCHIVED_FIELDS)[:chunk_size]
+        )
+        if not rows:
+            break
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(_month_of(row['timestamp']), []).append(row)
+        for (year, month), month_rows in by_month.items():
+            _append(year, month, month_rows)
+            archived[(year, month)] = archived.get((year, month), 0) + len(month_rows)
+
+        ids = [row['id'] for row in rows]
+        with transaction.atomic():
+            AuditLog.objects.filter(id__in=ids).delete()
+        last_id = ids[-1]
+    return archived
+
+
+def read_archive(year, month):
+    """Entrées archivées d'un mois (dicts, horodatage en datetime), sans doublons"""
+    path = archive_path(year, month)
+    if not os.path.exists(path):
+        return
+    seen = set()
+    with gzip.open(path, 'rt', encoding='utf-8') as archive:
+        for line in archive:
+            row = json.loads(line)
+            if row['id'] in seen:
+                continue
+            seen.add(row['id'])
+            row['timestamp'] = parse_datetime(row['timestamp'])
+            yield row
+
+
+def _row_key(row):
+    return row['timestamp'], row['id']
+
+
+def audit_logs_for_month(year, month, limit=None, before=None, **filters):
+    """
+    Entrées d'un mois, de la table et de l'archive, les plus récentes
+    d'abord. `filters` : égalité sur les champs de ARCHIVED_FIELDS
+    (ex. action='update', user_id=3). `limit` : nombre d'entrées au plus ;
+    `before` : clé (horodatage, id) de la dernière entrée de la page
+    précédente, seules les entrées plus anciennes sont lues.
+    """
+    start = timezone.make_aware(datetime(year, month, 1))
+    end = timezone.make_aware(datetime(year + month // 12, month % 12 + 1, 1))
+    archived = (
+        row for row in read_archive(year, month)
+        if all(row.get(field) == value for field, value in filters.items())
+        and (before is None or _row_key(row) < before)
+    )
+    live = AuditLog.objects.filter(timestamp__gte=start, timestamp__lt=end, **filters).order_by('-timestamp', '-id')
+    if before is not None:
+        timestamp, row_id = before
+        live = live.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=row_id))
+    live = live.values(*ARCHIVED_FIELDS)
+    if limit is not None:
+        # Chaque entrée de la page figure parmi les `limit` premières de sa source
+        archived = heapq.nlargest(limit, archived, key=_row_key)
+        live = live[:limit]
+    rows = {row['id']: row for row in archived}
+    rows.update((row['id'], row) for row in live)
+    return sorted(rows.values(), key=_row_key, reverse=True)[:limit]
@@ -0,0 +1,156 @@
+"""
+Service des fichiers protégés (contrats, GED, documents du portail)
+
+Les vues vérifient les droits puis délèguent l'envoi à serve_file :
+    - ETag (taille + date de modification) et Last-Modified, requêtes
+      conditionnelles (If-None-Match, If-Modified-Since -> 304) ;
+    - plages d'octets (Range: bytes=début-fin, -suffixe ; If-Range),
+      réponse 206 lue par morceaux de FILE_CHUNK_SIZE, 416 si hors fichier ;
+    - fichier complet en flux (FileResponse, wsgi.file_wrapper si disponible).
+En production derrière nginx (FILE_SERVING_MODE = 'x-accel-redirect') ou
+Apache/lighttpd ('x-sendfile'), la réponse ne contient que l'en-tête de
+délégation : le serveur web envoie le fichier et gère lui-même plages et
+requêtes conditionnelles, les contrôles d'accès restant faits par Django.
+Exemple nginx (FILE_SERVING_ACCEL_PREFIX = '/protected-media/') :
+    location /protected-media/ { internal; alias /chemin/vers/media/; }
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+
+FILE_CHUNK_SIZE = 64 * 1024
+
+RANGE_HEADER = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _file_stat(field_file):
+    """Taille et date de modification (timestamp, ou None si le stockage ne la fournit pas)"""
+    storage = field_file.storage
+    try:
+        size = storage.size(field_file.name)
+    except (FileNotFoundError, OSError):
+        raise Http404('Fichier introuvable')
+    try:
+        modified = int(storage.get_modified_time(field_file.name).timestamp())
+    except (NotImplementedError, OSError):
+        modified = None
+    return size, modified
+
+
+def file_etag(size, modified):
+    return f'"{size:x}-{modified or 0:x}"'
+
+
+def parse_range(header, size):
+    """
+    Plage (début, fin incluse) demandée par l'en-tête Range, None pour le
+    fichier complet (absent, invalide ou plusieurs plages), ou 'unsatisfiable'.
+    """
+    match = RANGE_HEADER.match(header.replace(' ', '')) if header else None
+    if not match or not any(match.groups()):
+        return None
+    if size == 0:
+        return 'unsatisfiable'
+    first, last = match.groups()
+    if not first:
+        # Suffixe : les N derniers octets
+        length = int(last)
+        if length == 0:
+            return 'unsatisfiable'
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        return 'unsatisfiable'
+    return start, end
+
+
+def _range_applies(request, etag, modified):
+    """If-Range : la plage n'est servie que si le fichier n'a pas changé"""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return modified is not None and parse_http_date_safe(if_range) == modified
+
+
+def _read_range(field_file, start, length):
+    with field_file.storage.open(field_file.name, 'rb') as stream:
+        stream.seek(start)
+        while length > 0:
+            chunk = stream.read(min(FILE_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _offload(field_file, mode, content_type):
+    """Réponse vide déléguant l'envoi du fichier au serveur web"""
+    response = HttpResponse(content_type=content_type)
+    if mode == 'x-accel-redirect':
+        prefix = getattr(settings, 'FILE_SERVING_ACCEL_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(field_file.name)
+    else:
+        response['X-Sendfile'] = field_file.path
+    return response
+
+
+def serve_file(request, field_file, filename=None, as_attachment=False, content_type=None):
+    """
+    Réponse HTTP pour un FieldFile, après contrôle des droits par la vue appelante.
+    Lève Http404 si le fichier est absent du stockage.
+    """
+    if not field_file:
+        raise Http404('Fichier introuvable')
+    filename = filename or os.path.basename(field_file.name)
+    content_type = content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    disposition = content_disposition_header(as_attachment, filename)
+
+    mode = getattr(settings, 'FILE_SERVING_MODE', 'django')
+    if mode in ('x-accel-redirect', 'x-sendfile'):
+        response = _offload(field_file, mode, content_type)
+        response['Content-Disposition'] = disposition
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    size, modified = _file_stat(field_file)
+    etag = file_etag(size, modified)
+    response = get_conditional_response(request, etag=etag, last_modified=modified)
+    if response is None:
+        byte_range = None
+        if request.method == 'GET' and _range_applies(request, etag, modified):
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+
+        if byte_range == 'unsatisfiable':
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+        elif byte_range:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                _read_range(field_file, start, end - start + 1), status=206, content_type=content_type
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = str(end - start + 1)
+        else:
+            response = FileResponse(
+                field_file.storage.open(field_file.name, 'rb'), content_type=content_type
+            )
+            response['Content-Length'] = str(size)
+        response['Content-Disposition'] = disposition
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    if modified is not None:
+        response['Last-Modified'] = http_date(modified)
+    # Documents personnels : pas de cache partagé, revalidation à chaque accès
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,25 @@
+"""
+Management command pour archiver le journal d'audit ancien en fichiers mensuels compressés
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from sirh_core.audit_archive import archive_audit_logs, archive_path
+
+
+class Command(BaseCommand):
+    help = "Déplace les entrées d'audit plus anciennes que la durée de rétention vers les archives JSONL.gz"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Durée de rétention en jours (par défaut : AUDIT_LOG_RETENTION_DAYS)')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Entrées lues et supprimées par lot (par défaut : AUDIT_LOG_ARCHIVE_CHUNK)')
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else settings.AUDIT_LOG_RETENTION_DAYS
+        archived = archive_audit_logs(timezone.now() - timedelta(days=days), options['chunk_size'])
+        for (year, month), count in sorted(archived.items()):
+            self.stdout.write(f'{year:04d}-{month:02d} : {count} entrée(s) -> {archive_path(year, month)}')
+        self.stdout.write(self.style.SUCCESS(f"✅ {sum(archived.values())} entrée(s) d'audit archivée(s)"))
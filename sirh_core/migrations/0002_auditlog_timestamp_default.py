@@ -0,0 +1,19 @@
+# Generated by Django 4.2.8 on 2026-10-17 12:12
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sirh_core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditlog',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Horodatage'),
+        ),
+    ]
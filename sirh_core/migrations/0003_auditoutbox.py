@@ -0,0 +1,33 @@
+# Generated by Django 4.2.8 on 2026-10-17 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sirh_core', '0002_auditlog_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.BigIntegerField(blank=True, null=True)),
+                ('action', models.CharField(max_length=20)),
+                ('model', models.CharField(blank=True, max_length=100)),
+                ('object_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('object_repr', models.CharField(blank=True, max_length=255)),
+                ('changes', models.JSONField(blank=True, default=dict)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('user_agent', models.CharField(blank=True, max_length=255)),
+                ('timestamp', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': "Entrée d'audit en attente",
+                'verbose_name_plural': "Entrées d'audit en attente",
+                'ordering': ['id'],
+            },
+        ),
+    ]
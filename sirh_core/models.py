@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 from accounts.models import CustomUser
@@ -70,8 +71,9 @@ class AuditLog(models.Model):
         blank=True,
         verbose_name='User Agent'
     )
+    # Heure de l'action (et non de l'écriture différée par sirh_core.audit)
     timestamp = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
         verbose_name='Horodatage'
     )
     
@@ -89,6 +91,32 @@ class AuditLog(models.Model):
         return f"{self.user} - {self.get_action_display()} - {self.timestamp}"
 
 
+class AuditOutbox(models.Model):
+    """
+    Entrées d'audit enregistrées avec la transaction de l'action, en attente
+    d'écriture dans AuditLog par le thread d'écriture (sirh_core.audit)
+    """
+
+    user_id = models.BigIntegerField(null=True, blank=True)
+    action = models.CharField(max_length=20)
+    # Modèle de l'objet ('app_label.model'), résolu en type de contenu à l'écriture
+    model = models.CharField(max_length=100, blank=True)
+    object_id = models.PositiveIntegerField(null=True, blank=True)
+    object_repr = models.CharField(max_length=255, blank=True)
+    changes = models.JSONField(default=dict, blank=True)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    user_agent = models.CharField(max_length=255, blank=True)
+    timestamp = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Entrée d\'audit en attente'
+        verbose_name_plural = 'Entrées d\'audit en attente'
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.action} - {self.model} - {self.timestamp}"
+
+
 class SystemSetting(models.Model):
     """Paramètres système configurables"""
     
@@ -0,0 +1,192 @@
+"""
+Pagination des listes de l'API : par numéro de page ou par clé (curseur)
+
+OptionalCursorPagination garde la pagination par numéro de page (?page=)
+par défaut. Sur les vues qui déclarent `cursor_ordering` (un ordre stable,
+terminé par une clé unique, ex. ('-timestamp', '-id')), le paramètre
+?cursor=... ou ?pagination=cursor passe en pagination par clé
+(KeysetPagination) :
+    - ni COUNT(*) ni OFFSET : chaque page filtre sur les valeurs de tri de la
+      dernière ligne lue (WHERE (a, id) < (x, y), développé en OR/AND) puis
+      lit page_size + 1 lignes ; une page lointaine coûte autant que la
+      première ;
+    - ?count=approx ajoute l'en-tête X-Approximate-Count : estimation du
+      planificateur sous PostgreSQL, comptage plafonné ailleurs ("1000+").
+L'ordre du curseur prime sur ?ordering= en mode curseur.
+"""
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from uuid import UUID
+
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, PageNumberPagination, _reverse_ordering
+
+
+APPROXIMATE_COUNT_HEADER = 'X-Approximate-Count'
+
+
+def _cursor_value(value):
+    if isinstance(value, (date, datetime, time)):
+        # isoformat : DjangoJSONEncoder tronquerait les microsecondes
+        return value.isoformat()
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    return value
+
+
+def approximate_count(queryset, cap=1000):
+    """
+    Nombre approximatif de lignes : estimation de EXPLAIN sous PostgreSQL
+    (sans lire la table), sinon comptage plafonné à `cap` ("1000+" au-delà).
+    """
+    queryset = queryset.order_by()
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return str(plan[0]['Plan']['Plan Rows'])
+    count = queryset[:cap + 1].count()
+    return f'{cap}+' if count > cap else str(count)
+
+
+class KeysetPagination(CursorPagination):
+    """Pagination par clé sur `view.cursor_ordering` (champs liés `a__b` acceptés)"""
+
+    ordering = ('-pk',)
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    count_query_param = 'count'
+    approximate_count_cap = 1000
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', None) or self.ordering
+        if isinstance(ordering, str):
+            return (ordering,)
+        return tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.approximate_count = None
+        if request.query_params.get(self.count_query_param) == 'approx':
+            self.approximate_count = approximate_count(queryset, self.approximate_count_cap)
+
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self.cursor.position if self.cursor is not None else None
+
+        queryset = queryset.order_by(*(_reverse_ordering(self.ordering) if reverse else self.ordering))
+        if position is not None:
+            queryset = queryset.filter(self._after(position, reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def decode_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        if cursor is None or cursor.position is None:
+            return cursor
+        try:
+            position = json.loads(cursor.position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(offset=0, reverse=cursor.reverse, position=position)
+
+    def _after(self, position, reverse):
+        """Lignes situées après `position` dans l'ordre parcouru (comparaison de tuples)"""
+        condition = Q()
+        equal = Q()
+        for order, value in zip(self.ordering, position):
+            field = order.lstrip('-')
+            descending = order.startswith('-') != reverse
+            lookup = f'{field}__lt' if descending else f'{field}__gt'
+            condition |= equal & Q(**{lookup: value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            field = order.lstrip('-')
+            if isinstance(instance, dict):
+                value = instance[field]
+            else:
+                value = instance
+                for part in field.split('__'):
+                    value = getattr(value, part)
+            values.append(_cursor_value(value))
+        return json.dumps(values)
+
+    def _link(self, instance, reverse):
+        position = self._get_position_from_instance(instance, self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=reverse, position=position))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self._link(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.approximate_count is not None:
+            response[APPROXIMATE_COUNT_HEADER] = self.approximate_count
+        return response
+
+
+class OptionalCursorPagination(PageNumberPagination):
+    """Numéro de page par défaut ; pagination par clé sur demande (?cursor=, ?pagination=cursor)"""
+
+    cursor_pagination_class = KeysetPagination
+
+    def use_cursor(self, request, view):
+        if not getattr(view, 'cursor_ordering', None):
+            return False
+        params = request.query_params
+        return self.cursor_pagination_class.cursor_query_param in params or params.get('pagination') == 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.use_cursor(request, view):
+            self.cursor_paginator = self.cursor_pagination_class()
+            page = self.cursor_paginator.paginate_queryset(queryset, request, view)
+            self.display_page_controls = self.cursor_paginator.display_page_controls
+            return page
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.to_html()
+        return super().to_html()
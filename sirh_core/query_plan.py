@@ -0,0 +1,109 @@
+"""
+Plan de chargement des relations déduit des serializers
+
+plan_queryset() parcourt les champs d'un serializer (et de ses serializers
+imbriqués) et en déduit les relations lues à la sérialisation :
+    - clé étrangère / un-à-un : select_related (jointure, aucune requête) ;
+    - relation inverse / plusieurs-à-plusieurs (many=True) : Prefetch, dont
+      le queryset reçoit à son tour le plan du serializer imbriqué ;
+    - clé étrangère rendue par sa seule clé primaire : rien à charger.
+Une liste coûte ainsi un nombre fixe de requêtes, quel que soit le nombre de
+lignes. Le plan est calculé une fois par classe de serializer. Les
+SerializerMethodField ne sont pas analysés : ils ne doivent lire que des
+champs de l'objet (ou des relations déjà planifiées).
+"""
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework.relations import RelatedField
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+
+def _node(model):
+    return {'model': model, 'select': {}, 'prefetch': {}}
+
+
+def _loads_without_query(field, model_field):
+    """Clé étrangère rendue par son id (PrimaryKeyRelatedField) : lue sur la colonne, sans requête"""
+    return (
+        isinstance(field, RelatedField)
+        and field.use_pk_only_optimization()
+        and model_field.concrete
+        and not model_field.many_to_many
+    )
+
+
+def _walk_field(field, model, node):
+    attrs = field.source_attrs
+    for index, attr in enumerate(attrs):
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            # Propriété ou méthode du modèle
+            return
+        if not model_field.is_relation or model_field.related_model is None:
+            return
+        if index == len(attrs) - 1 and _loads_without_query(field, model_field):
+            return
+        many = model_field.one_to_many or model_field.many_to_many
+        model = model_field.related_model
+        node = node['prefetch' if many else 'select'].setdefault(attr, _node(model))
+
+    if isinstance(field, ListSerializer):
+        field = field.child
+    if isinstance(field, BaseSerializer):
+        _walk(field, model, node)
+
+
+def _walk(serializer, model, node):
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            if isinstance(field, BaseSerializer):
+                _walk(field, model, node)
+            continue
+        _walk_field(field, model, node)
+
+
+@lru_cache(maxsize=None)
+def serializer_plan(serializer_class):
+    """Arbre des relations lues par le serializer : {'model', 'select': {...}, 'prefetch': {...}}"""
+    serializer = serializer_class()
+    if isinstance(serializer, ListSerializer):
+        serializer = serializer.child
+    node = _node(serializer.Meta.model)
+    _walk(serializer, node['model'], node)
+    return node
+
+
+def _lookups(node, prefix=''):
+    """(chemins select_related, objets Prefetch) d'un nœud du plan"""
+    select, prefetch = [], []
+    for name, child in node['select'].items():
+        path = f'{prefix}{name}'
+        child_select, child_prefetch = _lookups(child, f'{path}__')
+        select.extend(child_select or [path])
+        prefetch.extend(child_prefetch)
+    for name, child in node['prefetch'].items():
+        child_select, child_prefetch = _lookups(child)
+        queryset = child['model']._default_manager.select_related(*child_select).prefetch_related(*child_prefetch)
+        prefetch.append(Prefetch(f'{prefix}{name}', queryset=queryset))
+    return select, prefetch
+
+
+def plan_queryset(queryset, serializer_class):
+    """Ajouter au queryset les select_related/prefetch_related requis par le serializer"""
+    select, prefetch = _lookups(serializer_plan(serializer_class))
+    seen = {
+        lookup if isinstance(lookup, str) else lookup.prefetch_to
+        for lookup in queryset._prefetch_related_lookups
+    }
+    # Un prefetch déjà déclaré par la vue est conservé tel quel
+    prefetch = [lookup for lookup in prefetch if lookup.prefetch_to not in seen]
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
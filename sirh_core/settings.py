@@ -1,4 +1,5 @@
 import os
+import sys
 from pathlib import Path
 from decouple import config
 
@@ -8,6 +9,9 @@ SECRET_KEY = config('SECRET_KEY', default='django-insecure-dev-key-change-in-pro
 
 DEBUG = config('DEBUG', default=True, cast=bool)
 
+# Exécution des tests (manage.py test, pytest)
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
 ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='localhost,127.0.0.1').split(',')
 
 # Internationalisation
@@ -59,6 +63,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'sirh_core.audit.AuditRequestMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -109,6 +114,10 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Envoi des fichiers protégés (sirh_core.files) : 'django', 'x-accel-redirect' (nginx) ou 'x-sendfile'
+FILE_SERVING_MODE = config('FILE_SERVING_MODE', default='django')
+FILE_SERVING_ACCEL_PREFIX = config('FILE_SERVING_ACCEL_PREFIX', default='/protected-media/')
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # REST Framework Configuration
@@ -119,7 +128,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'sirh_core.pagination.OptionalCursorPagination',
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.SearchFilter',
@@ -138,13 +147,60 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 # Cache (optimisation des tableaux de bord)
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'sirh-cache',
-        'TIMEOUT': 60,
+# Partagé entre les processus (Redis) si REDIS_URL est défini, sinon mémoire locale du processus
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'sirh',
+            'TIMEOUT': 60,
+        }
     }
-}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'sirh-cache',
+            'TIMEOUT': 60,
+        }
+    }
+
+# Planning : le repos quotidien minimal (11h) est signalé comme avertissement (validate-week,
+# import en masse) ; True le rend bloquant à l'enregistrement des assignations
+PLANNING_ENFORCE_DAILY_REST = config('PLANNING_ENFORCE_DAILY_REST', default=False, cast=bool)
+
+# Statistiques des tableaux de bord : durée de vie maximale (secondes) ; elles sont
+# invalidées à chaque modification des données de leur domaine (sirh_core.stats_cache)
+STATS_CACHE_TIMEOUT = config('STATS_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Export des bulletins de paie : processus de rendu PDF de la commande export_payslips (0 = nombre de CPU ;
+# l'export depuis l'interface rend sans pool de processus)
+PAYSLIP_EXPORT_WORKERS = config('PAYSLIP_EXPORT_WORKERS', default=0, cast=int)
+
+# Génération des CDD Word : squelettes compilés gardés par processus, et sur disque si un dossier est indiqué
+CONTRACT_TEMPLATE_CACHE_SIZE = config('CONTRACT_TEMPLATE_CACHE_SIZE', default=8, cast=int)
+CONTRACT_TEMPLATE_CACHE_DIR = config('CONTRACT_TEMPLATE_CACHE_DIR', default='')
+
+# Lots de contrats : processus de rendu de la commande run_contract_batches (0 = nombre de CPU),
+# exécution en arrière-plan (thread, rendu séquentiel) après la requête, et délai (secondes)
+# sans signe de vie au-delà duquel un lot « en cours » est repris par la commande
+CONTRACT_BATCH_WORKERS = config('CONTRACT_BATCH_WORKERS', default=0, cast=int)
+CONTRACT_BATCH_ASYNC = config('CONTRACT_BATCH_ASYNC', default=True, cast=bool)
+CONTRACT_BATCH_STALE_AFTER = config('CONTRACT_BATCH_STALE_AFTER', default=600, cast=int)
+
+# Journal d'audit : 'async' (entrées enregistrées avec la transaction puis écrites par lots)
+# ou 'sync' (défaut pendant les tests) ; délai (secondes) avant de reprendre un lot en échec
+AUDIT_LOG_MODE = config('AUDIT_LOG_MODE', default='sync' if TESTING else 'async')
+AUDIT_LOG_BATCH_SIZE = config('AUDIT_LOG_BATCH_SIZE', default=200, cast=int)
+AUDIT_LOG_FLUSH_INTERVAL = config('AUDIT_LOG_FLUSH_INTERVAL', default=1.0, cast=float)
+AUDIT_LOG_RETRY_INTERVAL = config('AUDIT_LOG_RETRY_INTERVAL', default=30.0, cast=float)
+
+# Rétention du journal d'audit : entrées plus anciennes archivées par mois en JSONL.gz (archive_audit_logs)
+AUDIT_LOG_RETENTION_DAYS = config('AUDIT_LOG_RETENTION_DAYS', default=365, cast=int)
+AUDIT_LOG_ARCHIVE_DIR = config('AUDIT_LOG_ARCHIVE_DIR', default=str(BASE_DIR / 'archives' / 'audit'))
+AUDIT_LOG_ARCHIVE_CHUNK = config('AUDIT_LOG_ARCHIVE_CHUNK', default=1000, cast=int)
 
 # Custom User Model
 AUTH_USER_MODEL = 'accounts.CustomUser'
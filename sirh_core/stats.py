@@ -0,0 +1,111 @@
+"""
+Compteurs des tableaux de bord (dashboard, panneau d'administration, API admin-dashboard)
+
+Chaque table est lue une seule fois avec des agrégats conditionnels
+(COUNT/SUM ... FILTER, ou CASE selon la base) ; les agrégats de toutes les
+tables sont réunis dans une seule requête SQL, en sous-requêtes jointes par
+CROSS JOIN : un aller-retour quel que soit le nombre de compteurs. Le
+résultat est mis en cache par versions de domaine (stats_cache).
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import Count, IntegerField, Q, Sum, Value
+
+from contracts.models import Contract
+from employees.models import Employee
+from payroll.models import Payroll
+from planning.models import Assignment, Shift
+from portal.models import LeaveRequest
+from timesheets.models import TimeSheet
+from vehicles.models import Vehicle
+from .stats_cache import STATS_DOMAINS, cached_stats
+
+
+MONEY_COUNTERS = ['salaries_month', 'salaries_month_validated', 'salaries_validated']
+
+CENTS = Decimal('0.01')
+
+
+def _table_counters(today):
+    """(queryset, {compteur: agrégat}) par table"""
+    this_month = Q(year=today.year, month=today.month)
+    validated = Q(status__in=['validated', 'paid'])
+    return [
+        (Employee.objects.all(), {
+            'employees_total': Count('id'),
+        }),
+        (Contract.objects.all(), {
+            'contracts_active': Count('id', filter=(
+                Q(status='active')
+                & (Q(end_date__isnull=True) | Q(end_date__gte=today))
+                & (Q(start_date__isnull=True) | Q(start_date__lte=today))
+            )),
+        }),
+        (Vehicle.objects.all(), {
+            'vehicles_total': Count('id'),
+            'vehicles_available': Count('id', filter=Q(status='available')),
+        }),
+        (Shift.objects.all(), {
+            'shifts_today': Count('id', filter=Q(date=today)),
+        }),
+        (Assignment.objects.filter(shift__date=today), {
+            'assignments_today': Count('id'),
+        }),
+        (TimeSheet.objects.all(), {
+            'timesheets_submitted': Count('id', filter=Q(status='submitted')),
+            'timesheets_submitted_month': Count('id', filter=Q(status='submitted') & this_month),
+        }),
+        (Payroll.objects.all(), {
+            'payrolls_calculated': Count('id', filter=Q(status='calculated')),
+            'salaries_month': Sum(
+                'net_salary', filter=this_month & Q(status__in=['calculated', 'validated', 'paid'])
+            ),
+            'salaries_month_validated': Sum('net_salary', filter=this_month & validated),
+            'salaries_validated': Sum('net_salary', filter=validated),
+        }),
+        (LeaveRequest.objects.all(), {
+            'leave_requests_pending': Count('id', filter=Q(status='pending')),
+        }),
+    ]
+
+
+def _aggregate(queryset, aggregates):
+    """Agrégats d'une table en une ligne (sans GROUP BY), sous forme de QuerySet compilable"""
+    return (
+        queryset.annotate(_all=Value(1, output_field=IntegerField()))
+        .values('_all')
+        .annotate(**aggregates)
+        .values(*aggregates)
+        .order_by()
+    )
+
+
+def admin_counters(today=None):
+    """Tous les compteurs des tableaux de bord, en une requête"""
+    today = today or date.today()
+    quote = connection.ops.quote_name
+    tables, names, columns, params = [], [], [], []
+    for index, (queryset, aggregates) in enumerate(_table_counters(today)):
+        sql, table_params = _aggregate(queryset, aggregates).query.sql_with_params()
+        alias = quote(f't{index}')
+        tables.append(f'({sql}) {alias}')
+        names.extend(aggregates)
+        columns.extend(f'{alias}.{quote(name)}' for name in aggregates)
+        params.extend(table_params)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {', '.join(columns)} FROM {' CROSS JOIN '.join(tables)}", params)
+        counters = dict(zip(names, cursor.fetchone()))
+
+    for name in MONEY_COUNTERS:
+        # SUM d'un DecimalField : float sous SQLite, Decimal sous PostgreSQL
+        counters[name] = Decimal(str(counters[name] or 0)).quantize(CENTS)
+    return counters
+
+
+def cached_admin_counters(today=None):
+    """Compteurs mis en cache jusqu'à la prochaine modification d'un domaine"""
+    today = today or date.today()
+    return cached_stats('admin_counters', list(STATS_DOMAINS), lambda: admin_counters(today), today.isoformat())
@@ -0,0 +1,100 @@
+"""
+Cache des statistiques des tableaux de bord, invalidé par domaine
+
+Chaque domaine (employés, planning, feuilles de temps, paie, flotte, congés)
+a un numéro de version stocké dans le cache Django. Une statistique est
+mise en cache sous une clé qui contient les versions des domaines dont elle
+dépend : tout enregistrement ou suppression d'un modèle du domaine
+(post_save / post_delete) incrémente sa version, les anciennes clés ne sont
+plus lues et expirent d'elles-mêmes. Les écritures en masse (bulk_create,
+bulk_update, QuerySet.update), qui n'envoient pas de signaux, appellent
+invalidate_stats explicitement.
+
+Avec Redis (REDIS_URL), versions et statistiques sont partagées par tous les
+processus : une statistique est calculée une fois par modification, et non
+une fois par processus et par minute.
+"""
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+
+# Modèles dont dépendent les statistiques de chaque domaine
+STATS_DOMAINS = {
+    'employees': ['employees.Employee', 'contracts.Contract'],
+    'planning': ['planning.Shift', 'planning.Assignment'],
+    'timesheets': ['timesheets.TimeSheet', 'timesheets.TimeSheetEntry'],
+    'payroll': ['payroll.Payroll'],
+    'fleet': ['vehicles.Vehicle'],
+    'leaves': ['portal.LeaveRequest'],
+}
+
+MODEL_DOMAINS = {label: domain for domain, labels in STATS_DOMAINS.items() for label in labels}
+
+VERSION_KEY = 'stats:version:{}'
+
+
+def domain_versions(domains):
+    """Versions courantes des domaines (une seule lecture du cache)"""
+    keys = [VERSION_KEY.format(domain) for domain in domains]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        # Version initiale horodatée : une version évincée du cache ne repart
+        # jamais d'une valeur déjà utilisée
+        for key in missing:
+            cache.add(key, time.time_ns(), timeout=None)
+        versions.update(cache.get_many(missing))
+    return [versions.get(key, 0) for key in keys]
+
+
+def bump_domains(*domains):
+    for domain in domains:
+        key = VERSION_KEY.format(domain)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def invalidate_stats(*domains):
+    """
+    Invalider les statistiques des domaines, tout de suite et à nouveau une fois
+    la transaction validée (un calcul concurrent a pu lire les données d'avant)
+    """
+    bump_domains(*domains)
+    transaction.on_commit(lambda: bump_domains(*domains))
+
+
+def cached_stats(name, domains, compute, *parts, timeout=None):
+    """
+    Statistique `name` pour les paramètres `parts`, calculée par compute()
+    si elle n'est pas en cache pour les versions courantes de ses domaines
+    """
+    versions = domain_versions(domains)
+    key = ':'.join(
+        ['stats', name]
+        + [str(part) for part in parts]
+        + [f'{domain}{version}' for domain, version in zip(domains, versions)]
+    )
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout or getattr(settings, 'STATS_CACHE_TIMEOUT', 3600))
+    return value
+
+
+def _model_changed(sender, **kwargs):
+    invalidate_stats(MODEL_DOMAINS[sender._meta.label])
+
+
+def connect_signals():
+    """Brancher post_save/post_delete des modèles de chaque domaine (SirhCoreConfig.ready)"""
+    for label in MODEL_DOMAINS:
+        model = apps.get_model(label)
+        post_save.connect(_model_changed, sender=model, dispatch_uid=f'stats_cache:save:{label}')
+        post_delete.connect(_model_changed, sender=model, dispatch_uid=f'stats_cache:delete:{label}')
@@ -0,0 +1,558 @@
+import itertools
+import os
+import tempfile
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from unittest import mock
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import DatabaseError, connection, transaction
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from contracts.models import ContractBatch
+from employees.models import Profession
+from payroll.models import Payroll, PayrollItem, SalaryScale
+from planning.models import ShiftType
+from portal.models import Document, LeaveRequest, Notification, TimeOffBalance
+from timesheets.models import AbsenceRecord
+from vehicles.models import Vehicle
+from tests.factories import (
+    AssignmentFactory, ContractFactory, EmployeeFactory, ShiftFactory, TimeSheetEntryFactory, TimeSheetFactory,
+    UserFactory, VehicleFactory,
+)
+from . import audit
+from .audit import AuditRequestMiddleware
+from .audit_archive import archive_audit_logs, archive_path, audit_logs_for_month, read_archive
+from .models import AuditLog, AuditOutbox, SystemSetting
+from .stats import admin_counters
+from .stats_cache import VERSION_KEY, cached_stats, domain_versions
+from .viewsets import log_action
+
+
+class StatsCacheTestCase(TestCase):
+    """Tests pour le cache des statistiques invalidé par domaine (sirh_core.stats_cache)"""
+
+    def setUp(self):
+        # Cache mémoire du processus : même contrat que Redis pour get/set/incr
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return {'calls': self.calls}
+
+    def test_invalidated_by_domain_changes(self):
+        """Une statistique est recalculée après une modification de son domaine, et seulement alors"""
+        self.assertEqual(cached_stats('test', ['fleet'], self.compute, 'day'), {'calls': 1})
+        self.assertEqual(cached_stats('test', ['fleet'], self.compute, 'day'), {'calls': 1})
+
+        UserFactory()
+        self.assertEqual(cached_stats('test', ['fleet'], self.compute, 'day'), {'calls': 1})
+
+        vehicle = VehicleFactory()
+        self.assertEqual(cached_stats('test', ['fleet'], self.compute, 'day'), {'calls': 2})
+        vehicle.delete()
+        self.assertEqual(cached_stats('test', ['fleet'], self.compute, 'day'), {'calls': 3})
+
+    def test_evicted_version_not_reused(self):
+        """Une version évincée du cache repart d'une valeur jamais utilisée"""
+        cached_stats('test', ['fleet'], self.compute)
+        previous = domain_versions(['fleet'])[0]
+        cache.delete(VERSION_KEY.format('fleet'))
+
+        self.assertNotEqual(domain_versions(['fleet'])[0], previous)
+        self.assertEqual(cached_stats('test', ['fleet'], self.compute), {'calls': 2})
+
+    def test_summary_cached_until_change(self):
+        """Le résumé admin est mis en cache et reflète immédiatement une modification"""
+        client = APIClient()
+        client.force_authenticate(UserFactory(role='rh'))
+        url = '/api/admin/admin-dashboard/summary/'
+
+        first = client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.data['vehicles']['total'], 0)
+
+        # Seule l'activité récente est relue
+        with self.assertNumQueries(1):
+            client.get(url)
+
+        VehicleFactory()
+        self.assertEqual(client.get(url).data['vehicles']['total'], 1)
+
+
+class AdminCountersTestCase(TestCase):
+    """Tests pour les compteurs des tableaux de bord (sirh_core.stats)"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.today = date(2026, 3, 2)
+        employee = EmployeeFactory()
+        ContractFactory(employee=employee)
+        VehicleFactory(status='available')
+        VehicleFactory(status='maintenance')
+        ShiftFactory(date=self.today)
+        ShiftFactory(date=date(2026, 3, 3))
+        # bulk_create : montants posés tels quels, sans calcul de la fiche
+        Payroll.objects.bulk_create([
+            Payroll(employee=employee, period='2026-02', year=2026, month=2, net_salary=Decimal('1000.50'), status='paid'),
+            Payroll(employee=EmployeeFactory(), period='2026-03', year=2026, month=3, net_salary=Decimal('800.25'), status='calculated'),
+        ])
+
+    def test_single_query(self):
+        """Tous les compteurs sont calculés en une requête"""
+        with self.assertNumQueries(1):
+            counters = admin_counters(self.today)
+
+        self.assertEqual(counters['employees_total'], 2)
+        self.assertEqual(counters['contracts_active'], 1)
+        self.assertEqual((counters['vehicles_total'], counters['vehicles_available']), (2, 1))
+        self.assertEqual(counters['shifts_today'], 1)
+        self.assertEqual(counters['assignments_today'], 0)
+        self.assertEqual(counters['payrolls_calculated'], 1)
+        self.assertEqual(counters['salaries_month'], Decimal('800.25'))
+        self.assertEqual(counters['salaries_month_validated'], Decimal('0.00'))
+        self.assertEqual(counters['salaries_validated'], Decimal('1000.50'))
+
+    def test_summary_query_count(self):
+        """Résumé admin : une requête pour les compteurs, une pour l'activité récente"""
+        client = APIClient()
+        client.force_authenticate(UserFactory(role='rh'))
+
+        with self.assertNumQueries(2):
+            response = client.get('/api/admin/admin-dashboard/summary/')
+        self.assertEqual(response.data['vehicles'], {'total': 2, 'available': 1})
+
+    def test_admin_panel(self):
+        """Le panneau d'administration affiche les compteurs partagés"""
+        self.client.force_login(UserFactory(role='admin'))
+        response = self.client.get('/admin-panel/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['stats']['available_vehicles'], 1)
+        self.assertEqual(response.context['stats']['total_payroll'], Decimal('1000.50'))
+
+    def test_admin_panel_audit_count_is_capped(self):
+        """Le nombre d'entrées d'audit est approximatif : comptage plafonné hors PostgreSQL"""
+        AuditLog.objects.bulk_create([AuditLog(action='view') for _ in range(1001)])
+        self.client.force_login(UserFactory(role='admin'))
+        response = self.client.get('/admin-panel/')
+
+        self.assertEqual(response.context['stats']['recent_audits'], '1000+')
+
+
+@override_settings(AUDIT_LOG_MODE='async')
+class AuditPipelineTestCase(TestCase):
+    """Tests pour l'écriture différée du journal d'audit (sirh_core.audit)"""
+
+    def setUp(self):
+        self.user = UserFactory(role='admin')
+        self.vehicles = [VehicleFactory() for _ in range(3)]
+        self.buffer = audit.AuditBuffer(autostart=False)
+        patcher = mock.patch.object(audit, '_buffer', self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(AUDIT_LOG_MODE='sync')
+    def test_sync_mode(self):
+        """En mode synchrone, l'entrée est écrite tout de suite avec l'objet et la requête"""
+        request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='10.0.0.1, 10.0.0.2', HTTP_USER_AGENT='Navigateur')
+        log_action(self.user, 'update', obj=self.vehicles[0], changes={'status': ['available', 'maintenance']}, request=request)
+
+        log = AuditLog.objects.get()
+        self.assertEqual(log.content_object, self.vehicles[0])
+        self.assertEqual(log.changes, {'status': ['available', 'maintenance']})
+        self.assertEqual((log.ip_address, log.user_agent), ('10.0.0.1', 'Navigateur'))
+
+    def test_buffered_until_commit_and_written_in_batch(self):
+        """Les entrées sont enregistrées et mises en file à la validation, puis écrites en lot"""
+        with self.captureOnCommitCallbacks(execute=True):
+            for vehicle in self.vehicles * 20:
+                log_action(self.user, 'update', obj=vehicle)
+            self.assertEqual(self.buffer.pending, 0)
+            self.assertFalse(AuditOutbox.objects.exists())
+        self.assertEqual(AuditOutbox.objects.count(), 60)
+        self.assertEqual(self.buffer.pending, 60)
+        self.assertFalse(AuditLog.objects.exists())
+
+        # Transaction, lecture, type de contenu, insertion, suppression
+        ContentType.objects.clear_cache()
+        with self.assertNumQueries(6):
+            audit.flush()
+        self.assertEqual(AuditLog.objects.filter(content_type__model='vehicle').count(), 60)
+        self.assertFalse(AuditOutbox.objects.exists())
+
+        # Types de contenu gardés en cache
+        with self.captureOnCommitCallbacks(execute=True):
+            log_action(self.user, 'delete', obj=self.vehicles[0])
+        with self.assertNumQueries(5):
+            audit.flush()
+
+    def test_rolled_back_action_not_logged(self):
+        """Une action annulée avec sa transaction n'est pas journalisée"""
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    log_action(self.user, 'delete', obj=self.vehicles[0])
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(self.buffer.pending, 0)
+        self.assertFalse(AuditOutbox.objects.exists())
+
+        # Point de sauvegarde annulé : seules ses entrées sont abandonnées
+        with self.captureOnCommitCallbacks(execute=True):
+            log_action(self.user, 'update', obj=self.vehicles[0])
+            try:
+                with transaction.atomic():
+                    log_action(self.user, 'delete', obj=self.vehicles[1])
+                    raise ValueError
+            except ValueError:
+                pass
+            log_action(self.user, 'update', obj=self.vehicles[2])
+        self.assertEqual(
+            sorted(AuditOutbox.objects.values_list('object_id', flat=True)),
+            sorted([self.vehicles[0].pk, self.vehicles[2].pk])
+        )
+
+    def test_one_outbox_insert_per_transaction(self):
+        """N enregistrements suivis coûtent N mises à jour et une seule insertion d'audit"""
+        def audited_saves(count):
+            vehicles = [Vehicle.objects.get(pk=VehicleFactory().pk) for _ in range(count)]
+            with CaptureQueriesContext(connection) as queries:
+                with self.captureOnCommitCallbacks(execute=True):
+                    for vehicle in vehicles:
+                        vehicle.notes = 'Révision'
+                        vehicle.save()
+            return len(queries)
+
+        self.assertEqual(audited_saves(3), 3 + 1)
+        self.assertEqual(audited_saves(20), 20 + 1)
+        self.assertEqual(AuditOutbox.objects.count(), 23)
+
+    def test_failed_batch_kept_and_retried(self):
+        """Un lot en échec reste en attente et est écrit au passage suivant"""
+        with self.captureOnCommitCallbacks(execute=True):
+            for vehicle in self.vehicles:
+                log_action(self.user, 'update', obj=vehicle)
+
+        with mock.patch.object(audit, 'write_events', side_effect=DatabaseError('base indisponible')):
+            with self.assertLogs('sirh_core.audit', 'ERROR'):
+                self.buffer._write([self.buffer._queue.get_nowait() for _ in range(3)])
+        self.assertEqual(AuditOutbox.objects.count(), 3)
+
+        audit.flush()
+        self.assertEqual(AuditLog.objects.count(), 3)
+        self.assertFalse(AuditOutbox.objects.exists())
+
+    def test_entries_left_by_stopped_process_are_drained(self):
+        """Les entrées validées mais jamais mises en file (arrêt brutal) sont reprises"""
+        event = audit.audit_event(self.user, 'update', self.vehicles[0], {'status': ['available', 'maintenance']})
+        audit._outbox_entry(event).save()
+        self.assertEqual(self.buffer.pending, 0)
+
+        self.assertEqual(audit.drain_outbox(), 1)
+        log = AuditLog.objects.get()
+        self.assertEqual(log.content_object, self.vehicles[0])
+        self.assertEqual(log.changes, {'status': ['available', 'maintenance']})
+        self.assertFalse(AuditOutbox.objects.exists())
+
+
+class TrackedModelTestCase(TestCase):
+    """Tests pour le suivi des champs modifiés (sirh_core.tracking)"""
+
+    def setUp(self):
+        self.vehicle = Vehicle.objects.get(pk=VehicleFactory(status='available', current_mileage=1000).pk)
+
+    def test_unchanged_save_skipped(self):
+        """Un enregistrement sans modification n'écrit rien"""
+        with self.assertNumQueries(0):
+            self.vehicle.save()
+        self.assertFalse(AuditLog.objects.exists())
+
+    def test_only_changed_columns_written(self):
+        """Seules les colonnes modifiées sont écrites, et la différence est journalisée"""
+        self.vehicle.status = 'maintenance'
+        with CaptureQueriesContext(connection) as queries:
+            self.vehicle.save()
+        update = queries.captured_queries[0]['sql']
+        self.assertIn('"status"', update)
+        self.assertIn('"updated_at"', update)
+        self.assertNotIn('"current_mileage"', update)
+
+        log = AuditLog.objects.get()
+        self.assertEqual((log.action, log.object_id), ('update', self.vehicle.pk))
+        self.assertEqual(log.changes, {'status': ['available', 'maintenance']})
+
+        # Nouvel état de référence après l'enregistrement
+        with self.assertNumQueries(0):
+            self.vehicle.save()
+
+    def test_fields_left_out_of_update_fields_stay_changed(self):
+        """Un champ modifié mais absent de update_fields est écrit et journalisé au save() suivant"""
+        self.vehicle.notes = 'Rayure portière'
+        self.vehicle.status = 'maintenance'
+        self.vehicle.save(update_fields=['status'])
+        self.assertEqual(Vehicle.objects.get(pk=self.vehicle.pk).notes, '')
+
+        self.vehicle.save()
+        self.assertEqual(Vehicle.objects.get(pk=self.vehicle.pk).notes, 'Rayure portière')
+        self.assertEqual(AuditLog.objects.get().changes, {'notes': ['', 'Rayure portière']})
+
+    def test_user_from_request_and_masked_fields(self):
+        """L'utilisateur de la requête est journalisé, les champs sensibles masqués"""
+        user = UserFactory(role='rh')
+        employee = EmployeeFactory()
+        employee.refresh_from_db()
+
+        def view(request):
+            employee.social_security_number = '299017512345678'
+            employee.city = 'Rennes'
+            employee.save()
+
+        request = RequestFactory().post('/')
+        request.user = user
+        AuditRequestMiddleware(view)(request)
+
+        log = AuditLog.objects.get()
+        self.assertEqual(log.user, user)
+        self.assertEqual(log.changes['social_security_number'], ['***', '***'])
+        self.assertEqual(log.changes['city'][1], 'Rennes')
+
+
+class AuditArchiveTestCase(TestCase):
+    """Tests pour l'archivage mensuel du journal d'audit (sirh_core.audit_archive)"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        archive_settings = override_settings(AUDIT_LOG_ARCHIVE_DIR=directory.name)
+        archive_settings.enable()
+        self.addCleanup(archive_settings.disable)
+
+        self.user = UserFactory(role='admin')
+        AuditLog.objects.bulk_create([
+            AuditLog(user=self.user, action=action, timestamp=timezone.make_aware(moment), changes={'n': index})
+            for index, (action, moment) in enumerate([
+                ('update', datetime(2025, 1, 10, 8, 0, 0, 123456)),
+                ('delete', datetime(2025, 1, 20, 9, 0)),
+                ('update', datetime(2025, 2, 3, 10, 0)),
+                ('login', datetime(2025, 2, 28, 23, 30)),
+                ('update', datetime(2025, 3, 1, 0, 30)),
+            ])
+        ])
+
+    def test_archive_by_month_in_chunks(self):
+        """Les entrées anciennes passent, par lots, dans une archive par mois"""
+        before = timezone.make_aware(datetime(2025, 3, 1))
+        self.assertEqual(archive_audit_logs(before, chunk_size=2), {(2025, 1): 2, (2025, 2): 2})
+
+        self.assertEqual(AuditLog.objects.count(), 1)
+        self.assertTrue(os.path.exists(archive_path(2025, 1)))
+        january = list(read_archive(2025, 1))
+        self.assertEqual([row['action'] for row in january], ['update', 'delete'])
+        self.assertEqual(january[0]['timestamp'], timezone.make_aware(datetime(2025, 1, 10, 8, 0, 0, 123456)))
+
+    def test_month_query_reads_archive_and_table(self):
+        """La lecture d'un mois combine archive et table, sans doublon"""
+        logs = list(AuditLog.objects.order_by('id'))
+        before = timezone.make_aware(datetime(2025, 2, 15))
+        archive_audit_logs(before)
+        # Interruption simulée : entrée archivée deux fois, puis encore présente dans la table
+        AuditLog.objects.bulk_create([logs[2]])
+        archive_audit_logs(before)
+        AuditLog.objects.bulk_create([logs[2]])
+
+        february = audit_logs_for_month(2025, 2)
+        self.assertEqual([row['id'] for row in february], [logs[3].id, logs[2].id])
+        self.assertEqual([row['id'] for row in audit_logs_for_month(2025, 1, action='delete')], [logs[1].id])
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/admin/audit-logs/month/', {'month': '2025-01'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(response.data['archived_months'], ['2025-01', '2025-02'])
+        self.assertEqual(client.get('/api/admin/audit-logs/month/', {'month': '2025-13'}).status_code, 400)
+
+    def test_month_query_paginated(self):
+        """La lecture d'un mois est paginée par clé, sur l'archive et la table confondues"""
+        AuditLog.objects.bulk_create([
+            AuditLog(user=self.user, action='view', timestamp=timezone.make_aware(datetime(2025, 2, day, 12)))
+            for day in range(1, 8)
+        ])
+        archive_audit_logs(timezone.make_aware(datetime(2025, 2, 4)))
+        expected = [row['id'] for row in audit_logs_for_month(2025, 2)]
+        self.assertEqual(len(expected), 9)
+        self.assertEqual(audit_logs_for_month(2025, 2, limit=3)[-1]['id'], expected[2])
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        ids, params = [], {'month': '2025-02', 'page_size': 4}
+        response = client.get('/api/admin/audit-logs/month/', params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 4)
+            ids.extend(row['id'] for row in response.data['results'])
+            if not response.data['next']:
+                break
+            response = client.get(response.data['next'])
+        self.assertEqual(ids, expected)
+
+        invalid = dict(params, cursor='invalide')
+        self.assertEqual(client.get('/api/admin/audit-logs/month/', invalid).status_code, 400)
+
+
+
+class KeysetPaginationTestCase(TestCase):
+    """Tests pour la pagination par clé des listes de l'API (sirh_core.pagination)"""
+
+    def setUp(self):
+        self.user = UserFactory(role='admin')
+        # Horodatages en double : l'id départage les lignes
+        AuditLog.objects.bulk_create([
+            AuditLog(user=self.user, action='update', timestamp=timezone.make_aware(datetime(2025, 1, 1 + index // 3)))
+            for index in range(23)
+        ])
+        self.expected = list(AuditLog.objects.order_by('-timestamp', '-id').values_list('id', flat=True))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_walk_pages_with_constant_queries(self):
+        """Toutes les lignes sont parcourues une fois, chaque page en autant de requêtes"""
+        url, params = '/api/admin/audit-logs/', {'pagination': 'cursor', 'page_size': 5}
+        ids, query_counts, pages = [], set(), []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            query_counts.add(len(queries))
+            pages.append(response.data)
+            ids.extend(row['id'] for row in response.data['results'])
+            url, params = response.data['next'], None
+
+        self.assertEqual(ids, self.expected)
+        self.assertEqual(len(pages), 5)
+        self.assertEqual(len(query_counts), 1)
+        self.assertFalse(any('OFFSET' in query['sql'] or 'COUNT(' in query['sql'] for query in queries.captured_queries))
+
+        previous = self.client.get(pages[2]['previous'])
+        self.assertEqual(previous.data['results'], pages[1]['results'])
+        self.assertIsNotNone(previous.data['previous'])
+
+    def test_approximate_count_and_page_number_default(self):
+        """En-tête de comptage approximatif sur demande ; pagination par numéro de page par défaut"""
+        response = self.client.get('/api/admin/audit-logs/', {'pagination': 'cursor', 'count': 'approx'})
+        self.assertEqual(response['X-Approximate-Count'], '23')
+        self.assertNotIn('X-Approximate-Count', self.client.get('/api/admin/audit-logs/', {'pagination': 'cursor'}))
+
+        response = self.client.get('/api/admin/audit-logs/', {'page': 2})
+        self.assertEqual(response.data['count'], 23)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(self.client.get('/api/admin/audit-logs/', {'cursor': 'invalide'}).status_code, 404)
+
+    def test_related_field_ordering(self):
+        """Ordre du curseur sur un champ lié (affectations par date de service)"""
+        shifts = [ShiftFactory(date=date(2025, 1, day)) for day in (1, 2, 3)]
+        for shift in [shifts[0]] + shifts:
+            AssignmentFactory(shift=shift)
+        client = APIClient()
+        client.force_authenticate(UserFactory(role='rh'))
+        first = client.get('/api/planning/assignments/', {'pagination': 'cursor', 'page_size': 3})
+        second = client.get(first.data['next'])
+        self.assertEqual(len(first.data['results']), 3)
+        self.assertEqual(len(second.data['results']), 1)
+        self.assertIsNone(second.data['next'])
+
+
+class ListQueryCountTestCase(TestCase):
+    """Nombre de requêtes des listes de l'API indépendant du nombre de lignes (sirh_core.query_plan)"""
+
+    def setUp(self):
+        self.user = UserFactory(role='admin')
+        self.employee = EmployeeFactory(user=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.sequence = itertools.count(1)
+
+    def assertConstantQueries(self, url, make):
+        make()
+        with CaptureQueriesContext(connection) as one_row:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        make()
+        make()
+        with CaptureQueriesContext(connection) as three_rows:
+            response = self.client.get(url)
+        self.assertGreaterEqual(len(response.data['results']), 3)
+        self.assertEqual(len(three_rows), len(one_row))
+
+    def day(self):
+        return date(2026, 1, 1) + timedelta(days=next(self.sequence))
+
+    def make_assignment(self):
+        return AssignmentFactory(shift=ShiftFactory(date=self.day(), created_by=UserFactory()), vehicle=VehicleFactory())
+
+    def make_payroll(self):
+        payroll = Payroll.objects.create(employee=EmployeeFactory(), period='2026-03', year=2026, month=3)
+        PayrollItem.objects.create(payroll=payroll, item_type='bonus', description='Prime', amount=Decimal('10'))
+
+    def make_choice(self, model, field, **fields):
+        choices = [value for value, _ in model._meta.get_field(field).choices]
+        model.objects.create(**{field: choices[next(self.sequence) % len(choices)]}, **fields)
+
+    def test_list_endpoints(self):
+        """Chaque liste : mêmes requêtes pour une ou trois lignes"""
+        endpoints = {
+            '/api/auth/users/': lambda: UserFactory(),
+            '/api/employees/': lambda: EmployeeFactory(),
+            '/api/employees/professions/': lambda: self.make_choice(Profession, 'code', label='Métier'),
+            '/api/contracts/': lambda: ContractFactory(batch=ContractBatch.objects.create(created_by=self.user)),
+            '/api/contracts/batches/': lambda: ContractFactory(batch=ContractBatch.objects.create(created_by=self.user)),
+            '/api/vehicles/': lambda: VehicleFactory(),
+            '/api/planning/shift-types/': lambda: self.make_choice(
+                ShiftType, 'name', start_hour=time(8), end_hour=time(16),
+            ),
+            '/api/planning/shifts/': self.make_assignment,
+            '/api/planning/assignments/': self.make_assignment,
+            '/api/timesheets/timesheets/': lambda: TimeSheetEntryFactory(
+                timesheet=TimeSheetFactory(approved_by=UserFactory()), assignment=self.make_assignment(),
+            ),
+            '/api/timesheets/entries/': lambda: TimeSheetEntryFactory(assignment=self.make_assignment()),
+            '/api/timesheets/absences/': lambda: AbsenceRecord.objects.create(
+                employee=EmployeeFactory(), date_start=self.day(), date_end=self.day(), absence_type='sick',
+            ),
+            '/api/payroll/salary-scales/': lambda: SalaryScale.objects.create(
+                name=f'Grille {next(self.sequence)}', level='qualified', base_rate=Decimal('12'),
+            ),
+            '/api/payroll/payrolls/': self.make_payroll,
+            '/api/payroll/items/': self.make_payroll,
+            '/api/portal/leave-requests/': lambda: LeaveRequest.objects.create(
+                employee=EmployeeFactory(), approved_by=EmployeeFactory(), leave_type='vacation',
+                start_date=self.day(), end_date=self.day(), days_requested=Decimal('1'), reason='Congés',
+            ),
+            '/api/portal/time-off-balances/': lambda: TimeOffBalance.objects.create(employee=EmployeeFactory()),
+            '/api/portal/documents/': lambda: Document.objects.create(
+                employee=EmployeeFactory(), uploaded_by=EmployeeFactory(), document_type='other',
+                title='Attestation', file='documents/attestation.pdf',
+            ),
+            '/api/portal/notifications/': lambda: Notification.objects.create(
+                employee=self.employee, title='Info', message='Message',
+            ),
+            '/api/admin/audit-logs/': lambda: AuditLog.objects.create(user=UserFactory(), action='update'),
+            '/api/admin/system-settings/': lambda: SystemSetting.objects.create(
+                key=f'setting_{next(self.sequence)}', value='1',
+            ),
+        }
+        for url, make in endpoints.items():
+            with self.subTest(url=url):
+                self.assertConstantQueries(url, make)
@@ -0,0 +1,128 @@
+"""
+Suivi des modifications champ par champ pour le journal d'audit
+
+TrackedModelMixin garde les valeurs des champs chargés depuis la base
+(from_db, refresh_from_db) et après chaque enregistrement. À l'enregistrement
+d'un objet existant :
+    - aucun champ modifié : rien n'est écrit (ni requête, ni signal) ;
+    - sinon, sans update_fields explicite, seules les colonnes modifiées
+      (et les champs auto_now) sont écrites, et la différence
+      {champ: [avant, après]} est envoyée au journal d'audit (sirh_core.audit)
+      avec l'utilisateur de la requête en cours (AuditRequestMiddleware).
+Aucune relecture de la ligne n'est faite. Les champs de AUDIT_MASKED_FIELDS
+sont journalisés masqués, ceux de AUDIT_EXCLUDED_FIELDS ne le sont pas.
+"""
+import copy
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.db.models import JSONField
+from django.db.models.fields.files import FieldFile
+
+
+MASK = '***'
+
+
+def _snapshot_value(field, instance):
+    value = getattr(instance, field.attname)
+    if isinstance(value, FieldFile):
+        return value.name
+    if isinstance(field, JSONField):
+        # Les listes/dicts peuvent être modifiés sur place
+        return copy.deepcopy(value)
+    return value
+
+
+def _audit_value(value):
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class TrackedModelMixin:
+    """Mixin de modèle : enregistrement des seuls champs modifiés et différence envoyée à l'audit"""
+
+    AUDIT_EXCLUDED_FIELDS = ('created_at', 'updated_at')
+    AUDIT_MASKED_FIELDS = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_fields()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self._snapshot_fields(fields)
+
+    def _tracked_fields(self):
+        deferred = self.get_deferred_fields()
+        return [
+            field for field in self._meta.concrete_fields
+            if not field.primary_key and field.attname not in deferred
+        ]
+
+    def _snapshot_fields(self, names=None):
+        if names is None or not hasattr(self, '_loaded_values'):
+            self._loaded_values = {}
+        for field in self._tracked_fields():
+            if names is None or field.name in names or field.attname in names:
+                self._loaded_values[field.attname] = _snapshot_value(field, self)
+        self._loaded_pk = self.pk
+
+    def changed_fields(self):
+        """{champ: (valeur chargée, valeur actuelle)} des champs modifiés depuis le chargement"""
+        loaded = getattr(self, '_loaded_values', {})
+        changes = {}
+        for field in self._tracked_fields():
+            if field.attname not in loaded:
+                continue
+            current = _snapshot_value(field, self)
+            if current != loaded[field.attname]:
+                changes[field.name] = (loaded[field.attname], current)
+        return changes
+
+    def save(self, *args, **kwargs):
+        tracked = (
+            hasattr(self, '_loaded_values')
+            and not self._state.adding
+            and self.pk is not None
+            and self.pk == self._loaded_pk
+            and not args
+            and not kwargs.get('force_insert')
+        )
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = update_fields = list(update_fields)
+        if not tracked or update_fields is not None:
+            super().save(*args, **kwargs)
+            # Champs non enregistrés : toujours modifiés pour le prochain save()
+            self._snapshot_fields(update_fields if tracked else None)
+            return
+
+        changes = self.changed_fields()
+        if not changes:
+            return
+        auto_now = [
+            field.name for field in self._meta.concrete_fields if getattr(field, 'auto_now', False)
+        ]
+        kwargs['update_fields'] = list(changes) + [name for name in auto_now if name not in changes]
+        super().save(**kwargs)
+        self._snapshot_fields()
+        self._audit_changes(changes)
+
+    def _audit_changes(self, changes):
+        from .audit import current_user, record
+
+        diff = {}
+        for name, (before, after) in changes.items():
+            if name in self.AUDIT_EXCLUDED_FIELDS:
+                continue
+            if name in self.AUDIT_MASKED_FIELDS:
+                diff[name] = [MASK, MASK]
+            else:
+                diff[name] = [_audit_value(before), _audit_value(after)]
+        if diff:
+            record(current_user(), 'update', obj=self, changes=diff)
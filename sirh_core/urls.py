@@ -10,7 +10,7 @@ from .views import home
 from .views_app import (
     login_view, logout_view, dashboard, employee_portal,
     employees_view, planning_view, timesheets_view,
-    payroll_view, payroll_create, payroll_detail, payroll_export, payroll_delete, contracts_view, vehicles_view, admin_panel,
+    payroll_view, payroll_create, payroll_detail, payroll_export, payroll_period_export, payroll_delete, contracts_view, vehicles_view, admin_panel,
     employee_create, employee_edit, employee_delete,
     shift_create, shift_edit, shift_delete,
     timesheet_create, timesheet_edit, timesheet_delete, timesheet_auto_fill,
@@ -66,6 +66,7 @@ urlpatterns = [
     path('payroll/settings/', payroll_settings_view, name='payroll_settings'),
     path('payroll/report/', financial_report, name='financial_report'),
     path('payroll/create/', payroll_create, name='payroll_create'),
+    path('payroll/export/', payroll_period_export, name='payroll_period_export'),
     path('payroll/<int:payroll_id>/detail/', payroll_detail, name='payroll_detail'),
     path('payroll/<int:payroll_id>/export/', payroll_export, name='payroll_export'),
     path('payroll/<int:payroll_id>/delete/', payroll_delete, name='payroll_delete'),
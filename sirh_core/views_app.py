@@ -1,7 +1,5 @@
 
-from collections import defaultdict
 from django.contrib.auth.decorators import login_required
-from django.core.cache import cache
 from sirh_core.decorators import admin_required, employee_required
 from django.test import RequestFactory
 
@@ -169,6 +167,16 @@ from payroll.models import Payroll, PayrollItem
 from vehicles.models import Vehicle
 from sirh_core.models import AuditLog, SystemSetting
 from sirh_core.decorators import admin_required, employee_required
+from sirh_core.files import serve_file
+from employees.compliance import pending_documents_count
+from sirh_core.pagination import approximate_count
+from sirh_core.stats import cached_admin_counters
+
+
+# Nombre de jours affichés par page du planning
+PLANNING_WINDOW_DAYS = 7
+
+DOCX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
 
 
 def home(request):
@@ -215,58 +223,18 @@ def dashboard(request):
     # Récupérer les statistiques (pour admins/managers)
     upcoming_30_days = today + timedelta(days=30)
     
-    cache_key = f"dashboard_stats:{current_year}-{current_month}"
-    stats = cache.get(cache_key)
-    if not stats:
-        stats = {
-            'employees': Employee.objects.count(),
-            'shifts_today': Shift.objects.filter(date=today).count(),
-            'assignments_today': Assignment.objects.filter(
-                shift__date=today
-            ).count(),
-            'timesheets_pending': TimeSheet.objects.filter(
-                status='submitted',
-                year=current_year,
-                month=current_month
-            ).count(),
-            'payrolls_pending': Payroll.objects.filter(
-                status='calculated'
-            ).count(),
-            'total_salaries': round(float(Payroll.objects.filter(
-                year=current_year,
-                month=current_month,
-                status__in=['calculated', 'validated', 'paid']
-            ).aggregate(total=Sum('net_salary'))['total'] or 0), 2),
-        }
-        cache.set(cache_key, stats, timeout=60)
-
-    required_document_types = {
-        'contract',
-        'id_card',
-        'diploma',
-        'attestation',
-        'cpam_attestation',
-        'rib',
-        'driving_license',
-        'dpae',
+    counters = cached_admin_counters(today)
+    stats = {
+        'employees': counters['employees_total'],
+        'shifts_today': counters['shifts_today'],
+        'assignments_today': counters['assignments_today'],
+        'timesheets_pending': counters['timesheets_submitted_month'],
+        'payrolls_pending': counters['payrolls_calculated'],
+        'total_salaries': round(float(counters['salaries_month']), 2),
     }
-    active_employee_ids = list(
-        Employee.objects.filter(status='active').values_list('id', flat=True)
-    )
-    documents_by_employee = defaultdict(set)
-    if active_employee_ids:
-        documents_qs = EmployeeDocument.objects.filter(
-            employee_id__in=active_employee_ids,
-            document_type__in=required_document_types
-        ).values_list('employee_id', 'document_type')
-        for employee_id, document_type in documents_qs:
-            documents_by_employee[employee_id].add(document_type)
-    pending_documents = 0
-    for employee_id in active_employee_ids:
-        pending_documents += len(
-            required_document_types - documents_by_employee.get(employee_id, set())
-        )
-    stats['documents_pending'] = pending_documents
+
+    # Pièces obligatoires manquantes : table tenue à jour par employees.compliance
+    stats['documents_pending'] = pending_documents_count()
     
     # Visites médicales urgentes (à faire dans les 30 prochains jours)
     urgent_medical_visits = MedicalVisit.objects.filter(
@@ -586,20 +554,29 @@ def employees_view(request):
 
 @login_required(login_url='login')
 def planning_view(request):
-    """Vue du planning"""
-    from django.utils import timezone
+    """Vue du planning (lecture seule), par fenêtre de PLANNING_WINDOW_DAYS jours"""
+    # Fenêtre affichée : la date filtrée, sinon la semaine contenant "start" (par défaut aujourd'hui)
+    date_filter = request.GET.get('date', '')
+    try:
+        if date_filter:
+            window_start = date.fromisoformat(date_filter)
+            window_days = 1
+        else:
+            day = date.fromisoformat(request.GET['start']) if request.GET.get('start') else timezone.localdate()
+            window_start = day - timedelta(days=day.weekday())
+            window_days = PLANNING_WINDOW_DAYS
+    except ValueError:
+        messages.error(request, '❌ Format de date invalide (utilisez YYYY-MM-DD).')
+        return redirect('planning')
+    window_end = window_start + timedelta(days=window_days - 1)
     
     shifts = Shift.objects.select_related('shift_type').prefetch_related(
         'assignments__employee__user',
         'assignments__vehicle'
-    ).all()
-    
-    # Filtrer par date
-    date_filter = request.GET.get('date', '')
-    if date_filter:
-        shifts = shifts.filter(date=date_filter)
+    ).filter(date__gte=window_start, date__lte=window_end)
     
     # Préparer les données des quarts avec les flags calculés
+    # (le passage des assignations à "completed" est fait en lot par planning.transitions)
     shifts_data = []
     for shift in shifts:
         is_cancelled = shift.status == 'cancelled'
@@ -607,13 +584,6 @@ def planning_view(request):
         # Un quart est passé si l'heure de fin est dépassée (gère les quarts de nuit)
         is_past = (not is_cancelled) and shift.is_past
         
-        # Mettre à jour automatiquement les assignments à "completed" s'ils n'étaient pas annulés/absents et que le shift n'est pas annulé
-        if is_past and shift.status != 'cancelled':
-            for assignment in shift.assignments.all():
-                if assignment.status in ['assigned', 'confirmed', 'in_progress']:
-                    assignment.status = 'completed'
-                    assignment.save()
-        
         shifts_data.append({
             'shift': shift,
             'is_in_progress': is_in_progress,
@@ -625,37 +595,21 @@ def planning_view(request):
         'user': request.user,
         'shifts_data': shifts_data,
         'filter_date': date_filter,
+        'window_start': window_start,
+        'window_end': window_end,
+        'previous_start': window_start - timedelta(days=PLANNING_WINDOW_DAYS),
+        'next_start': window_start + timedelta(days=PLANNING_WINDOW_DAYS),
         'page_title': '📅 Planning',
     }
     
     return render(request, 'planning.html', context)
 
 
-def _shift_range(shift_date, start_time, end_time):
-    from datetime import datetime, timedelta
-    start_dt = datetime.combine(shift_date, start_time)
-    end_dt = datetime.combine(shift_date, end_time)
-    if end_dt <= start_dt:
-        end_dt += timedelta(days=1)
-    return start_dt, end_dt
-
-
 def _has_shift_overlap(employee_id, shift_date, start_time, end_time, exclude_shift_id=None):
-    from datetime import timedelta
-    new_start, new_end = _shift_range(shift_date, start_time, end_time)
-    assignments = Assignment.objects.select_related('shift').filter(employee_id=employee_id)
-    if exclude_shift_id:
-        assignments = assignments.exclude(shift_id=exclude_shift_id)
-    candidates = assignments.filter(shift__date__in=[shift_date, shift_date - timedelta(days=1)])
-    for assignment in candidates:
-        s_start, s_end = _shift_range(
-            assignment.shift.date,
-            assignment.shift.start_time,
-            assignment.shift.end_time
-        )
-        if new_start < s_end and new_end > s_start:
-            return True
-    return False
+    from planning.conflicts import get_planning_index, shift_interval_bounds
+    new_start, new_end = shift_interval_bounds(shift_date, start_time, end_time)
+    index = get_planning_index(shift_date)
+    return bool(index.employee_overlaps(employee_id, new_start, new_end, exclude_shift_id=exclude_shift_id))
 
 
 @login_required(login_url='login')
@@ -663,30 +617,7 @@ def timesheets_view(request):
     """Vue des feuilles de temps"""
     timesheets = TimeSheet.objects.select_related('employee__user').all()
 
-    # Auto-créer les feuilles de temps du mois en cours (RH/Admin/Manager)
-    if request.user.role in ['admin', 'rh', 'manager']:
-        from datetime import date as date_module
-        from portal.models import Notification
-        today = date_module.today()
-        current_year = today.year
-        current_month = today.month
-        active_employees = Employee.objects.filter(status='active')
-        for emp in active_employees:
-            timesheet, _ = TimeSheet.objects.get_or_create(
-                employee=emp,
-                year=current_year,
-                month=current_month,
-                defaults={'status': 'draft'}
-            )
-            if today.day >= 15 and timesheet.status == 'draft':
-                title = f"Feuille de temps à soumettre ({current_month:02d}/{current_year})"
-                if not Notification.objects.filter(employee=emp, title=title).exists():
-                    Notification.objects.create(
-                        employee=emp,
-                        notification_type='warning',
-                        title=title,
-                        message='Merci de soumettre votre feuille de temps du mois en cours.'
-                    )
+    # Les feuilles du mois et les rappels sont créés par timesheets.provisioning (provision_timesheets)
     
     # Limiter la visibilité pour les employés
     if request.user.role == 'employee':
@@ -752,105 +683,16 @@ def payroll_view(request):
 def payroll_create(request):
     """Générer les feuilles de paie pour le mois en cours"""
     from datetime import date
-    from decimal import Decimal
-    from django.db.models import Q
+    from payroll.engine import run_payroll_period
     
     if request.method == 'POST':
         year = int(request.POST.get('year', date.today().year))
         month = int(request.POST.get('month', date.today().month))
         
-        # Récupérer tous les employés actifs
-        employees = Employee.objects.filter(status='active')
-        payrolls_created = 0
-        payrolls_errors = []
-        
-        for employee in employees:
-            # Récupérer la feuille de temps (uniquement soumises ou approuvées)
-            timesheet = TimeSheet.objects.filter(
-                employee=employee,
-                year=year,
-                month=month,
-                status__in=['submitted', 'approved', 'paid']
-            ).first()
-            
-            if not timesheet:
-                continue
-            
-            # Récupérer le contrat actif pour le taux horaire
-            today = date.today()
-            active_contract = (
-                Contract.objects.filter(employee=employee, status='active')
-                .filter(Q(end_date__isnull=True) | Q(end_date__gte=today))
-                .filter(Q(start_date__isnull=True) | Q(start_date__lte=today))
-                .order_by('-start_date')
-                .first()
-            )
-            
-            if not active_contract or not active_contract.hourly_rate:
-                payrolls_errors.append(f'{employee.user.get_full_name()}: pas de contrat actif ou taux horaire')
-                continue  # Pas de contrat actif avec taux horaire
-            
-            # Créer ou récupérer la fiche de paie
-            payroll, created = Payroll.objects.get_or_create(
-                employee=employee,
-                year=year,
-                month=month,
-                defaults={
-                    'period': f'{year}-{month:02d}',
-                    'status': 'draft'
-                }
-            )
-            
-            # Remplir les heures depuis la feuille de temps
-            if not payroll.populate_hours_from_timesheet():
-                payrolls_errors.append(f'{employee.user.get_full_name()}: impossible de récupérer les heures')
-                continue
-            
-            # Récupérer les variables de paie actives pour les taux de majoration
-            from payroll.models import PayrollVariable
-            
-            def get_rate_from_variables(variable_name, default_value):
-                """Récupère le taux depuis les variables de paie ou utilise la valeur par défaut"""
-                try:
-                    var = PayrollVariable.objects.get(name__icontains=variable_name, is_active=True)
-                    # Si l'unité est en %, diviser par 100 pour obtenir le multiplicateur
-                    if var.unit == '%':
-                        return var.value / Decimal('100')
-                    else:
-                        return var.value
-                except PayrollVariable.DoesNotExist:
-                    return Decimal(str(default_value))
-            
-            # Récupérer les taux depuis les variables de paie
-            night_rate = get_rate_from_variables('Taux nuit', 1.25)
-            sunday_rate = get_rate_from_variables('Taux dimanche', 1.50)
-            holiday_rate = get_rate_from_variables('Taux jours fériés', 2.00)
-            overtime_rate = get_rate_from_variables('Taux heures supplémentaires', 1.50)
-            
-            # Calculer le salaire brut à partir du taux horaire et des variables
-            hourly_rate = Decimal(str(active_contract.hourly_rate))
-            payroll.normal_salary = payroll.normal_hours * hourly_rate
-            payroll.night_salary = payroll.night_hours * hourly_rate * night_rate
-            payroll.sunday_salary = payroll.sunday_hours * hourly_rate * sunday_rate
-            payroll.holiday_salary = payroll.holiday_hours * hourly_rate * holiday_rate
-            payroll.overtime_salary = payroll.overtime_hours * hourly_rate * overtime_rate
-            
-            # Salaire brut
-            payroll.gross_salary = (
-                payroll.normal_salary
-                + payroll.night_salary
-                + payroll.sunday_salary
-                + payroll.holiday_salary
-                + payroll.overtime_salary
-            )
-            
-            # Calculer les cotisations sociales à partir de la base de données
-            payroll.calculate_with_payroll_rules()
-            
-            payroll.status = 'calculated'
-            payroll.calculated_at = timezone.now()
-            payroll.save()
-            payrolls_created += 1
+        # Calcul en lot de toutes les fiches de la période (nombre de requêtes constant)
+        result = run_payroll_period(year, month)
+        payrolls_created = result['processed']
+        payrolls_errors = result['errors']
         
         if payrolls_created > 0:
             messages.success(request, f'✅ {payrolls_created} feuille(s) de paie créée(s) pour {month:02d}/{year} !')
@@ -879,53 +721,29 @@ def payroll_create(request):
 @admin_required
 def payroll_detail(request, payroll_id):
     """Afficher les détails d'une fiche de paie"""
-    payroll = get_object_or_404(Payroll, id=payroll_id)
-    
-    # Calculer les détails des cotisations
-    from payroll.models import PayrollContribution, PayrollVariable
-    
-    contribution_details = []
-    # Afficher UNIQUEMENT les cotisations salariales (non patronales)
-    active_contributions = PayrollContribution.objects.filter(
-        is_active=True,
-        is_patronal=False
-    )
+    payroll = get_object_or_404(Payroll.objects.select_related('employee__user'), id=payroll_id)
     
-    for contribution in active_contributions:
-        rate = contribution.rate / Decimal('100')
-        
-        if contribution.ceiling:
-            applicable_base = min(payroll.gross_salary, contribution.ceiling)
-            amount = applicable_base * rate
-        else:
-            applicable_base = payroll.gross_salary
-            amount = applicable_base * rate
-        
-        contribution_details.append({
-            'name': contribution.name,
-            'rate': contribution.rate,
-            'ceiling': contribution.ceiling,
-            'base': applicable_base,
-            'amount': amount
-        })
-    
-    total_contributions = sum(Decimal(str(c['amount'])) for c in contribution_details)
+    # Détail des cotisations salariales lu sur le calcul figé (aucun recalcul à l'affichage)
+    snapshot = payroll.calculation_snapshot or {}
+    contribution_details = snapshot.get('lines', [])
 
-    contribution_names = list(active_contributions.values_list('name', flat=True))
-    payroll_items = payroll.items.exclude(description__in=contribution_names).order_by('item_type', 'created_at')
+    payroll_items = payroll.items.exclude(
+        description__in=[line['name'] for line in contribution_details]
+    ).order_by('item_type', 'created_at')
     
     context = {
         'payroll': payroll,
         'page_title': f'📋 Fiche de Paie - {payroll.employee.user.get_full_name()}',
+        'snapshot': snapshot,
         'contribution_details': contribution_details,
-        'total_contributions': total_contributions,
+        'total_contributions': snapshot.get('total_contributions', '0'),
         'payroll_items': payroll_items,
     }
     
     return render(request, 'payroll_detail.html', context)
 
 
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
 
 @require_http_methods(["GET"])
@@ -934,41 +752,25 @@ def payroll_calculation_api(request, payroll_id):
     API JSON: Retourne les détails complets du calcul de paie
     Utile pour intégration/audit des cotisations
     """
-    from payroll.models import PayrollContribution
-    
-    payroll = get_object_or_404(Payroll, id=payroll_id)
+    payroll = get_object_or_404(Payroll.objects.select_related('employee__user'), id=payroll_id)
     
     # Vérifier les permissions
     if request.user.role != 'admin' and request.user.id != payroll.employee.user.id:
         return JsonResponse({'error': 'Non autorisé'}, status=403)
     
-    contribution_details = []
-    # Afficher UNIQUEMENT les cotisations salariales (non patronales)
-    active_contributions = PayrollContribution.objects.filter(
-        is_active=True,
-        is_patronal=False
-    )
-    
-    for contribution in active_contributions:
-        rate = contribution.rate / Decimal('100')
-        
-        if contribution.ceiling:
-            applicable_base = min(payroll.gross_salary, contribution.ceiling)
-            amount = applicable_base * rate
-        else:
-            applicable_base = payroll.gross_salary
-            amount = applicable_base * rate
-        
-        contribution_details.append({
-            'name': contribution.name,
-            'rate': float(contribution.rate),
-            'ceiling': float(contribution.ceiling) if contribution.ceiling else None,
-            'base': float(applicable_base),
-            'amount': float(amount),
-            'description': contribution.description
-        })
-    
-    total_contributions = sum(Decimal(str(c['amount'])) for c in contribution_details)
+    # Cotisations salariales lues sur le calcul figé (aucun recalcul)
+    snapshot = payroll.calculation_snapshot or {}
+    contribution_details = [
+        {
+            'name': line['name'],
+            'rate': float(line['rate']),
+            'ceiling': float(line['ceiling']) if line['ceiling'] else None,
+            'base': float(line['base']),
+            'amount': float(line['amount']),
+            'description': line['description'],
+        }
+        for line in snapshot.get('lines', [])
+    ]
     
     return JsonResponse({
         'payroll_id': payroll.id,
@@ -991,7 +793,8 @@ def payroll_calculation_api(request, payroll_id):
             'gross': float(payroll.gross_salary),
         },
         'contributions': contribution_details,
-        'total_contributions': float(total_contributions),
+        'total_contributions': float(snapshot.get('total_contributions', 0)),
+        'rules_version': snapshot.get('rules_version'),
         'deductions': {
             'social_security': float(payroll.social_security),
             'taxes': float(payroll.taxes),
@@ -1008,11 +811,43 @@ def payroll_calculation_api(request, payroll_id):
 @admin_required
 def payroll_export(request, payroll_id):
     """Exporter une fiche de paie en PDF"""
-    payroll = get_object_or_404(Payroll, id=payroll_id)
+    from payroll.export import payslip_filename, render_payroll_pdf
     
-    # Pour l'instant, afficher un message
-    messages.info(request, '📥 Export PDF en développement. Statut de la feuille: ' + payroll.get_status_display())
-    return redirect('payroll')
+    payroll = get_object_or_404(
+        Payroll.objects.select_related('employee__user', 'employee__profession'),
+        id=payroll_id
+    )
+    response = HttpResponse(render_payroll_pdf(payroll), content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="{payslip_filename(payroll)}"'
+    return response
+
+
+@login_required(login_url='login')
+@admin_required
+def payroll_period_export(request):
+    """
+    Exporter tous les bulletins d'une période dans une archive ZIP (diffusée en
+    flux). Rendu séquentiel : pas de pool de processus par requête dans un
+    processus web ; la commande export_payslips rend en parallèle.
+    """
+    from payroll.export import stream_period_zip
+    
+    try:
+        year = int(request.GET.get('year', date.today().year))
+        month = int(request.GET.get('month', date.today().month))
+    except ValueError:
+        messages.error(request, '❌ Période invalide.')
+        return redirect('payroll')
+    if not 1 <= month <= 12:
+        messages.error(request, '❌ Le mois doit être entre 1 et 12.')
+        return redirect('payroll')
+    if not Payroll.objects.filter(year=year, month=month).exists():
+        messages.warning(request, f'Aucune fiche de paie pour {month:02d}/{year}.')
+        return redirect('payroll')
+    
+    response = StreamingHttpResponse(stream_period_zip(year, month, workers=1), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="bulletins_{year}-{month:02d}.zip"'
+    return response
 
 
 @login_required(login_url='login')
@@ -1082,15 +917,15 @@ def admin_panel(request):
     
     # Statistiques admin
     today = date.today()
+    counters = cached_admin_counters(today)
     stats = {
-        'total_employees': Employee.objects.count(),
-        'active_contracts': Contract.objects.filter(is_active=True).count(),
-        'pending_timesheets': TimeSheet.objects.filter(status='submitted').count(),
-        'total_payroll': Payroll.objects.filter(
-            status__in=['validated', 'paid']
-        ).aggregate(total=Sum('net_salary'))['total'] or 0,
-        'available_vehicles': Vehicle.objects.filter(status='available').count(),
-        'recent_audits': AuditLog.objects.count(),
+        'total_employees': counters['employees_total'],
+        'active_contracts': counters['contracts_active'],
+        'pending_timesheets': counters['timesheets_submitted'],
+        'total_payroll': counters['salaries_validated'],
+        'available_vehicles': counters['vehicles_available'],
+        # Estimation (PostgreSQL) ou comptage plafonné : pas de COUNT(*) du journal à chaque affichage
+        'recent_audits': approximate_count(AuditLog.objects.all()),
     }
     
     # Journaux d'audit récents
@@ -1550,7 +1385,8 @@ def timesheet_edit(request, timesheet_id):
     if request.method == 'POST':
         timesheet.status = request.POST.get('status')
         timesheet.notes = request.POST.get('notes', '')
-        timesheet.save()
+        # Totaux d'heures tenus à jour par les entrées : non réécrits
+        timesheet.save(update_fields=['status', 'notes', 'updated_at'])
         messages.success(request, '✅ Feuille modifiée avec succès !')
         return redirect('timesheets')
     
@@ -1849,10 +1685,8 @@ def contract_download(request, contract_id):
     
     # Vérifier si le fichier existe déjà
     if contract.contract_file and request.GET.get('regenerate') != '1':
-        # Télécharger le fichier existant
-        response = HttpResponse(contract.contract_file.read(), content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document')
-        response['Content-Disposition'] = f'attachment; filename="{contract.contract_file.name.split("/")[-1]}"'
-        return response
+        # Télécharger le fichier existant (en flux, requêtes conditionnelles et plages)
+        return serve_file(request, contract.contract_file, as_attachment=True, content_type=DOCX_CONTENT_TYPE)
     else:
         # Régénérer le document
         try:
@@ -1860,7 +1694,7 @@ def contract_download(request, contract_id):
             contract.contract_file.save(filename, ContentFile(file_content), save=True)
             
             # Télécharger le nouveau fichier
-            response = HttpResponse(file_content, content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document')
+            response = HttpResponse(file_content, content_type=DOCX_CONTENT_TYPE)
             response['Content-Disposition'] = f'attachment; filename="{filename}"'
             
             messages.success(request, '✅ Document de contrat régénéré avec succès !')
@@ -2005,7 +1839,8 @@ def employee_portal(request):
 @admin_required
 def absences_view(request):
     """Gestion des absences des salariés"""
-    from timesheets.models import AbsenceRecord, TimeSheetEntry
+    from timesheets.absences import record_absence
+    from timesheets.models import AbsenceRecord
     from datetime import datetime
     
     # Filtrer par employé si demandé
@@ -2030,109 +1865,20 @@ def absences_view(request):
             employee = Employee.objects.get(id=employee_id)
             parsed_start = datetime.strptime(date_start, "%Y-%m-%d").date()
             parsed_end = datetime.strptime(date_end, "%Y-%m-%d").date()
-            absence = AbsenceRecord(
-                employee=employee,
-                date_start=parsed_start,
-                date_end=parsed_end,
-                absence_type=absence_type,
-                notes=notes
-            )
-            absence.save()
-            
-            # Annuler les quarts/assignations sur la période d'absence
-            affected_assignments = Assignment.objects.filter(
-                employee=employee,
-                shift__date__gte=parsed_start,
-                shift__date__lte=parsed_end,
-                status__in=['assigned', 'confirmed', 'in_progress', 'completed']
-            ).select_related('shift', 'shift__shift_type')
-            cancelled_count = 0
-            deduction_total = Decimal('0.00')
-            maintained_total = Decimal('0.00')
-            payrolls_to_recalc = set()
-            
-            # Règles de rémunération selon le type d'absence (référence droit du travail)
-            pay_blocked = absence_type in ['sick', 'unpaid', 'maternal', 'paternal', 'personal']
-            pay_maintained = absence_type == 'vacation'
-            
-            for assign in affected_assignments:
-                assign.status = 'cancelled'
-                note_suffix = f"Absence du {parsed_start} au {parsed_end} ({absence.get_absence_type_display()})"
-                assign.notes = f"{assign.notes}\n{note_suffix}" if assign.notes else note_suffix
-                assign.save()
-                cancelled_count += 1
-
-                # Annuler également le quart (shift) si pas déjà annulé
-                shift = assign.shift
-                if shift.status != 'cancelled':
-                    shift.status = 'cancelled'
-                    shift.notes = f"{shift.notes}\n{note_suffix}" if shift.notes else note_suffix
-                    shift.save()
-
-                # Supprimer les entrées de feuille de temps liées à ce quart
-                TimeSheetEntry.objects.filter(assignment=assign).delete()
-                
-                # Calcul des impacts paie
-                hours = Decimal(str(assign.shift.duration_hours))
-                contract = Contract.objects.filter(
-                    employee=employee,
-                    status='active',
-                    start_date__lte=assign.shift.date
-                ).order_by('-start_date').first()
-                rate = None
-                if contract:
-                    if contract.hourly_rate:
-                        rate = contract.hourly_rate
-                    elif contract.monthly_salary:
-                        rate = (contract.monthly_salary / Decimal('151.67')).quantize(Decimal('0.01'))
-                if rate:
-                    amount = (hours * rate).quantize(Decimal('0.01'))
-                    period_str = f"{assign.shift.date.year:04d}-{assign.shift.date.month:02d}"
-                    payroll, _ = Payroll.objects.get_or_create(
-                        employee=employee,
-                        year=assign.shift.date.year,
-                        month=assign.shift.date.month,
-                        defaults={'period': period_str}
-                    )
-                    if pay_blocked:
-                        deduction_total += amount
-                        payroll.other_deductions += amount
-                        payroll.total_deductions = payroll.social_security + payroll.taxes + payroll.other_deductions
-                        payroll.net_salary = payroll.gross_salary - payroll.total_deductions
-                        payroll.save()
-                        PayrollItem.objects.create(
-                            payroll=payroll,
-                            item_type='deduction',
-                            description=f"Absence {absence.get_absence_type_display()} le {assign.shift.date}",
-                            amount=amount
-                        )
-                        payrolls_to_recalc.add(payroll.id)
-                    elif pay_maintained:
-                        maintained_total += amount
-                        payroll.gross_salary += amount
-                        payroll.net_salary = payroll.gross_salary - payroll.total_deductions
-                        payroll.save()
-                        PayrollItem.objects.create(
-                            payroll=payroll,
-                            item_type='salary',
-                            description=f"Maintien salaire congé payé le {assign.shift.date}",
-                            amount=amount
-                        )
-                        payrolls_to_recalc.add(payroll.id)
-
-            # Recalculer les cotisations si le brut ou les déductions ont changé
-            for payroll_id in payrolls_to_recalc:
-                payroll_to_update = Payroll.objects.get(id=payroll_id)
-                payroll_to_update.calculate_with_payroll_rules()
-                payroll_to_update.save()
+            dry_run = 'preview' in request.POST
+            impact = record_absence(employee, parsed_start, parsed_end, absence_type, notes, dry_run=dry_run)
             
             # Messages utilisateur
-            if cancelled_count:
-                messages.info(request, f'{cancelled_count} quart(s) annulé(s) pour absence.')
-            if pay_blocked and deduction_total > 0:
-                messages.info(request, f'Déductions ajoutées : {deduction_total} €')
-            if pay_maintained:
-                messages.info(request, f'Congé payé : rémunération maintenue (+{maintained_total} €) malgré annulation du quart.')
+            prefix = 'Prévisualisation : ' if dry_run else ''
+            if impact.assignments:
+                messages.info(request, f'{prefix}{len(impact.assignments)} quart(s) annulé(s) pour absence.')
+            if impact.pay_blocked and impact.deduction_total > 0:
+                messages.info(request, f'{prefix}Déductions ajoutées : {impact.deduction_total} €')
+            if impact.pay_maintained:
+                messages.info(request, f'{prefix}Congé payé : rémunération maintenue (+{impact.maintained_total} €) malgré annulation du quart.')
+            if dry_run:
+                messages.warning(request, '👁️ Prévisualisation : aucune modification enregistrée.')
+                return redirect('absences')
             
             messages.success(request, f'✅ Absence créée pour {employee.user.first_name} {employee.user.last_name}')
             return redirect('absences')
@@ -2191,49 +1937,39 @@ def absence_delete(request, absence_id):
 @admin_required
 def documents_view(request):
     """Liste des employés pour accéder à leur GED"""
-    from employees.models import EmployeeDocument
-    from django.db.models import Count
-    
-    # Récupérer tous les employés avec le nombre de documents
-    employees = Employee.objects.filter(status='active').annotate(
-        document_count=Count('ged_documents')
+    from employees.models import DocumentCompliance, EmployeeDocument
+    from django.db.models import Count, Value
+    from django.db.models.functions import Coalesce
+    
+    # Employés actifs avec le nombre de documents et de pièces obligatoires manquantes
+    employees = Employee.objects.filter(status='active').select_related(
+        'user', 'profession'
+    ).annotate(
+        document_count=Count('ged_documents'),
+        missing_documents=Coalesce(
+            'document_compliance__missing_count', Value(len(EmployeeDocument.REQUIRED_DOCUMENT_TYPES))
+        ),
     ).order_by('user__last_name')
-
-    required_document_types = {
-        'contract',
-        'id_card',
-        'diploma',
-        'attestation',
-        'cpam_attestation',
-        'rib',
-        'driving_license',
-        'dpae',
-    }
-    employee_ids = [employee.id for employee in employees]
-    documents_by_employee = defaultdict(set)
-    if employee_ids:
-        documents_qs = EmployeeDocument.objects.filter(
-            employee_id__in=employee_ids,
-            document_type__in=required_document_types
-        ).values_list('employee_id', 'document_type')
-        for employee_id, document_type in documents_qs:
-            documents_by_employee[employee_id].add(document_type)
-    for employee in employees:
-        missing_count = len(
-            required_document_types - documents_by_employee.get(employee.id, set())
-        )
-        employee.missing_documents = missing_count
     
     stats = {
         'total_employees': employees.count(),
         'total_documents': EmployeeDocument.objects.count(),
         'employees_with_docs': EmployeeDocument.objects.values('employee').distinct().count(),
+        'incomplete_employees': DocumentCompliance.objects.filter(missing_count__gt=0).count(),
     }
+
+    # Filtre sur la conformité (table indexée, sans recalcul)
+    compliance = request.GET.get('compliance', '')
+    if compliance == 'incomplete':
+        employees = employees.filter(missing_documents__gt=0)
+    elif compliance == 'complete':
+        employees = employees.filter(missing_documents=0)
     
     context = {
         'user': request.user,
         'employees': employees,
         'stats': stats,
+        'compliance': compliance,
         'page_title': '📁 Gestion des Documents',
     }
     
@@ -2315,9 +2051,6 @@ def document_delete(request, document_id):
 def document_preview(request, document_id):
     """Apercu d'un document sans telechargement"""
     from employees.models import EmployeeDocument
-    from django.http import FileResponse
-    import mimetypes
-    import os
 
     document = get_object_or_404(EmployeeDocument, id=document_id)
 
@@ -2336,14 +2069,7 @@ def document_preview(request, document_id):
         messages.error(request, "❌ Fichier introuvable.")
         return redirect('documents')
 
-    content_type, _ = mimetypes.guess_type(document.file.name)
-    response = FileResponse(
-        document.file.open('rb'),
-        content_type=content_type or 'application/octet-stream'
-    )
-    filename = os.path.basename(document.file.name)
-    response['Content-Disposition'] = f'inline; filename="{filename}"'
-    return response
+    return serve_file(request, document.file)
 
 
 @login_required(login_url='login')
@@ -2819,7 +2545,9 @@ def financial_report(request):
     Rapport financier complet: montre TOUTES les cotisations (salariales ET patronales)
     pour une période donnée - VISIBLE UNIQUEMENT PAR LES ADMINS
     """
-    from payroll.models import Payroll, PayrollContribution
+    from payroll.models import Payroll
+    from payroll.rules import get_rule_set
+    from payroll.columnar import contribution_totals
     from datetime import datetime, timedelta
     from django.db.models import Sum, Count
     from decimal import Decimal
@@ -2837,55 +2565,18 @@ def financial_report(request):
         period=period_key
     ).select_related('employee__user')
     
+    # Colonnes brut/net de la période en une seule requête
+    salaries = list(payrolls.values_list('gross_salary', 'net_salary'))
+    gross_salaries = [gross for gross, _ in salaries]
+    
     # Calculer les totaux
-    total_brut = Decimal('0.00')
-    total_net = Decimal('0.00')
-    employee_contributions = {}  # {contribution_name: amount}
-    employer_contributions = {}  # {contribution_name: amount}
-    
-    for payroll in payrolls:
-        total_brut += payroll.gross_salary
-        total_net += payroll.net_salary
-        
-        # Calculer les cotisations salariales
-        salarial_contribs = PayrollContribution.objects.filter(
-            is_active=True,
-            is_patronal=False
-        )
-        
-        for contribution in salarial_contribs:
-            rate = contribution.rate / Decimal('100')
-            if contribution.ceiling:
-                applicable_base = min(payroll.gross_salary, contribution.ceiling)
-                amount = applicable_base * rate
-            else:
-                applicable_base = payroll.gross_salary
-                amount = applicable_base * rate
-            
-            key = contribution.name
-            if key not in employee_contributions:
-                employee_contributions[key] = Decimal('0.00')
-            employee_contributions[key] += amount
-        
-        # Calculer les cotisations patronales
-        patronal_contribs = PayrollContribution.objects.filter(
-            is_active=True,
-            is_patronal=True
-        )
-        
-        for contribution in patronal_contribs:
-            rate = contribution.rate / Decimal('100')
-            if contribution.ceiling:
-                applicable_base = min(payroll.gross_salary, contribution.ceiling)
-                amount = applicable_base * rate
-            else:
-                applicable_base = payroll.gross_salary
-                amount = applicable_base * rate
-            
-            key = contribution.name
-            if key not in employer_contributions:
-                employer_contributions[key] = Decimal('0.00')
-            employer_contributions[key] += amount
+    total_brut = sum(gross_salaries, Decimal('0.00'))
+    total_net = sum((net for _, net in salaries), Decimal('0.00'))
+    
+    # Cotisations salariales puis patronales : calcul colonnaire sur le barème compilé
+    rule_set = get_rule_set()
+    employee_contributions = contribution_totals(gross_salaries, rule_set.salarial)  # {contribution_name: amount}
+    employer_contributions = contribution_totals(gross_salaries, rule_set.patronal)  # {contribution_name: amount}
     
     total_employee_contributions = sum(Decimal(str(v)) for v in employee_contributions.values())
     total_employer_contributions = sum(Decimal(str(v)) for v in employer_contributions.values())
@@ -2915,7 +2606,7 @@ def financial_report(request):
         'pct_employer_contributions': pct_employer_contributions,
         'employee_contributions': sorted(employee_contributions.items()),
         'employer_contributions': sorted(employer_contributions.items()),
-        'nb_employees': payrolls.count(),
+        'nb_employees': len(salaries),
         'page_title': f'📊 Rapport Financier - {month:02d}/{year}'
     }
     
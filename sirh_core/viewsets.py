@@ -1,20 +1,26 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.core.cache import cache
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.db.models import Count, Sum, Avg, Q
+import base64
+import json
 from datetime import datetime, date, timedelta
-from decimal import Decimal
 
+from .audit import record
+from .audit_archive import archived_months, audit_logs_for_month
 from .models import AuditLog, SystemSetting
 from .serializers import AuditLogSerializer, SystemSettingSerializer
+from .stats import cached_admin_counters
+from .stats_cache import cached_stats
 from accounts.permissions import IsAdmin, IsRH
 from employees.models import Employee
 from contracts.models import Contract
 from vehicles.models import Vehicle
-from planning.models import Shift, Assignment
 from timesheets.models import TimeSheet, TimeSheetEntry
 from payroll.models import Payroll
 from portal.models import LeaveRequest, TimeOffBalance
@@ -25,10 +31,11 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = AuditLog.objects.all()
     serializer_class = AuditLogSerializer
     permission_classes = [IsAuthenticated, IsAdmin]
+    cursor_ordering = ('-timestamp', '-id')
     
     def get_queryset(self):
         """Filtrer les logs selon les paramètres"""
-        queryset = AuditLog.objects.all()
+        queryset = AuditLog.objects.select_related('user')
         
         # Filtrer par utilisateur
         user_id = self.request.query_params.get('user_id')
@@ -91,6 +98,64 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
             'total': AuditLog.objects.count()
         })
 
+    month_max_page_size = 100
+
+    @staticmethod
+    def _month_cursor(row):
+        position = json.dumps([row['timestamp'].isoformat(), row['id']])
+        return base64.urlsafe_b64encode(position.encode()).decode()
+
+    @staticmethod
+    def _month_position(cursor):
+        """Clé (horodatage, id) d'un curseur ; ValueError s'il est invalide"""
+        try:
+            timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            timestamp = parse_datetime(timestamp)
+        except (TypeError, ValueError, UnicodeError):
+            raise ValueError(cursor)
+        if timestamp is None or not isinstance(row_id, int):
+            raise ValueError(cursor)
+        return timestamp, row_id
+
+    @action(detail=False, methods=['get'])
+    def month(self, request):
+        """
+        Logs d'un mois (?month=AAAA-MM), table et archives confondues, par
+        pages de ?page_size= entrées (100 au plus) ; `next` porte le curseur
+        de la page suivante
+        """
+        filters = {}
+        params = request.query_params
+        try:
+            year, month = (int(part) for part in params.get('month', '').split('-'))
+            date(year, month, 1)
+            if params.get('user_id'):
+                filters['user_id'] = int(params['user_id'])
+            page_size = min(int(params.get('page_size', api_settings.PAGE_SIZE)), self.month_max_page_size)
+            if page_size < 1:
+                raise ValueError(page_size)
+            before = self._month_position(params['cursor']) if params.get('cursor') else None
+        except ValueError:
+            return Response(
+                {'error': 'Paramètres attendus : month=AAAA-MM, user_id et page_size entiers, cursor de la page précédente'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if params.get('action'):
+            filters['action'] = params['action']
+
+        # Une entrée de plus : indique s'il reste une page
+        rows = audit_logs_for_month(year, month, limit=page_size + 1, before=before, **filters)
+        results = rows[:page_size]
+        next_link = None
+        if len(rows) > page_size:
+            next_link = replace_query_param(request.build_absolute_uri(), 'cursor', self._month_cursor(results[-1]))
+        return Response({
+            'month': f'{year:04d}-{month:02d}',
+            'archived_months': [f'{y:04d}-{m:02d}' for y, m in archived_months()],
+            'next': next_link,
+            'results': results,
+        })
+
 
 class SystemSettingViewSet(viewsets.ModelViewSet):
     """Gestion des paramètres système"""
@@ -127,90 +192,33 @@ class AdminDashboardViewSet(viewsets.ViewSet):
     def summary(self, request):
         """Résumé global du système"""
         today = date.today()
-        current_month = today.month
-        current_year = today.year
-
-        cache_key = f"admin_summary:{current_year}-{current_month}"
-        cached = cache.get(cache_key)
-        if cached:
-            return Response(cached)
-        
-        # Statistiques employés
-        total_employees = Employee.objects.count()
-        active_contracts = Contract.objects.filter(
-            status='active'
-        ).filter(
-            Q(end_date__isnull=True) | Q(end_date__gte=today)
-        ).filter(
-            Q(start_date__isnull=True) | Q(start_date__lte=today)
-        ).count()
-        
-        # Statistiques véhicules
-        total_vehicles = Vehicle.objects.count()
-        available_vehicles = Vehicle.objects.filter(
-            status='available'
-        ).count()
-        
-        # Statistiques planning
-        shifts_today = Shift.objects.filter(date=today).count()
-        assignments_today = Assignment.objects.filter(
-            shift__date=today
-        ).count()
-        
-        # Statistiques timesheets
-        timesheets_pending = TimeSheet.objects.filter(
-            status='submitted',
-            year=current_year,
-            month=current_month
-        ).count()
-        
-        # Statistiques paie
-        payrolls_to_validate = Payroll.objects.filter(
-            status='calculated'
-        ).count()
-        
-        total_salaries_month = Payroll.objects.filter(
-            year=current_year,
-            month=current_month,
-            status__in=['validated', 'paid']
-        ).aggregate(
-            total=Sum('net_salary')
-        )['total'] or Decimal('0.00')
-        
-        # Statistiques congés
-        leave_requests_pending = LeaveRequest.objects.filter(
-            status='pending'
-        ).count()
-        
-        # Activité récente
-        recent_activity = AuditLog.objects.all()[:10]
-        
+        counters = cached_admin_counters(today)
         summary_data = {
             'employees': {
-                'total': total_employees,
-                'active_contracts': active_contracts,
+                'total': counters['employees_total'],
+                'active_contracts': counters['contracts_active'],
             },
             'vehicles': {
-                'total': total_vehicles,
-                'available': available_vehicles,
+                'total': counters['vehicles_total'],
+                'available': counters['vehicles_available'],
             },
             'planning': {
-                'shifts_today': shifts_today,
-                'assignments_today': assignments_today,
+                'shifts_today': counters['shifts_today'],
+                'assignments_today': counters['assignments_today'],
             },
             'timesheets': {
-                'pending_approval': timesheets_pending,
+                'pending_approval': counters['timesheets_submitted_month'],
             },
             'payroll': {
-                'to_validate': payrolls_to_validate,
-                'total_salaries_month': float(total_salaries_month),
+                'to_validate': counters['payrolls_calculated'],
+                'total_salaries_month': float(counters['salaries_month_validated']),
             },
             'leave_requests': {
-                'pending': leave_requests_pending,
+                'pending': counters['leave_requests_pending'],
             },
-            'recent_activity': AuditLogSerializer(recent_activity, many=True).data,
+            # Activité récente : lue à chaque appel (le journal change à chaque action)
+            'recent_activity': AuditLogSerializer(AuditLog.objects.all()[:10], many=True).data,
         }
-        
         return Response(summary_data)
     
     @action(detail=False, methods=['get'])
@@ -223,11 +231,16 @@ class AdminDashboardViewSet(viewsets.ViewSet):
             days = 30
         
         today = date.today()
-        cache_key = f"admin_statistics:{today.year}-{today.month}-{period}"
-        cached = cache.get(cache_key)
-        if cached:
-            return Response(cached)
-        
+        statistics_data = cached_stats(
+            'admin_statistics',
+            ['employees', 'timesheets', 'leaves', 'payroll'],
+            lambda: self._statistics(today, days),
+            today.isoformat(), days
+        )
+        return Response(statistics_data)
+
+    @staticmethod
+    def _statistics(today, days):
         start_date = today - timedelta(days=days)
         
         # Évolution des employés
@@ -265,28 +278,30 @@ class AdminDashboardViewSet(viewsets.ViewSet):
             count=Count('id')
         ).order_by('-period')[:12]
         
-        statistics_data = {
+        return {
             'employees_evolution': list(employees_evolution),
             'hours_worked': hours_worked,
             'leave_requests': list(leave_requests_by_type),
             'payrolls': list(payrolls_by_month),
         }
-
-        cache.set(cache_key, statistics_data, timeout=60)
-        return Response(statistics_data)
     
     @action(detail=False, methods=['get'])
     def reports(self, request):
         """Rapports de conformité"""
         today = date.today()
+        reports_data = cached_stats(
+            'admin_reports',
+            ['employees', 'timesheets', 'fleet', 'leaves'],
+            lambda: self._reports(today),
+            today.isoformat()
+        )
+        return Response(reports_data)
+
+    @staticmethod
+    def _reports(today):
         current_month = today.month
         current_year = today.year
 
-        cache_key = f"admin_reports:{current_year}-{current_month}"
-        cached = cache.get(cache_key)
-        if cached:
-            return Response(cached)
-        
         # Contrats expirant bientôt (30 jours)
         contracts_expiring = Contract.objects.filter(
             end_date__lte=today + timedelta(days=30),
@@ -312,7 +327,7 @@ class AdminDashboardViewSet(viewsets.ViewSet):
             created_at__lt=week_ago
         ).count()
         
-        reports_data = {
+        return {
             'alerts': {
                 'contracts_expiring': contracts_expiring,
                 'timesheets_not_submitted': timesheets_not_submitted,
@@ -336,35 +351,8 @@ class AdminDashboardViewSet(viewsets.ViewSet):
                 )['total'] or 0,
             }
         }
-        
-        cache.set(cache_key, reports_data, timeout=60)
-        return Response(reports_data)
 
 
 def log_action(user, action, obj=None, changes=None, request=None):
-    """Fonction utilitaire pour créer des logs d'audit"""
-    from django.contrib.contenttypes.models import ContentType
-    
-    log_data = {
-        'user': user,
-        'action': action,
-        'changes': changes or {},
-    }
-    
-    if obj:
-        log_data['content_type'] = ContentType.objects.get_for_model(obj)
-        log_data['object_id'] = obj.pk
-        log_data['object_repr'] = str(obj)
-    
-    if request:
-        # Récupérer l'IP
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        
-        log_data['ip_address'] = ip
-        log_data['user_agent'] = request.META.get('HTTP_USER_AGENT', '')[:255]
-    
-    return AuditLog.objects.create(**log_data)
+    """Fonction utilitaire pour créer des logs d'audit (écriture différée, voir sirh_core.audit)"""
+    record(user, action, obj=obj, changes=changes, request=request)
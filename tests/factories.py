@@ -1,9 +1,18 @@
 """
 Fixtures and factories for testing
 """
+from datetime import date, time
+from decimal import Decimal
+
 import factory
 from django.contrib.auth import get_user_model
 
+from employees.models import Profession, Employee
+from contracts.models import Contract
+from planning.models import ShiftType, Shift, Assignment
+from vehicles.models import Vehicle
+from timesheets.models import TimeSheet, TimeSheetEntry
+
 User = get_user_model()
 
 
@@ -16,3 +25,115 @@ class UserFactory(factory.django.DjangoModelFactory):
     email = factory.Sequence(lambda n: f'user{n}@example.com')
     first_name = 'Test'
     last_name = 'User'
+
+
+class ProfessionFactory(factory.django.DjangoModelFactory):
+    """Factory pour les professions"""
+    class Meta:
+        model = Profession
+        django_get_or_create = ('code',)
+
+    code = 'ambulancier_dea'
+    label = 'Ambulancier DEA'
+
+
+class EmployeeFactory(factory.django.DjangoModelFactory):
+    """Factory pour créer des salariés de test"""
+    class Meta:
+        model = Employee
+
+    user = factory.SubFactory(UserFactory, role='employee')
+    employee_id = factory.Sequence(lambda n: f'EMP{n:04d}')
+    birth_date = date(1990, 5, 15)
+    address = '1 rue de la Paix'
+    postal_code = '44000'
+    city = 'Nantes'
+    phone = '+33612345678'
+    social_security_number = factory.Sequence(lambda n: f'1900544{n:06d}')
+    profession = factory.SubFactory(ProfessionFactory)
+    date_entry = date(2024, 1, 1)
+
+
+class ContractFactory(factory.django.DjangoModelFactory):
+    """Factory pour les contrats actifs (taux horaire)"""
+    class Meta:
+        model = Contract
+
+    employee = factory.SubFactory(EmployeeFactory)
+    contract_number = factory.Sequence(lambda n: f'CDI-TEST-{n:04d}')
+    contract_type = 'cdi'
+    status = 'active'
+    start_date = date(2024, 1, 1)
+    working_hours_per_week = Decimal('35.00')
+    hourly_rate = Decimal('12.00')
+    created_by = factory.SubFactory(UserFactory, role='admin')
+
+
+class ShiftTypeFactory(factory.django.DjangoModelFactory):
+    """Factory pour les types de shift"""
+    class Meta:
+        model = ShiftType
+        django_get_or_create = ('name',)
+
+    name = 'day'
+    start_hour = time(8, 0)
+    end_hour = time(16, 0)
+    base_hours = Decimal('8.00')
+
+
+class ShiftFactory(factory.django.DjangoModelFactory):
+    """Factory pour les shifts"""
+    class Meta:
+        model = Shift
+
+    shift_type = factory.SubFactory(ShiftTypeFactory)
+    date = date(2026, 3, 2)
+    start_time = time(8, 0)
+    end_time = time(16, 0)
+
+
+class VehicleFactory(factory.django.DjangoModelFactory):
+    """Factory pour les véhicules"""
+    class Meta:
+        model = Vehicle
+
+    vehicle_id = factory.Sequence(lambda n: f'VEH-{n:03d}')
+    registration_number = factory.Sequence(lambda n: f'AB-{n:03d}-CD')
+    vehicle_type = 'ambulance'
+    brand = 'Renault'
+    model = 'Master'
+    year = 2022
+    purchase_date = date(2022, 1, 1)
+    entry_date = date(2022, 1, 1)
+
+
+class AssignmentFactory(factory.django.DjangoModelFactory):
+    """Factory pour les assignations"""
+    class Meta:
+        model = Assignment
+
+    shift = factory.SubFactory(ShiftFactory)
+    employee = factory.SubFactory(EmployeeFactory)
+
+
+class TimeSheetFactory(factory.django.DjangoModelFactory):
+    """Factory pour les feuilles de temps"""
+    class Meta:
+        model = TimeSheet
+
+    employee = factory.SubFactory(EmployeeFactory)
+    year = 2026
+    month = 3
+    status = 'submitted'
+
+
+class TimeSheetEntryFactory(factory.django.DjangoModelFactory):
+    """Factory pour les entrées de feuille de temps"""
+    class Meta:
+        model = TimeSheetEntry
+
+    timesheet = factory.SubFactory(TimeSheetFactory)
+    date = date(2026, 3, 2)
+    hour_type = 'normal'
+    hours_worked = Decimal('8.00')
+    hourly_rate = Decimal('12.00')
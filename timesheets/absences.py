@@ -0,0 +1,246 @@
+"""
+Impact d'une absence sur le planning, les feuilles de temps et la paie
+
+L'impact est d'abord calculé en mémoire (compute_absence_impact), en un
+nombre fixe de requêtes quel que soit le nombre de quarts touchés :
+    - assignations actives de la période à annuler, et leurs quarts,
+    - entrées de feuille de temps liées à ces assignations à supprimer,
+    - par mois, montant retenu (maladie, absence injustifiée, ...) ou
+      maintenu (congés payés) au taux du contrat actif à la date du quart,
+      et fiche de paie recalculée avec le barème compilé.
+Il est ensuite appliqué (apply_absence_impact) en écritures groupées dans une
+seule transaction, ou simplement restitué en mode prévisualisation.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from contracts.models import Contract
+from payroll.engine import _write_contribution_items
+from payroll.models import Payroll, PayrollItem
+from payroll.rules import get_rule_set
+from planning.conflicts import invalidate_planning_index
+from planning.models import Assignment, Shift
+from sirh_core.stats_cache import invalidate_stats
+from .models import AbsenceRecord, TimeSheet, TimeSheetEntry
+from .totals import deferred_totals
+
+
+# Assignations annulées par une absence
+CANCELLABLE_ASSIGNMENT_STATUSES = ['assigned', 'confirmed', 'in_progress', 'completed']
+
+# Règles de rémunération selon le type d'absence (référence droit du travail)
+PAY_BLOCKED_ABSENCE_TYPES = ['sick', 'unpaid', 'maternal', 'paternal', 'personal']
+PAY_MAINTAINED_ABSENCE_TYPES = ['vacation']
+
+# Base mensuelle légale (35h) pour déduire un taux horaire d'un salaire mensuel
+MONTHLY_HOURS = Decimal('151.67')
+
+PAYROLL_ABSENCE_FIELDS = [
+    'gross_salary', 'other_deductions', 'social_security', 'taxes',
+    'total_deductions', 'net_salary', 'calculation_snapshot', 'updated_at',
+]
+
+
+def contract_hourly_rate(contract):
+    """Taux horaire du contrat, déduit du salaire mensuel si besoin"""
+    if contract.hourly_rate:
+        return contract.hourly_rate
+    if contract.monthly_salary:
+        return (contract.monthly_salary / MONTHLY_HOURS).quantize(Decimal('0.01'))
+    return None
+
+
+class AbsenceImpact:
+    """Impact calculé d'une absence, applicable en une transaction"""
+
+    def __init__(self, absence):
+        self.absence = absence
+        self.assignments = []
+        self.shifts = []
+        self.entry_ids = []
+        self.timesheet_ids = set()
+        self.payrolls = []
+        self.new_payrolls = []
+        self.payroll_items = []
+        self.contribution_lines = []
+        self.salarial_names = ()
+        self.deduction_total = Decimal('0.00')
+        self.maintained_total = Decimal('0.00')
+
+    @property
+    def pay_blocked(self):
+        return self.absence.absence_type in PAY_BLOCKED_ABSENCE_TYPES
+
+    @property
+    def pay_maintained(self):
+        return self.absence.absence_type in PAY_MAINTAINED_ABSENCE_TYPES
+
+    def summary(self):
+        """Résumé sérialisable de l'impact (prévisualisation et réponse d'API)"""
+        return {
+            'cancelled_assignments': len(self.assignments),
+            'cancelled_shifts': len(self.shifts),
+            'deleted_entries': len(self.entry_ids),
+            'deduction_total': self.deduction_total,
+            'maintained_total': self.maintained_total,
+            'payrolls': [
+                {
+                    'period': payroll.period,
+                    'created': payroll in self.new_payrolls,
+                    'gross_salary': payroll.gross_salary,
+                    'other_deductions': payroll.other_deductions,
+                    'net_salary': payroll.net_salary,
+                }
+                for payroll in self.payrolls
+            ],
+        }
+
+
+def compute_absence_impact(absence):
+    """Calculer en mémoire l'impact d'une absence (non enregistrée ou enregistrée), sans écriture"""
+    impact = AbsenceImpact(absence)
+    employee = absence.employee
+    assignments = list(
+        Assignment.objects.filter(
+            employee=employee,
+            shift__date__gte=absence.date_start,
+            shift__date__lte=absence.date_end,
+            status__in=CANCELLABLE_ASSIGNMENT_STATUSES
+        ).select_related('shift').order_by('shift__date', 'shift__start_time')
+    )
+    if not assignments:
+        return impact
+
+    note_suffix = f"Absence du {absence.date_start} au {absence.date_end} ({absence.get_absence_type_display()})"
+    for assignment in assignments:
+        assignment.status = 'cancelled'
+        assignment.notes = f"{assignment.notes}\n{note_suffix}" if assignment.notes else note_suffix
+        impact.assignments.append(assignment)
+        # Annuler également le quart (shift) si pas déjà annulé
+        shift = assignment.shift
+        if shift.status != 'cancelled' and shift not in impact.shifts:
+            shift.status = 'cancelled'
+            shift.notes = f"{shift.notes}\n{note_suffix}" if shift.notes else note_suffix
+            impact.shifts.append(shift)
+
+    for entry_id, timesheet_id in TimeSheetEntry.objects.filter(
+        assignment__in=assignments
+    ).values_list('id', 'timesheet_id'):
+        impact.entry_ids.append(entry_id)
+        impact.timesheet_ids.add(timesheet_id)
+
+    if impact.pay_blocked or impact.pay_maintained:
+        _compute_payroll_deltas(impact, assignments)
+    return impact
+
+
+def _compute_payroll_deltas(impact, assignments):
+    """Montants retenus ou maintenus par mois et fiches de paie recalculées en mémoire"""
+    employee = impact.absence.employee
+    # Contrats actifs par date de début décroissante : le premier commencé avant le quart s'applique
+    contracts = list(
+        Contract.objects.filter(
+            employee=employee,
+            status='active',
+            start_date__lte=impact.absence.date_end
+        ).order_by('-start_date')
+    )
+
+    amounts_by_period = defaultdict(list)
+    for assignment in assignments:
+        shift = assignment.shift
+        contract = next((contract for contract in contracts if contract.start_date <= shift.date), None)
+        rate = contract_hourly_rate(contract) if contract else None
+        if not rate:
+            continue
+        amount = (Decimal(str(shift.duration_hours)) * rate).quantize(Decimal('0.01'))
+        amounts_by_period[(shift.date.year, shift.date.month)].append((shift.date, amount))
+    if not amounts_by_period:
+        return
+
+    periods = {f'{year:04d}-{month:02d}': (year, month) for year, month in amounts_by_period}
+    payrolls = {
+        payroll.period: payroll
+        for payroll in Payroll.objects.filter(employee=employee, period__in=list(periods))
+    }
+    rule_set = get_rule_set()
+    label = impact.absence.get_absence_type_display()
+
+    for period, (year, month) in sorted(periods.items()):
+        payroll = payrolls.get(period)
+        if payroll is None:
+            payroll = Payroll(employee=employee, year=year, month=month, period=period)
+            impact.new_payrolls.append(payroll)
+        for shift_date, amount in amounts_by_period[(year, month)]:
+            if impact.pay_blocked:
+                impact.deduction_total += amount
+                payroll.other_deductions += amount
+                impact.payroll_items.append(PayrollItem(
+                    payroll=payroll,
+                    item_type='deduction',
+                    description=f"Absence {label} le {shift_date}",
+                    amount=amount
+                ))
+            else:
+                impact.maintained_total += amount
+                payroll.gross_salary += amount
+                impact.payroll_items.append(PayrollItem(
+                    payroll=payroll,
+                    item_type='salary',
+                    description=f"Maintien salaire congé payé le {shift_date}",
+                    amount=amount
+                ))
+        # Recalculer les cotisations sur le brut et les déductions modifiés
+        impact.contribution_lines.append((payroll, rule_set.apply(payroll)))
+        impact.payrolls.append(payroll)
+    impact.salarial_names = rule_set.salarial_names
+
+
+def apply_absence_impact(impact):
+    """Enregistrer l'absence et appliquer son impact en écritures groupées, dans une transaction"""
+    now = timezone.now()
+    with transaction.atomic():
+        if impact.absence.pk is None:
+            impact.absence.save()
+        for instance in impact.assignments + impact.shifts + impact.payrolls:
+            instance.updated_at = now
+        if impact.assignments:
+            Assignment.objects.bulk_update(impact.assignments, ['status', 'notes', 'updated_at'])
+        if impact.shifts:
+            Shift.objects.bulk_update(impact.shifts, ['status', 'notes', 'updated_at'])
+        if impact.entry_ids:
+            timesheets = TimeSheet.objects.filter(id__in=impact.timesheet_ids)
+            with deferred_totals(timesheets):
+                TimeSheetEntry.objects.filter(id__in=impact.entry_ids).delete()
+        if impact.new_payrolls:
+            Payroll.objects.bulk_create(impact.new_payrolls)
+        existing = [payroll for payroll in impact.payrolls if payroll not in impact.new_payrolls]
+        if existing:
+            Payroll.objects.bulk_update(existing, PAYROLL_ABSENCE_FIELDS)
+        if impact.payroll_items:
+            PayrollItem.objects.bulk_create(impact.payroll_items)
+        if impact.contribution_lines:
+            _write_contribution_items(impact.contribution_lines, impact.salarial_names)
+    # bulk_update n'envoie pas de signaux
+    if impact.assignments:
+        invalidate_planning_index()
+    invalidate_stats('planning', 'timesheets', 'payroll')
+    return impact
+
+
+def record_absence(employee, date_start, date_end, absence_type, notes='', dry_run=False):
+    """Créer une absence et appliquer son impact ; en dry_run, seulement le calculer"""
+    absence = AbsenceRecord(
+        employee=employee,
+        date_start=date_start,
+        date_end=date_end,
+        absence_type=absence_type,
+        notes=notes
+    )
+    impact = compute_absence_impact(absence)
+    if not dry_run:
+        apply_absence_impact(impact)
+    return impact
@@ -5,3 +5,6 @@ class TimesheetsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'timesheets'
     verbose_name = 'Gestion du temps de travail'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,138 @@
+"""
+Remplissage automatique des feuilles de temps à partir des quarts assignés
+
+Le remplissage travaille sur un lot de feuilles (une seule ou toutes celles
+d'un mois) : assignments, shifts, contrats et entrées existantes sont chargés
+en un nombre fixe de requêtes, chaque quart est découpé en mémoire en heures
+normales/nuit/dimanche/férié (timesheets.hours), puis le résultat est comparé
+aux entrées auto-générées existantes et appliqué avec bulk_create /
+bulk_update / un seul delete. Les entrées saisies à la main
+(sans assignment, ex: ajustements) ne sont jamais touchées.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from contracts.models import active_contracts_by_employee
+from planning.models import Assignment
+from .hours import split_shift
+from .models import TimeSheet, TimeSheetEntry
+from .totals import deferred_totals
+
+
+# Assignments pris en compte dans les feuilles de temps
+WORKED_ASSIGNMENT_STATUSES = ['assigned', 'confirmed', 'in_progress', 'completed']
+
+# Feuilles de temps encore modifiables par le remplissage mensuel
+AUTO_FILL_TIMESHEET_STATUSES = ['draft', 'submitted', 'rejected']
+
+AUTO_FILL_FIELDS = ['date', 'hours_worked', 'hourly_rate', 'notes']
+
+
+def month_bounds(year, month):
+    """Premier et dernier jour du mois"""
+    first_day = date(year, month, 1)
+    next_month = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return first_day, next_month - timedelta(days=1)
+
+
+def auto_fill_timesheets(timesheets):
+    """
+    Synchroniser les entrées auto-générées d'un lot de feuilles de temps
+    avec les quarts assignés. Toutes les feuilles doivent porter sur le même mois.
+
+    Retourne un dict : {'timesheets', 'entries', 'created', 'updated', 'deleted'}
+    """
+    timesheets = list(timesheets)
+    result = {'timesheets': len(timesheets), 'entries': 0, 'created': 0, 'updated': 0, 'deleted': 0}
+    if not timesheets:
+        return result
+
+    periods = {(timesheet.year, timesheet.month) for timesheet in timesheets}
+    if len(periods) > 1:
+        raise ValueError('Le remplissage automatique porte sur un seul mois à la fois')
+    first_day, last_day = month_bounds(*periods.pop())
+
+    timesheets_by_employee = {timesheet.employee_id: timesheet for timesheet in timesheets}
+    employee_ids = list(timesheets_by_employee)
+
+    assignments = (
+        Assignment.objects.filter(
+            employee_id__in=employee_ids,
+            shift__date__gte=first_day,
+            shift__date__lte=last_day,
+            status__in=WORKED_ASSIGNMENT_STATUSES
+        )
+        .select_related('shift__shift_type')
+        .order_by('shift__date', 'shift__start_time')
+    )
+    contracts_by_employee = active_contracts_by_employee(employee_ids)
+
+    # Entrées attendues, indexées par (assignment, type d'heures)
+    desired = {}
+    for assignment in assignments:
+        timesheet = timesheets_by_employee[assignment.employee_id]
+        contract = contracts_by_employee.get(assignment.employee_id)
+        # Utiliser un taux horaire par défaut si absent
+        hourly_rate = contract.hourly_rate if contract and contract.hourly_rate else Decimal('0.00')
+        shift = assignment.shift
+        for hour_type, hours in split_shift(shift):
+            if not hours:
+                continue
+            desired[(assignment.id, hour_type)] = TimeSheetEntry(
+                timesheet=timesheet,
+                assignment=assignment,
+                date=shift.date,
+                hour_type=hour_type,
+                hours_worked=hours,
+                hourly_rate=hourly_rate,
+                notes=f"Auto-généré du quart {shift.shift_type}"
+            )
+
+    now = timezone.now()
+    to_update = []
+    to_delete = []
+    existing_entries = TimeSheetEntry.objects.filter(
+        timesheet__in=timesheets,
+        assignment__isnull=False
+    ).order_by('id')
+    for entry in existing_entries:
+        wanted = desired.pop((entry.assignment_id, entry.hour_type), None)
+        if wanted is None or wanted.timesheet.id != entry.timesheet_id:
+            # Quart annulé, réaffecté, changé de type ou doublon
+            to_delete.append(entry.id)
+            if wanted is not None:
+                desired[(entry.assignment_id, entry.hour_type)] = wanted
+            continue
+        result['entries'] += 1
+        if any(getattr(entry, field) != getattr(wanted, field) for field in AUTO_FILL_FIELDS):
+            for field in AUTO_FILL_FIELDS:
+                setattr(entry, field, getattr(wanted, field))
+            entry.updated_at = now
+            to_update.append(entry)
+
+    to_create = list(desired.values())
+    result['entries'] += len(to_create)
+
+    with transaction.atomic(), deferred_totals(timesheets):
+        if to_delete:
+            TimeSheetEntry.objects.filter(id__in=to_delete).delete()
+        if to_update:
+            TimeSheetEntry.objects.bulk_update(to_update, AUTO_FILL_FIELDS + ['updated_at'], batch_size=500)
+        if to_create:
+            TimeSheetEntry.objects.bulk_create(to_create, batch_size=500)
+
+    result.update(created=len(to_create), updated=len(to_update), deleted=len(to_delete))
+    return result
+
+
+def auto_fill_period(year, month, statuses=None):
+    """Remplir les feuilles de temps modifiables de tous les employés pour un mois"""
+    timesheets = TimeSheet.objects.filter(
+        year=year,
+        month=month,
+        status__in=statuses or AUTO_FILL_TIMESHEET_STATUSES
+    )
+    return auto_fill_timesheets(timesheets)
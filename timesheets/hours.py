@@ -0,0 +1,149 @@
+"""
+Découpage des quarts en heures normales / nuit / dimanche / férié
+
+Un quart [début, fin) est découpé par arithmétique d'intervalles : les seules
+bornes utiles sont les minuits et les limites de la plage de nuit de chaque
+jour traversé. Entre deux bornes, la catégorie est constante, le coût d'un
+quart est donc proportionnel au nombre de jours traversés (1 ou 2), pas à sa
+durée en minutes.
+
+Priorité quand plusieurs catégories s'appliquent à une même minute (une
+entrée de feuille de temps n'a qu'un type) : férié > dimanche > nuit > normal,
+c'est-à-dire la majoration la plus favorable au salarié.
+"""
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from functools import lru_cache
+
+
+# Plage de travail de nuit (Code du travail, L3122-2 : 21h - 6h par défaut)
+NIGHT_START = time(21, 0)
+NIGHT_END = time(6, 0)
+
+# Ordre de restitution des segments
+HOUR_TYPES = ['normal', 'night', 'sunday', 'holiday']
+
+HOURS_PRECISION = Decimal('0.01')
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def easter_sunday(year):
+    """Dimanche de Pâques (algorithme de Meeus/Jones/Butcher, calendrier grégorien)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+@lru_cache(maxsize=None)
+def public_holidays(year):
+    """Jours fériés légaux en France métropolitaine pour une année (table calculée une fois)"""
+    easter = easter_sunday(year)
+    return frozenset([
+        date(year, 1, 1),                 # Jour de l'an
+        easter + timedelta(days=1),       # Lundi de Pâques
+        date(year, 5, 1),                 # Fête du travail
+        date(year, 5, 8),                 # Victoire 1945
+        easter + timedelta(days=39),      # Ascension
+        easter + timedelta(days=50),      # Lundi de Pentecôte
+        date(year, 7, 14),                # Fête nationale
+        date(year, 8, 15),                # Assomption
+        date(year, 11, 1),                # Toussaint
+        date(year, 11, 11),               # Armistice 1918
+        date(year, 12, 25),               # Noël
+    ])
+
+
+def is_public_holiday(day):
+    return day in public_holidays(day.year)
+
+
+def _day_category(day):
+    """Catégorie prioritaire valable toute la journée (férié, dimanche) ou None"""
+    if day in public_holidays(day.year):
+        return 'holiday'
+    if day.weekday() == 6:
+        return 'sunday'
+    return None
+
+
+def split_minutes(start, end):
+    """
+    Minutes par type d'heures pour l'intervalle [start, end) (datetimes naïfs).
+    Retourne un dict {hour_type: minutes} ne contenant que les types présents.
+    """
+    minutes = {}
+    if end <= start:
+        return minutes
+
+    night_start = _minutes(NIGHT_START)
+    night_end = _minutes(NIGHT_END)
+    day = start.date()
+    # Position courante et fin, en minutes depuis minuit du premier jour
+    position = _minutes(start)
+    stop = (end.date() - day).days * MINUTES_PER_DAY + _minutes(end)
+
+    offset = 0
+    while position < stop:
+        day_end = offset + MINUTES_PER_DAY
+        category = _day_category(day)
+        if category:
+            length = min(stop, day_end) - position
+            minutes[category] = minutes.get(category, 0) + length
+        else:
+            # Bornes de la journée : [0, fin de nuit) nuit, [fin de nuit, début de nuit) normal, reste nuit
+            for bound_start, bound_end, hour_type in (
+                (offset, offset + night_end, 'night'),
+                (offset + night_end, offset + night_start, 'normal'),
+                (offset + night_start, day_end, 'night'),
+            ):
+                length = min(stop, bound_end) - max(position, bound_start)
+                if length > 0:
+                    minutes[hour_type] = minutes.get(hour_type, 0) + length
+        position = day_end
+        offset = day_end
+        day += timedelta(days=1)
+    return minutes
+
+
+def shift_bounds(shift):
+    """
+    Début et fin (datetimes naïfs) d'un quart, fin au lendemain s'il passe
+    minuit ; fin égale au début : quart de 24h (comme planning.conflicts)
+    """
+    start = datetime.combine(shift.date, shift.start_time)
+    end = datetime.combine(shift.date, shift.end_time)
+    if end <= start:
+        end += timedelta(days=1)
+    return start, end
+
+
+def split_shift(shift):
+    """
+    Heures par type d'un quart : [(hour_type, heures)] dans l'ordre de HOUR_TYPES,
+    sans les types vides.
+    """
+    minutes = split_minutes(*shift_bounds(shift))
+    return [
+        (hour_type, (Decimal(minutes[hour_type]) / 60).quantize(HOURS_PRECISION))
+        for hour_type in HOUR_TYPES
+        if minutes.get(hour_type)
+    ]
+
+
+def split_shifts(shifts):
+    """Découper un lot de quarts : itérateur de (shift, [(hour_type, heures)])"""
+    for shift in shifts:
+        yield shift, split_shift(shift)
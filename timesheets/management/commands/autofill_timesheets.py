@@ -0,0 +1,24 @@
+"""
+Management command pour remplir les feuilles de temps d'un mois à partir des quarts
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from timesheets.autofill import auto_fill_period
+
+
+class Command(BaseCommand):
+    help = 'Remplit automatiquement les feuilles de temps de tous les employés pour un mois'
+
+    def add_arguments(self, parser):
+        today = timezone.now().date()
+        parser.add_argument('--year', type=int, default=today.year, help='Année (par défaut : année courante)')
+        parser.add_argument('--month', type=int, default=today.month, help='Mois 1-12 (par défaut : mois courant)')
+
+    def handle(self, *args, **options):
+        result = auto_fill_period(options['year'], options['month'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {result['timesheets']} feuille(s) traitée(s) : "
+            f"{result['created']} entrée(s) créée(s), {result['updated']} mise(s) à jour, "
+            f"{result['deleted']} supprimée(s)"
+        ))
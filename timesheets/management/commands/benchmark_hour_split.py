@@ -0,0 +1,84 @@
+"""
+Management command pour mesurer le découpage des quarts sur une année synthétique
+"""
+import time as clock
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+
+from django.core.management.base import BaseCommand
+
+from timesheets.hours import NIGHT_END, NIGHT_START, is_public_holiday, split_minutes, split_shift
+
+
+SyntheticShift = namedtuple('SyntheticShift', ['date', 'start_time', 'end_time'])
+
+# Horaires types d'une entreprise de transport sanitaire
+PATTERNS = [
+    (time(8, 0), time(16, 0)),
+    (time(14, 0), time(22, 0)),
+    (time(19, 0), time(7, 0)),
+    (time(21, 30), time(5, 15)),
+    (time(6, 45), time(18, 45)),
+]
+
+
+def synthetic_year(year, crews):
+    """Tous les horaires types, chaque jour de l'année, pour `crews` équipes"""
+    day = date(year, 1, 1)
+    shifts = []
+    while day.year == year:
+        for start_time, end_time in PATTERNS:
+            shifts.extend([SyntheticShift(day, start_time, end_time)] * crews)
+        day += timedelta(days=1)
+    return shifts
+
+
+def split_per_minute(start, end):
+    """Référence naïve minute par minute (pour vérification uniquement)"""
+    minutes = {}
+    current = start
+    while current < end:
+        if is_public_holiday(current.date()):
+            hour_type = 'holiday'
+        elif current.weekday() == 6:
+            hour_type = 'sunday'
+        elif current.time() >= NIGHT_START or current.time() < NIGHT_END:
+            hour_type = 'night'
+        else:
+            hour_type = 'normal'
+        minutes[hour_type] = minutes.get(hour_type, 0) + 1
+        current += timedelta(minutes=1)
+    return minutes
+
+
+class Command(BaseCommand):
+    help = "Mesure le découpage nuit/dimanche/férié sur une année de quarts synthétiques"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, default=date.today().year)
+        parser.add_argument('--crews', type=int, default=20, help='Équipes par horaire et par jour')
+
+    def handle(self, *args, **options):
+        shifts = synthetic_year(options['year'], options['crews'])
+
+        started = clock.perf_counter()
+        for shift in shifts:
+            split_shift(shift)
+        elapsed = clock.perf_counter() - started
+
+        # Vérification sur une journée de chaque horaire, contre la référence minute par minute
+        checked = 0
+        for shift in set(shifts):
+            start = datetime.combine(shift.date, shift.start_time)
+            end = datetime.combine(shift.date, shift.end_time)
+            if end < start:
+                end += timedelta(days=1)
+            if split_minutes(start, end) != split_per_minute(start, end):
+                self.stderr.write(self.style.ERROR(f'❌ Écart pour {shift}'))
+                return
+            checked += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(shifts)} quarts découpés en {elapsed:.3f}s "
+            f"({len(shifts) / elapsed:,.0f} quarts/s), {checked} horaires vérifiés minute par minute"
+        ))
@@ -0,0 +1,23 @@
+"""
+Management command pour reclasser les heures supplémentaires hebdomadaires d'un mois
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from timesheets.overtime import compute_overtime_period
+
+
+class Command(BaseCommand):
+    help = 'Reclasse en heures supplémentaires les heures au-delà de la durée hebdomadaire du contrat'
+
+    def add_arguments(self, parser):
+        today = timezone.now().date()
+        parser.add_argument('--year', type=int, default=today.year, help='Année (par défaut : année courante)')
+        parser.add_argument('--month', type=int, default=today.month, help='Mois 1-12 (par défaut : mois courant)')
+
+    def handle(self, *args, **options):
+        result = compute_overtime_period(options['year'], options['month'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {result['weeks']} semaine(s) en dépassement, "
+            f"{result['overtime_hours']}h reclassées en heures supplémentaires"
+        ))
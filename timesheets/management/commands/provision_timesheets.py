@@ -0,0 +1,23 @@
+"""
+Management command pour créer les feuilles de temps du mois et envoyer les rappels
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from timesheets.provisioning import provision_timesheets
+
+
+class Command(BaseCommand):
+    help = 'Crée les feuilles de temps manquantes des employés actifs et envoie les rappels de soumission'
+
+    def add_arguments(self, parser):
+        today = timezone.now().date()
+        parser.add_argument('--year', type=int, default=today.year, help='Année (par défaut : année courante)')
+        parser.add_argument('--month', type=int, default=today.month, help='Mois 1-12 (par défaut : mois courant)')
+
+    def handle(self, *args, **options):
+        result = provision_timesheets(options['year'], options['month'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {result['created']} feuille(s) créée(s) pour {result['employees']} employé(s) actif(s), "
+            f"{result['reminders']} rappel(s) envoyé(s)"
+        ))
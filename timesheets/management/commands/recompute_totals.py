@@ -0,0 +1,39 @@
+"""
+Management command pour reconstruire les totaux d'heures stockés des feuilles de temps
+"""
+from django.core.management.base import BaseCommand
+
+from timesheets.models import TimeSheet
+from timesheets.totals import rebuild_totals
+
+
+class Command(BaseCommand):
+    help = "Recalcule les totaux d'heures stockés des feuilles de temps à partir des entrées"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Limiter à une année')
+        parser.add_argument('--month', type=int, help='Limiter à un mois (1-12)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Feuilles traitées par lot')
+
+    def handle(self, *args, **options):
+        timesheets = TimeSheet.objects.order_by('pk')
+        if options['year']:
+            timesheets = timesheets.filter(year=options['year'])
+        if options['month']:
+            timesheets = timesheets.filter(month=options['month'])
+
+        batch_size = options['batch_size']
+        checked = 0
+        changed = 0
+        last_pk = 0
+        while True:
+            batch = list(timesheets.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            changed += rebuild_totals(batch, batch_size=batch_size)
+            checked += len(batch)
+            last_pk = batch[-1].pk
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {checked} feuille(s) vérifiée(s), {changed} total(aux) corrigé(s)"
+        ))
@@ -0,0 +1,78 @@
+# Generated by Django 4.2.8 on 2026-10-17 11:34
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Q, Sum
+
+
+HOUR_TYPE_TOTAL_FIELDS = {
+    'normal': 'total_normal_hours',
+    'night': 'total_night_hours',
+    'sunday': 'total_sunday_hours',
+    'holiday': 'total_holiday_hours',
+    'overtime': 'total_overtime_hours',
+}
+
+
+def fill_hour_totals(apps, schema_editor):
+    """Initialiser les totaux stockés à partir des entrées existantes"""
+    TimeSheet = apps.get_model('timesheets', 'TimeSheet')
+    TimeSheetEntry = apps.get_model('timesheets', 'TimeSheetEntry')
+
+    aggregates = {
+        field: Sum('hours_worked', filter=Q(hour_type=hour_type))
+        for hour_type, field in HOUR_TYPE_TOTAL_FIELDS.items()
+    }
+    aggregates['total_hours'] = Sum('hours_worked')
+    rows = TimeSheetEntry.objects.order_by().values('timesheet_id').annotate(**aggregates)
+    totals_by_timesheet = {row['timesheet_id']: row for row in rows}
+
+    fields = ['total_hours'] + list(HOUR_TYPE_TOTAL_FIELDS.values())
+    timesheets = list(TimeSheet.objects.filter(id__in=totals_by_timesheet.keys()))
+    for timesheet in timesheets:
+        row = totals_by_timesheet[timesheet.id]
+        for field in fields:
+            setattr(timesheet, field, row[field] or Decimal('0.00'))
+    TimeSheet.objects.bulk_update(timesheets, fields, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timesheets', '0005_timesheet_timesheets__year_3134ba_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timesheet',
+            name='total_holiday_hours',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=7, verbose_name='Heures féries'),
+        ),
+        migrations.AddField(
+            model_name='timesheet',
+            name='total_hours',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=7, verbose_name='Total heures'),
+        ),
+        migrations.AddField(
+            model_name='timesheet',
+            name='total_night_hours',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=7, verbose_name='Heures de nuit'),
+        ),
+        migrations.AddField(
+            model_name='timesheet',
+            name='total_normal_hours',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=7, verbose_name='Heures normales'),
+        ),
+        migrations.AddField(
+            model_name='timesheet',
+            name='total_overtime_hours',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=7, verbose_name='Heures supplémentaires'),
+        ),
+        migrations.AddField(
+            model_name='timesheet',
+            name='total_sunday_hours',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=7, verbose_name='Heures dimanche'),
+        ),
+        migrations.RunPython(fill_hour_totals, migrations.RunPython.noop),
+    ]
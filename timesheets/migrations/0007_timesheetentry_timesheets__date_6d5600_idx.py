@@ -0,0 +1,17 @@
+# Generated by Django 4.2.8 on 2026-10-17 12:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timesheets', '0006_timesheet_hour_totals'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='timesheetentry',
+            index=models.Index(fields=['-date', '-id'], name='timesheets__date_6d5600_idx'),
+        ),
+    ]
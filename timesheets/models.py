@@ -8,6 +8,28 @@ from planning.models import Assignment, ShiftType
 from accounts.models import CustomUser
 
 
+# Champ de total stocké sur TimeSheet pour chaque type d'heures
+HOUR_TYPE_TOTAL_FIELDS = {
+    'normal': 'total_normal_hours',
+    'night': 'total_night_hours',
+    'sunday': 'total_sunday_hours',
+    'holiday': 'total_holiday_hours',
+    'overtime': 'total_overtime_hours',
+}
+
+TOTAL_FIELDS = ['total_hours'] + list(HOUR_TYPE_TOTAL_FIELDS.values())
+
+
+def hour_totals_aggregates():
+    """Agrégats Sum(heures) par type d'heures et total général"""
+    aggregates = {
+        field: Sum('hours_worked', filter=Q(hour_type=hour_type))
+        for hour_type, field in HOUR_TYPE_TOTAL_FIELDS.items()
+    }
+    aggregates['total_hours'] = Sum('hours_worked')
+    return aggregates
+
+
 class TimeSheet(models.Model):
     """Feuille de temps mensuelle d'un employé"""
     
@@ -67,6 +89,50 @@ class TimeSheet(models.Model):
         verbose_name='Approuvé par',
         help_text='Approuvé par'
     )
+    
+    # Totaux d'heures dénormalisés, maintenus par les signaux des entrées (timesheets.signals)
+    total_hours = models.DecimalField(
+        max_digits=7,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False,
+        verbose_name='Total heures'
+    )
+    total_normal_hours = models.DecimalField(
+        max_digits=7,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False,
+        verbose_name='Heures normales'
+    )
+    total_night_hours = models.DecimalField(
+        max_digits=7,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False,
+        verbose_name='Heures de nuit'
+    )
+    total_sunday_hours = models.DecimalField(
+        max_digits=7,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False,
+        verbose_name='Heures dimanche'
+    )
+    total_holiday_hours = models.DecimalField(
+        max_digits=7,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False,
+        verbose_name='Heures féries'
+    )
+    total_overtime_hours = models.DecimalField(
+        max_digits=7,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False,
+        verbose_name='Heures supplémentaires'
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Créé le')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Mis à jour le')
     
@@ -84,36 +150,10 @@ class TimeSheet(models.Model):
     def __str__(self):
         return f"Feuille de temps {self.employee} - {self.month}/{self.year}"
     
-    @property
-    def total_hours(self):
-        """Calculer le total d'heures du mois"""
-        entries = self.entries.all()
-        return entries.aggregate(total=Sum('hours_worked'))['total'] or 0
-    
-    @property
-    def total_normal_hours(self):
-        """Calculer le total d'heures normales"""
-        return self.entries.filter(hour_type='normal').aggregate(total=Sum('hours_worked'))['total'] or 0
-    
-    @property
-    def total_night_hours(self):
-        """Calculer le total d'heures de nuit"""
-        return self.entries.filter(hour_type='night').aggregate(total=Sum('hours_worked'))['total'] or 0
-    
-    @property
-    def total_sunday_hours(self):
-        """Calculer le total d'heures du dimanche"""
-        return self.entries.filter(hour_type='sunday').aggregate(total=Sum('hours_worked'))['total'] or 0
-    
-    @property
-    def total_holiday_hours(self):
-        """Calculer le total d'heures de féries"""
-        return self.entries.filter(hour_type='holiday').aggregate(total=Sum('hours_worked'))['total'] or 0
-    
-    @property
-    def total_overtime_hours(self):
-        """Calculer le total d'heures supplémentaires"""
-        return self.entries.filter(hour_type='overtime').aggregate(total=Sum('hours_worked'))['total'] or 0
+    def recompute_totals(self):
+        """Recalculer les totaux d'heures stockés à partir des entrées"""
+        from .totals import rebuild_totals
+        rebuild_totals([self])
     
     def get_last_day_of_month(self):
         """Retourner le dernier jour du mois"""
@@ -128,73 +168,12 @@ class TimeSheet(models.Model):
         return self.status in ['submitted', 'approved', 'paid']
     
     def auto_fill_from_assignments(self):
-        """Remplir automatiquement les entrées à partir des quarts assignés"""
-        from datetime import datetime, timedelta, time
-        from calendar import monthrange
-        from contracts.models import Contract
-        
-        # Récupérer le contrat actif de l'employé pour le taux horaire
-        today = datetime.now().date()
-        active_contract = (
-            Contract.objects.filter(employee=self.employee, status='active')
-            .filter(Q(end_date__isnull=True) | Q(end_date__gte=today))
-            .filter(Q(start_date__isnull=True) | Q(start_date__lte=today))
-            .order_by('-start_date')
-            .first()
-        )
-        
-        # Utiliser un taux horaire par défaut si absent
-        hourly_rate = active_contract.hourly_rate if active_contract and active_contract.hourly_rate else Decimal('0.00')
-        
-        # Récupérer le nombre de jours dans le mois
-        days_in_month = monthrange(self.year, self.month)[1]
-        
-        # Récupérer les assignments de l'employé pour ce mois
-        assignments = Assignment.objects.filter(
-            employee=self.employee,
-            shift__date__year=self.year,
-            shift__date__month=self.month,
-            status__in=['assigned', 'confirmed', 'in_progress', 'completed']
-        ).select_related('shift')
-        
-        # Supprimer uniquement les entrées existantes liées à des assignments (pas les ajustements)
-        self.entries.filter(assignment__isnull=False).delete()
-        
-        # Créer une entrée pour chaque assignment
-        entries_created = 0
-        for assignment in assignments:
-            shift = assignment.shift
-            
-            # Calculer les heures
-            start = datetime.combine(shift.date, shift.start_time)
-            end = datetime.combine(shift.date, shift.end_time)
-            
-            # Gérer les quarts de nuit (passant minuit)
-            if end < start:
-                end += timedelta(days=1)
-            
-            hours = (end - start).total_seconds() / 3600
-            
-            # Déterminer le type d'heures (comparer directement les objets time)
-            hour_type = 'normal'
-            if shift.date.weekday() == 6:  # Dimanche
-                hour_type = 'sunday'
-            elif shift.start_time >= time(21, 0) or shift.end_time <= time(7, 0):
-                hour_type = 'night'
-            
-            # Créer l'entrée
-            TimeSheetEntry.objects.create(
-                timesheet=self,
-                assignment=assignment,
-                date=shift.date,
-                hour_type=hour_type,
-                hours_worked=hours,
-                hourly_rate=hourly_rate,
-                notes=f"Auto-généré du quart {shift.shift_type}"
-            )
-            entries_created += 1
-        
-        return entries_created
+        """
+        Remplir automatiquement les entrées à partir des quarts assignés.
+        Retourne le nombre d'entrées auto-générées de la feuille.
+        """
+        from .autofill import auto_fill_timesheets
+        return auto_fill_timesheets([self])['entries']
 
 
 class TimeSheetEntry(models.Model):
@@ -258,10 +237,27 @@ class TimeSheetEntry(models.Model):
         verbose_name = 'Entrée feuille de temps'
         verbose_name_plural = 'Entrées feuille de temps'
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['-date', '-id']),
+        ]
     
     def __str__(self):
         return f"{self.timesheet.employee} - {self.date} ({self.get_hour_type_display()})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.snapshot_hours()
+        return instance
+    
+    def snapshot_hours(self):
+        """Mémoriser (feuille, type, heures) tels qu'en base pour les totaux incrémentaux"""
+        self._stored_hours = (
+            self.__dict__.get('timesheet_id'),
+            self.__dict__.get('hour_type'),
+            self.__dict__.get('hours_worked'),
+        )
+    
     @property
     def amount(self):
         """Calculer le montant pour cette entrée"""
@@ -0,0 +1,131 @@
+"""
+Calcul des heures supplémentaires hebdomadaires (semaine ISO)
+
+Les entrées du mois sont parcourues en une seule passe, triées par employé
+puis par date, via un itérateur (values_list().iterator()) : seule la semaine
+en cours d'un employé est gardée en mémoire.
+
+Pour chaque semaine ISO, les heures travaillées (normal, nuit, dimanche,
+férié) au-delà de Contract.working_hours_per_week sont reclassées en heures
+supplémentaires, comme un ajustement :
+    - une entrée 'normal' négative retire les heures reclassées,
+    - une entrée 'overtime' les ajoute.
+Les heures supplémentaires sont payées à un taux unique (variable de paie
+« Taux heures supplémentaires », SalaryScale.overtime_multiplier) : la paie
+ne distingue pas de paliers.
+Seules les heures normales sont reclassées (les heures de nuit, dimanche et
+férié gardent leur majoration). Les entrées générées portent le préfixe
+OVERTIME_NOTE : un nouveau calcul les remplace, les autres entrées ne sont
+jamais modifiées.
+
+Une semaine est rattachée au mois qui contient son dimanche.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import groupby
+
+from django.db import transaction
+
+from contracts.models import active_contracts_by_employee
+from .autofill import AUTO_FILL_TIMESHEET_STATUSES, month_bounds
+from .models import TimeSheet, TimeSheetEntry
+from .totals import deferred_totals
+
+
+OVERTIME_NOTE = 'Heures supplémentaires semaine'
+
+DEFAULT_WEEKLY_HOURS = Decimal('35.00')
+
+# Types d'heures comptés dans la durée hebdomadaire
+WORKED_HOUR_TYPES = ['normal', 'night', 'sunday', 'holiday']
+
+
+def week_overtime(rows, weekly_hours):
+    """
+    Heures à reclasser pour une semaine à partir de ses lignes (type, heures).
+    Retourne 0 si la durée n'est pas dépassée.
+    """
+    worked = Decimal('0.00')
+    normal = Decimal('0.00')
+    for hour_type, hours in rows:
+        worked += hours
+        if hour_type == 'normal':
+            normal += hours
+    return max(min(worked - weekly_hours, normal), Decimal('0.00'))
+
+
+def compute_overtime_period(year, month, chunk_size=2000):
+    """
+    Reclasser les heures supplémentaires de toutes les feuilles modifiables du mois.
+    Retourne un dict : {'weeks', 'overtime_hours', 'entries'}
+    """
+    first_day, last_day = month_bounds(year, month)
+    # Semaines dont le dimanche tombe dans le mois : du lundi de la première au dernier dimanche
+    week_start = first_day - timedelta(days=first_day.weekday())
+    week_end = last_day - timedelta(days=(last_day.weekday() + 1) % 7)
+
+    timesheets = list(TimeSheet.objects.filter(
+        year=year,
+        month=month,
+        status__in=AUTO_FILL_TIMESHEET_STATUSES
+    ))
+    timesheets_by_employee = {timesheet.employee_id: timesheet for timesheet in timesheets}
+    contracts_by_employee = active_contracts_by_employee(list(timesheets_by_employee))
+
+    rows = (
+        TimeSheetEntry.objects.filter(
+            timesheet__employee_id__in=list(timesheets_by_employee),
+            date__gte=week_start,
+            date__lte=week_end,
+            hour_type__in=WORKED_HOUR_TYPES
+        )
+        .exclude(notes__startswith=OVERTIME_NOTE)
+        .order_by('timesheet__employee_id', 'date')
+        .values_list('timesheet__employee_id', 'date', 'hour_type', 'hours_worked')
+        .iterator(chunk_size=chunk_size)
+    )
+
+    result = {'weeks': 0, 'overtime_hours': Decimal('0.00'), 'entries': 0}
+    buffer = []
+
+    def week_key(row):
+        iso_year, iso_week, _ = row[1].isocalendar()
+        return row[0], iso_year, iso_week
+
+    with transaction.atomic(), deferred_totals(timesheets):
+        TimeSheetEntry.objects.filter(
+            timesheet__in=timesheets,
+            notes__startswith=OVERTIME_NOTE
+        ).delete()
+
+        for (employee_id, iso_year, iso_week), week_rows in groupby(rows, key=week_key):
+            contract = contracts_by_employee.get(employee_id)
+            weekly_hours = (contract.working_hours_per_week if contract else None) or DEFAULT_WEEKLY_HOURS
+            moved = week_overtime(((hour_type, hours) for _, _, hour_type, hours in week_rows), weekly_hours)
+            if not moved:
+                continue
+
+            timesheet = timesheets_by_employee[employee_id]
+            sunday = date.fromisocalendar(iso_year, iso_week, 7)
+            hourly_rate = contract.hourly_rate if contract and contract.hourly_rate else Decimal('0.00')
+            label = f'{OVERTIME_NOTE} {iso_year}-S{iso_week:02d}'
+
+            buffer.append(TimeSheetEntry(
+                timesheet=timesheet, date=sunday, hour_type='normal', hours_worked=-moved,
+                hourly_rate=hourly_rate, notes=f'{label} : reclassement en heures supplémentaires'
+            ))
+            buffer.append(TimeSheetEntry(
+                timesheet=timesheet, date=sunday, hour_type='overtime', hours_worked=moved,
+                hourly_rate=hourly_rate, notes=label
+            ))
+
+            result['weeks'] += 1
+            result['overtime_hours'] += moved
+            if len(buffer) >= chunk_size:
+                result['entries'] += len(TimeSheetEntry.objects.bulk_create(buffer))
+                buffer = []
+
+        if buffer:
+            result['entries'] += len(TimeSheetEntry.objects.bulk_create(buffer))
+
+    return result
@@ -0,0 +1,81 @@
+"""
+Création des feuilles de temps du mois et rappels de soumission
+
+Job idempotent, à lancer périodiquement (management command
+provision_timesheets) : les feuilles manquantes des employés actifs sont
+créées en lot (une requête pour les feuilles existantes, puis bulk_create
+avec ignore_conflicts si un autre processus en crée en même temps), puis,
+à partir du REMINDER_DAY du mois, un rappel est envoyé une seule fois par
+feuille encore en brouillon. Le nombre de requêtes ne dépend pas du nombre
+d'employés.
+"""
+from datetime import date
+
+from django.utils import timezone
+
+from employees.models import Employee
+from portal.models import Notification
+from sirh_core.stats_cache import invalidate_stats
+from .models import TimeSheet
+
+
+# Jour du mois à partir duquel les feuilles en brouillon font l'objet d'un rappel
+REMINDER_DAY = 15
+
+
+def reminder_title(year, month):
+    return f"Feuille de temps à soumettre ({month:02d}/{year})"
+
+
+def provision_timesheets(year, month, today=None):
+    """
+    Créer les feuilles manquantes du mois et envoyer les rappels dus.
+    Retourne un dict : {'employees', 'created', 'reminders'}
+    """
+    today = today or timezone.localdate()
+    employee_ids = list(Employee.objects.filter(status='active').values_list('id', flat=True))
+    result = {'employees': len(employee_ids), 'created': 0, 'reminders': 0}
+    if not employee_ids:
+        return result
+
+    existing = set(
+        TimeSheet.objects.filter(year=year, month=month, employee_id__in=employee_ids)
+        .values_list('employee_id', flat=True)
+    )
+    missing = [employee_id for employee_id in employee_ids if employee_id not in existing]
+    if missing:
+        TimeSheet.objects.bulk_create(
+            [TimeSheet(employee_id=employee_id, year=year, month=month, status='draft') for employee_id in missing],
+            ignore_conflicts=True
+        )
+        invalidate_stats('timesheets')
+        result['created'] = len(missing)
+
+    if today >= date(year, month, REMINDER_DAY):
+        result['reminders'] = _send_reminders(year, month, employee_ids)
+    return result
+
+
+def _send_reminders(year, month, employee_ids):
+    """Un rappel par feuille en brouillon, sauf si l'employé l'a déjà reçu"""
+    title = reminder_title(year, month)
+    drafts = set(
+        TimeSheet.objects.filter(year=year, month=month, status='draft', employee_id__in=employee_ids)
+        .values_list('employee_id', flat=True)
+    )
+    if not drafts:
+        return 0
+    drafts -= set(
+        Notification.objects.filter(title=title, employee_id__in=drafts)
+        .values_list('employee_id', flat=True)
+    )
+    Notification.objects.bulk_create([
+        Notification(
+            employee_id=employee_id,
+            notification_type='warning',
+            title=title,
+            message='Merci de soumettre votre feuille de temps du mois en cours.'
+        )
+        for employee_id in sorted(drafts)
+    ])
+    return len(drafts)
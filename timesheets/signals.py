@@ -0,0 +1,24 @@
+"""
+Signaux de l'application feuilles de temps
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import TimeSheetEntry
+from .totals import entry_saved, entry_deleted, totals_suspended
+
+
+@receiver(post_save, sender=TimeSheetEntry)
+def timesheet_entry_saved(sender, instance, created, raw=False, **kwargs):
+    """Répercuter la création/modification d'une entrée sur les totaux de la feuille"""
+    if raw or totals_suspended():
+        return
+    entry_saved(instance, created)
+
+
+@receiver(post_delete, sender=TimeSheetEntry)
+def timesheet_entry_deleted(sender, instance, **kwargs):
+    """Retirer les heures d'une entrée supprimée des totaux de la feuille"""
+    if totals_suspended():
+        return
+    entry_deleted(instance)
@@ -1,3 +1,375 @@
-from django.test import TestCase
+from datetime import date, time
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# À compléter
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from tests.factories import (
+    AssignmentFactory, ContractFactory, EmployeeFactory, ShiftFactory, TimeSheetFactory,
+    TimeSheetEntryFactory, UserFactory,
+)
+from planning.conflicts import shift_interval_bounds
+from portal.models import Notification
+from .absences import record_absence
+from .autofill import auto_fill_period
+from .hours import public_holidays, shift_bounds, split_shift
+from .models import TimeSheet, TimeSheetEntry, TimeSheetAdjustment
+from .overtime import compute_overtime_period
+from .provisioning import provision_timesheets, reminder_title
+
+
+class TimeSheetTotalsTestCase(TestCase):
+    """Tests pour les totaux d'heures stockés sur la feuille de temps"""
+
+    def setUp(self):
+        self.timesheet = TimeSheetFactory()
+
+    def assertTotals(self, total, **by_type):
+        """Vérifier les totaux stockés (relus depuis la base)"""
+        self.timesheet.refresh_from_db()
+        self.assertEqual(self.timesheet.total_hours, Decimal(total))
+        for field, value in by_type.items():
+            self.assertEqual(getattr(self.timesheet, field), Decimal(value))
+
+    def test_entry_create_update_delete(self):
+        """Création, modification et suppression d'entrée mettent à jour les totaux"""
+        entry = TimeSheetEntryFactory(timesheet=self.timesheet, hours_worked=Decimal('8.00'))
+        TimeSheetEntryFactory(timesheet=self.timesheet, hour_type='night', hours_worked=Decimal('4.50'))
+        self.assertTotals('12.50', total_normal_hours='8.00', total_night_hours='4.50')
+
+        entry = TimeSheetEntry.objects.get(pk=entry.pk)
+        entry.hour_type = 'sunday'
+        entry.hours_worked = Decimal('7.00')
+        entry.save()
+        self.assertTotals('11.50', total_normal_hours='0.00', total_sunday_hours='7.00')
+
+        entry.delete()
+        TimeSheetEntry.objects.filter(hour_type='night').delete()
+        self.assertTotals('0.00', total_sunday_hours='0.00', total_night_hours='0.00')
+
+    def test_adjustment_approval_adds_hours(self):
+        """L'entrée créée à l'approbation d'un ajustement est comptée"""
+        adjustment = TimeSheetAdjustment.objects.create(
+            timesheet=self.timesheet,
+            hours_adjustment=Decimal('2.50'),
+            reason='Heures supplémentaires'
+        )
+        TimeSheetEntry.objects.create(
+            timesheet=self.timesheet,
+            date=self.timesheet.get_last_day_of_month(),
+            hour_type=adjustment.hour_type,
+            hours_worked=abs(adjustment.hours_adjustment),
+            hourly_rate=0,
+        )
+        self.assertTotals('2.50', total_overtime_hours='2.50')
+
+    def test_totals_read_without_queries(self):
+        """Lire les totaux ne déclenche aucune requête"""
+        TimeSheetEntryFactory(timesheet=self.timesheet)
+        timesheet = TimeSheet.objects.get(pk=self.timesheet.pk)
+        with self.assertNumQueries(0):
+            timesheet.total_hours
+            timesheet.total_normal_hours
+            timesheet.total_overtime_hours
+
+    def test_status_change_keeps_concurrent_totals(self):
+        """Un changement de statut ne réécrit pas les totaux modifiés entre la lecture et l'enregistrement"""
+        from .viewsets import TimeSheetViewSet
+
+        get_object = TimeSheetViewSet.get_object
+
+        def get_object_then_concurrent_entry(viewset):
+            timesheet = get_object(viewset)
+            TimeSheetEntryFactory(timesheet=self.timesheet, hours_worked=Decimal('7.00'))
+            return timesheet
+
+        client = APIClient()
+        client.force_authenticate(UserFactory(role='rh'))
+        TimeSheet.objects.filter(pk=self.timesheet.pk).update(status='submitted')
+        with mock.patch.object(TimeSheetViewSet, 'get_object', get_object_then_concurrent_entry):
+            response = client.post(f'/api/timesheets/timesheets/{self.timesheet.pk}/approve/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTotals('7.00', total_normal_hours='7.00')
+        self.assertEqual(self.timesheet.status, 'approved')
+
+    def test_recompute_totals_command(self):
+        """La commande recompute_totals corrige les totaux désynchronisés"""
+        TimeSheetEntryFactory(timesheet=self.timesheet, hours_worked=Decimal('6.00'))
+        TimeSheet.objects.filter(pk=self.timesheet.pk).update(total_hours=0, total_normal_hours=0)
+
+        out = StringIO()
+        call_command('recompute_totals', stdout=out)
+        self.assertIn('1 total(aux) corrigé(s)', out.getvalue())
+        self.assertTotals('6.00', total_normal_hours='6.00')
+
+
+class AutoFillTestCase(TestCase):
+    """Tests pour le remplissage mensuel des feuilles de temps"""
+
+    def setUp(self):
+        self.shifts = [
+            ShiftFactory(date=date(2026, 3, 2)),  # Lundi
+            ShiftFactory(date=date(2026, 3, 3), start_time=time(21, 0), end_time=time(5, 0)),
+            ShiftFactory(date=date(2026, 3, 8)),  # Dimanche
+        ]
+
+    def _staff(self, count, month=3, shifts=None):
+        """Créer `count` salariés avec contrat, feuille du mois et quarts assignés"""
+        timesheets = []
+        for _ in range(count):
+            contract = ContractFactory()
+            timesheets.append(TimeSheetFactory(employee=contract.employee, month=month, status='draft'))
+            for shift in shifts or self.shifts:
+                AssignmentFactory(employee=contract.employee, shift=shift)
+        return timesheets
+
+    def test_fill_month(self):
+        """Les entrées sont créées avec le type d'heures et le taux du contrat"""
+        timesheet = self._staff(2)[0]
+        result = auto_fill_period(2026, 3)
+
+        self.assertEqual(result['created'], 6)
+        entries = {entry.date: entry for entry in timesheet.entries.all()}
+        self.assertEqual(entries[date(2026, 3, 3)].hour_type, 'night')
+        self.assertEqual(entries[date(2026, 3, 8)].hour_type, 'sunday')
+        self.assertEqual(entries[date(2026, 3, 2)].hourly_rate, Decimal('12.00'))
+
+        timesheet.refresh_from_db()
+        self.assertEqual(timesheet.total_hours, Decimal('24.00'))
+        self.assertEqual(timesheet.total_night_hours, Decimal('8.00'))
+
+    def test_rerun_is_a_noop(self):
+        """Un second remplissage ne réécrit rien"""
+        self._staff(2)
+        auto_fill_period(2026, 3)
+        result = auto_fill_period(2026, 3)
+        self.assertEqual((result['created'], result['updated'], result['deleted']), (0, 0, 0))
+        self.assertEqual(result['entries'], 6)
+
+    def test_cancelled_assignment_removed(self):
+        """Un quart annulé est retiré, les saisies manuelles sont conservées"""
+        timesheet = self._staff(1)[0]
+        auto_fill_period(2026, 3)
+        TimeSheetEntryFactory(timesheet=timesheet, hour_type='overtime', hours_worked=Decimal('2.00'))
+        timesheet.employee.assignments.filter(shift=self.shifts[0]).update(status='cancelled')
+
+        result = auto_fill_period(2026, 3)
+        self.assertEqual(result['deleted'], 1)
+        self.assertEqual(timesheet.entries.count(), 3)
+        timesheet.refresh_from_db()
+        self.assertEqual(timesheet.total_hours, Decimal('18.00'))
+
+    def test_query_count_is_constant(self):
+        """Le nombre de requêtes ne dépend pas de l'effectif"""
+        april_shifts = [ShiftFactory(date=date(2026, 4, day)) for day in (6, 7, 12)]
+        self._staff(1, month=3)
+        self._staff(5, month=4, shifts=april_shifts)
+
+        with CaptureQueriesContext(connection) as small_run:
+            auto_fill_period(2026, 3)
+        with CaptureQueriesContext(connection) as large_run:
+            auto_fill_period(2026, 4)
+
+        self.assertEqual(len(small_run), len(large_run))
+
+
+class HourSplitTestCase(SimpleTestCase):
+    """Tests pour le découpage des quarts en heures nuit/dimanche/férié"""
+
+    def _split(self, day, start, end):
+        return dict(split_shift(ShiftFactory.build(date=day, start_time=start, end_time=end)))
+
+    def test_night_shift_into_sunday(self):
+        """Un 19h-7h du samedi est découpé en normal, nuit et dimanche"""
+        self.assertEqual(self._split(date(2026, 3, 7), time(19, 0), time(7, 0)), {
+            'normal': Decimal('2.00'),
+            'night': Decimal('3.00'),
+            'sunday': Decimal('7.00'),
+        })
+
+    def test_equal_start_and_end_is_full_day(self):
+        """Un quart dont la fin égale le début dure 24h, comme dans le planning"""
+        shift = ShiftFactory.build(date=date(2026, 3, 10), start_time=time(7, 0), end_time=time(7, 0))
+        self.assertEqual(shift_bounds(shift), shift_interval_bounds(shift.date, shift.start_time, shift.end_time))
+        self.assertEqual(dict(split_shift(shift)), {'normal': Decimal('15.00'), 'night': Decimal('9.00')})
+
+    def test_early_morning_is_night(self):
+        """Les heures avant 6h sont des heures de nuit"""
+        self.assertEqual(self._split(date(2026, 3, 2), time(4, 30), time(12, 0)), {
+            'night': Decimal('1.50'),
+            'normal': Decimal('6.00'),
+        })
+
+    def test_public_holiday(self):
+        """Un jour férié prime sur la nuit, le lendemain redevient ordinaire"""
+        self.assertEqual(self._split(date(2026, 5, 1), time(20, 0), time(4, 0)), {
+            'holiday': Decimal('4.00'),
+            'night': Decimal('4.00'),
+        })
+
+    def test_french_holiday_calendar(self):
+        """Fêtes mobiles calculées depuis Pâques (5 avril 2026)"""
+        holidays = public_holidays(2026)
+        self.assertEqual(len(holidays), 11)
+        for day in (date(2026, 4, 6), date(2026, 5, 14), date(2026, 5, 25), date(2026, 7, 14)):
+            self.assertIn(day, holidays)
+
+
+class OvertimeTestCase(TestCase):
+    """Tests pour le reclassement hebdomadaire en heures supplémentaires"""
+
+    def setUp(self):
+        contract = ContractFactory()
+        self.timesheet = TimeSheetFactory(employee=contract.employee, status='draft')
+        # Semaine 10 (2 au 6 mars 2026) : 5 × 9h = 45h pour un contrat de 35h
+        for day in range(2, 7):
+            TimeSheetEntryFactory(timesheet=self.timesheet, date=date(2026, 3, day), hours_worked=Decimal('9.00'))
+        # Semaine 11 : 30h, pas de dépassement
+        for day in range(9, 12):
+            TimeSheetEntryFactory(timesheet=self.timesheet, date=date(2026, 3, day), hours_worked=Decimal('10.00'))
+
+    def test_excess_reclassified(self):
+        """Les 10h au-delà de 35h sont reclassées en une entrée d'heures supplémentaires"""
+        result = compute_overtime_period(2026, 3)
+
+        self.assertEqual(result['weeks'], 1)
+        self.assertEqual(result['overtime_hours'], Decimal('10.00'))
+        self.assertEqual(result['entries'], 2)
+        self.timesheet.refresh_from_db()
+        self.assertEqual(self.timesheet.total_hours, Decimal('75.00'))
+        self.assertEqual(self.timesheet.total_normal_hours, Decimal('65.00'))
+        self.assertEqual(self.timesheet.total_overtime_hours, Decimal('10.00'))
+
+    def test_rerun_replaces_generated_entries(self):
+        """Un nouveau calcul remplace les entrées générées sans les cumuler"""
+        compute_overtime_period(2026, 3, chunk_size=1)
+        compute_overtime_period(2026, 3, chunk_size=1)
+
+        self.assertEqual(self.timesheet.entries.filter(hour_type='overtime').count(), 1)
+        self.timesheet.refresh_from_db()
+        self.assertEqual(self.timesheet.total_overtime_hours, Decimal('10.00'))
+
+    def test_only_normal_hours_reclassified(self):
+        """Les heures de dimanche ne sont pas reclassées"""
+        TimeSheetEntry.objects.filter(timesheet=self.timesheet, date__lte=date(2026, 3, 6)).update(hour_type='sunday')
+        result = compute_overtime_period(2026, 3)
+        self.assertEqual(result['weeks'], 0)
+
+
+class ProvisioningTestCase(TestCase):
+    """Tests pour la création mensuelle des feuilles de temps et les rappels"""
+
+    def setUp(self):
+        self.employees = EmployeeFactory.create_batch(3)
+        EmployeeFactory(status='inactive')
+        TimeSheetFactory(employee=self.employees[0], year=2026, month=3, status='submitted')
+
+    def test_provisioning_is_idempotent(self):
+        """Les feuilles manquantes sont créées une seule fois, en nombre de requêtes constant"""
+        with self.assertNumQueries(3):
+            result = provision_timesheets(2026, 3, today=date(2026, 3, 2))
+        self.assertEqual(result, {'employees': 3, 'created': 2, 'reminders': 0})
+        self.assertEqual(TimeSheet.objects.filter(year=2026, month=3).count(), 3)
+
+        result = provision_timesheets(2026, 3, today=date(2026, 3, 2))
+        self.assertEqual(result['created'], 0)
+
+    def test_reminders_sent_once(self):
+        """À partir du 15, un seul rappel par feuille en brouillon"""
+        provision_timesheets(2026, 3, today=date(2026, 3, 2))
+        with self.assertNumQueries(5):
+            result = provision_timesheets(2026, 3, today=date(2026, 3, 16))
+        self.assertEqual(result['reminders'], 2)
+        provision_timesheets(2026, 3, today=date(2026, 3, 20))
+
+        self.assertEqual(
+            set(Notification.objects.filter(title=reminder_title(2026, 3)).values_list('employee_id', flat=True)),
+            {self.employees[1].id, self.employees[2].id}
+        )
+
+    def test_timesheets_view_is_read_only(self):
+        """La liste des feuilles ne crée plus rien"""
+        self.client.force_login(UserFactory(role='rh'))
+        with self.assertNumQueries(3):
+            response = self.client.get('/timesheets/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(TimeSheet.objects.count(), 1)
+
+
+class AbsenceImpactTestCase(TestCase):
+    """Tests pour l'impact groupé d'une absence sur le planning, les feuilles et la paie"""
+
+    def _staff(self, days):
+        """Salarié avec contrat, feuille de mars et un quart de 8h assigné et saisi par jour"""
+        contract = ContractFactory()
+        timesheet = TimeSheetFactory(employee=contract.employee, status='draft')
+        for day in days:
+            assignment = AssignmentFactory(employee=contract.employee, shift=ShiftFactory(date=date(2026, 3, day)))
+            TimeSheetEntryFactory(timesheet=timesheet, date=assignment.shift.date, assignment=assignment)
+        return contract.employee, timesheet
+
+    def test_preview_writes_nothing(self):
+        """La prévisualisation calcule l'impact sans rien enregistrer"""
+        employee, timesheet = self._staff([2, 3])
+        impact = record_absence(employee, date(2026, 3, 1), date(2026, 3, 7), 'sick', dry_run=True)
+
+        self.assertEqual(impact.summary()['cancelled_assignments'], 2)
+        self.assertEqual(impact.summary()['deleted_entries'], 2)
+        self.assertEqual(impact.deduction_total, Decimal('192.00'))
+        self.assertFalse(employee.absences.exists())
+        self.assertFalse(employee.payrolls.exists())
+        self.assertEqual(timesheet.entries.count(), 2)
+        self.assertEqual(employee.assignments.filter(status='cancelled').count(), 0)
+
+    def test_sick_leave_applied(self):
+        """Maladie : quarts annulés, entrées supprimées, retenue sur la fiche du mois"""
+        employee, timesheet = self._staff([2, 3, 10])
+        record_absence(employee, date(2026, 3, 1), date(2026, 3, 7), 'sick')
+
+        self.assertEqual(employee.absences.count(), 1)
+        self.assertEqual(employee.assignments.filter(status='cancelled', shift__status='cancelled').count(), 2)
+        timesheet.refresh_from_db()
+        self.assertEqual(timesheet.total_hours, Decimal('8.00'))
+        payroll = employee.payrolls.get(period='2026-03')
+        self.assertEqual(payroll.other_deductions, Decimal('192.00'))
+        self.assertEqual(payroll.net_salary, Decimal('-192.00'))
+        self.assertEqual(payroll.items.filter(item_type='deduction').count(), 2)
+
+    def test_vacation_maintains_pay(self):
+        """Congés payés : la rémunération des quarts annulés est maintenue"""
+        employee, _ = self._staff([2])
+        impact = record_absence(employee, date(2026, 3, 2), date(2026, 3, 2), 'vacation')
+
+        self.assertEqual(impact.maintained_total, Decimal('96.00'))
+        self.assertEqual(employee.payrolls.get(period='2026-03').gross_salary, Decimal('96.00'))
+
+    def test_query_count_is_constant(self):
+        """Le nombre de requêtes ne dépend pas du nombre de quarts touchés"""
+        short_employee, _ = self._staff([2])
+        long_employee, _ = self._staff([9, 10, 11, 12, 13])
+
+        with CaptureQueriesContext(connection) as short_run:
+            record_absence(short_employee, date(2026, 3, 1), date(2026, 3, 15), 'sick')
+        with CaptureQueriesContext(connection) as long_run:
+            record_absence(long_employee, date(2026, 3, 1), date(2026, 3, 15), 'sick')
+        self.assertEqual(len(short_run), len(long_run))
+
+    def test_preview_endpoint(self):
+        """L'API de prévisualisation renvoie l'impact sans créer l'absence"""
+        employee, _ = self._staff([2])
+        client = APIClient()
+        client.force_authenticate(UserFactory(role='rh'))
+        response = client.post('/api/timesheets/absences/preview/', {
+            'employee_id': employee.id, 'date_start': '2026-03-01', 'date_end': '2026-03-07', 'absence_type': 'sick',
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['cancelled_assignments'], 1)
+        self.assertEqual(response.data['deduction_total'], Decimal('96.00'))
+        self.assertFalse(employee.absences.exists())
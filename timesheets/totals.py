@@ -0,0 +1,125 @@
+"""
+Maintenance des totaux d'heures dénormalisés sur TimeSheet
+
+Chaque création/modification/suppression d'entrée applique un delta au total
+de son type d'heures et au total général, par un UPDATE avec F() (pas de
+relecture des entrées). Les écritures en masse (bulk_create, update) ne
+déclenchent pas de signaux : elles s'exécutent dans deferred_totals(), qui
+suspend les mises à jour incrémentales puis reconstruit les totaux.
+"""
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db.models import F
+
+from sirh_core.stats_cache import invalidate_stats
+
+from .models import HOUR_TYPE_TOTAL_FIELDS, TOTAL_FIELDS, TimeSheet, TimeSheetEntry, hour_totals_aggregates
+
+HOURS_PRECISION = Decimal('0.01')
+
+_local = threading.local()
+
+
+def totals_suspended():
+    """Vrai pendant une écriture en masse (deferred_totals)"""
+    return getattr(_local, 'depth', 0) > 0
+
+
+@contextmanager
+def deferred_totals(timesheets):
+    """
+    Suspendre les mises à jour incrémentales pendant une écriture en masse
+    sur les entrées, puis reconstruire les totaux des feuilles concernées.
+    """
+    _local.depth = getattr(_local, 'depth', 0) + 1
+    try:
+        yield
+    finally:
+        _local.depth -= 1
+    rebuild_totals(timesheets)
+    invalidate_stats('timesheets')
+
+
+def add_hours(deltas, timesheet_id, hour_type, hours):
+    """Cumuler un delta d'heures (type + total général) pour une feuille"""
+    if timesheet_id is None or not hours:
+        return
+    # Même arrondi que le DecimalField (2 décimales) pour éviter toute dérive
+    hours = Decimal(str(hours)).quantize(HOURS_PRECISION)
+    fields = deltas[timesheet_id]
+    fields['total_hours'] = fields.get('total_hours', Decimal('0.00')) + hours
+    field = HOUR_TYPE_TOTAL_FIELDS.get(hour_type)
+    if field:
+        fields[field] = fields.get(field, Decimal('0.00')) + hours
+
+
+def apply_deltas(deltas):
+    """Appliquer les deltas cumulés, un UPDATE par feuille concernée"""
+    for timesheet_id, fields in deltas.items():
+        updates = {field: F(field) + delta for field, delta in fields.items() if delta}
+        if updates:
+            TimeSheet.objects.filter(pk=timesheet_id).update(**updates)
+
+
+def entry_saved(entry, created):
+    """Mettre à jour les totaux après l'enregistrement d'une entrée"""
+    stored = None if created else getattr(entry, '_stored_hours', None)
+    if not created and (stored is None or None in stored):
+        # Valeurs précédentes inconnues (instance non chargée depuis la base) : recalcul complet
+        rebuild_totals(TimeSheet.objects.filter(pk=entry.timesheet_id))
+        entry.snapshot_hours()
+        return
+
+    deltas = defaultdict(dict)
+    if stored:
+        stored_timesheet_id, stored_hour_type, stored_hours = stored
+        add_hours(deltas, stored_timesheet_id, stored_hour_type, -stored_hours)
+    add_hours(deltas, entry.timesheet_id, entry.hour_type, entry.hours_worked)
+    apply_deltas(deltas)
+    entry.snapshot_hours()
+
+
+def entry_deleted(entry):
+    """Retirer des totaux les heures d'une entrée supprimée"""
+    stored = getattr(entry, '_stored_hours', None)
+    timesheet_id, hour_type, hours = stored if stored and None not in stored else (
+        entry.timesheet_id, entry.hour_type, entry.hours_worked
+    )
+    deltas = defaultdict(dict)
+    add_hours(deltas, timesheet_id, hour_type, -Decimal(str(hours)))
+    apply_deltas(deltas)
+
+
+def rebuild_totals(timesheets=None, batch_size=500):
+    """
+    Recalculer les totaux stockés depuis les entrées.
+    Une requête d'agrégation groupée + bulk_update, quel que soit le nombre de feuilles.
+    Retourne le nombre de feuilles modifiées.
+    """
+    timesheets = list(TimeSheet.objects.all() if timesheets is None else timesheets)
+    if not timesheets:
+        return 0
+
+    rows = (
+        TimeSheetEntry.objects.filter(timesheet_id__in=[timesheet.id for timesheet in timesheets])
+        .order_by()
+        .values('timesheet_id')
+        .annotate(**hour_totals_aggregates())
+    )
+    totals_by_timesheet = {row['timesheet_id']: row for row in rows}
+
+    changed = []
+    for timesheet in timesheets:
+        row = totals_by_timesheet.get(timesheet.id, {})
+        totals = {field: row.get(field) or Decimal('0.00') for field in TOTAL_FIELDS}
+        if any(getattr(timesheet, field) != value for field, value in totals.items()):
+            for field, value in totals.items():
+                setattr(timesheet, field, value)
+            changed.append(timesheet)
+
+    if changed:
+        TimeSheet.objects.bulk_update(changed, TOTAL_FIELDS, batch_size=batch_size)
+    return len(changed)
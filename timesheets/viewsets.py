@@ -3,11 +3,13 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
-from datetime import date
 from .models import TimeSheet, TimeSheetEntry, AbsenceRecord
 from .serializers import TimeSheetSerializer, TimeSheetEntrySerializer, AbsenceRecordSerializer
+from .absences import compute_absence_impact
+from .autofill import auto_fill_timesheets
 from accounts.permissions import IsRH, IsAdmin
 from employees.models import Employee
+from sirh_core.query_plan import plan_queryset
 
 
 class TimeSheetViewSet(viewsets.ModelViewSet):
@@ -23,7 +25,7 @@ class TimeSheetViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """Les employés ne voient que leurs propres feuilles, les RH/Admins voient toutes"""
         user = self.request.user
-        queryset = TimeSheet.objects.select_related('employee__user')
+        queryset = TimeSheet.objects.all()
         
         if user.role == 'employee':
             try:
@@ -32,7 +34,7 @@ class TimeSheetViewSet(viewsets.ModelViewSet):
             except:
                 queryset = TimeSheet.objects.none()
         
-        return queryset
+        return plan_queryset(queryset, self.get_serializer_class())
     
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def current_month(self, request):
@@ -84,7 +86,8 @@ class TimeSheetViewSet(viewsets.ModelViewSet):
             )
         timesheet.status = 'submitted'
         timesheet.submitted_at = timezone.now()
-        timesheet.save()
+        # Totaux d'heures tenus à jour par les entrées (F()) : non réécrits
+        timesheet.save(update_fields=['status', 'submitted_at', 'updated_at'])
         serializer = self.get_serializer(timesheet)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
@@ -100,7 +103,7 @@ class TimeSheetViewSet(viewsets.ModelViewSet):
         timesheet.status = 'approved'
         timesheet.approved_at = timezone.now()
         timesheet.approved_by = request.user
-        timesheet.save()
+        timesheet.save(update_fields=['status', 'approved_at', 'approved_by', 'updated_at'])
         serializer = self.get_serializer(timesheet)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
@@ -115,7 +118,7 @@ class TimeSheetViewSet(viewsets.ModelViewSet):
             )
         timesheet.status = 'draft'
         timesheet.submitted_at = None
-        timesheet.save()
+        timesheet.save(update_fields=['status', 'submitted_at', 'updated_at'])
         serializer = self.get_serializer(timesheet)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
@@ -129,7 +132,7 @@ class TimeSheetViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         timesheet.status = 'paid'
-        timesheet.save()
+        timesheet.save(update_fields=['status', 'updated_at'])
         serializer = self.get_serializer(timesheet)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -143,11 +146,12 @@ class TimeSheetEntryViewSet(viewsets.ModelViewSet):
     filterset_fields = ['timesheet', 'date', 'hour_type']
     ordering_fields = ['date', 'hour_type']
     ordering = ['-date']
+    cursor_ordering = ('-date', '-id')
     
     def get_queryset(self):
         """Filtrer par feuille de temps de l'utilisateur"""
         user = self.request.user
-        queryset = TimeSheetEntry.objects.select_related('timesheet', 'assignment', 'timesheet__employee__user')
+        queryset = TimeSheetEntry.objects.all()
         
         if user.role == 'employee':
             try:
@@ -156,7 +160,7 @@ class TimeSheetEntryViewSet(viewsets.ModelViewSet):
             except:
                 queryset = TimeSheetEntry.objects.none()
         
-        return queryset
+        return plan_queryset(queryset, self.get_serializer_class())
     
     @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
     def bulk_create_from_assignments(self, request):
@@ -192,50 +196,16 @@ class TimeSheetEntryViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_404_NOT_FOUND
                 )
         
-        # Récupérer tous les assignments du mois
-        from planning.models import Assignment
-        first_day = date(timesheet.year, timesheet.month, 1)
-        if timesheet.month == 12:
-            last_day = date(timesheet.year + 1, 1, 1) - timezone.timedelta(days=1)
-        else:
-            last_day = date(timesheet.year, timesheet.month + 1, 1) - timezone.timedelta(days=1)
-        
-        assignments = Assignment.objects.filter(
-            employee=timesheet.employee,
-            shift__date__gte=first_day,
-            shift__date__lte=last_day,
-            status__in=['assigned', 'confirmed', 'in_progress', 'completed']
-        )
-        
-        created_count = 0
-        for assignment in assignments:
-            # Déterminer le type d'heures basé sur le shift type
-            shift_type = assignment.shift.shift_type.name
-            if shift_type == 'night':
-                hour_type = 'night'
-            elif shift_type == 'sunday':
-                hour_type = 'sunday'
-            elif shift_type == 'holiday':
-                hour_type = 'holiday'
-            else:
-                hour_type = 'normal'
-            
-            # Créer l'entrée
-            entry, created = TimeSheetEntry.objects.get_or_create(
-                timesheet=timesheet,
-                assignment=assignment,
-                date=assignment.shift.date,
-                defaults={
-                    'hour_type': hour_type,
-                    'hours_worked': assignment.shift.duration_hours,
-                    'hourly_rate': 0  # À définir selon le contrat
-                }
-            )
-            if created:
-                created_count += 1
+        # Synchroniser les entrées avec les quarts du mois (même moteur que le remplissage mensuel)
+        result = auto_fill_timesheets([timesheet])
         
         return Response(
-            {'message': f'{created_count} entrées créées'},
+            {
+                'message': f"{result['created']} entrées créées",
+                'created': result['created'],
+                'updated': result['updated'],
+                'deleted': result['deleted'],
+            },
             status=status.HTTP_200_OK
         )
 
@@ -262,7 +232,7 @@ class AbsenceRecordViewSet(viewsets.ModelViewSet):
             except:
                 queryset = AbsenceRecord.objects.none()
         
-        return queryset
+        return plan_queryset(queryset, self.get_serializer_class())
     
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def current_month(self, request):
@@ -274,3 +244,11 @@ class AbsenceRecordViewSet(viewsets.ModelViewSet):
         )
         serializer = self.get_serializer(absences, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsRH | IsAdmin])
+    def preview(self, request):
+        """Prévisualiser l'impact d'une absence (quarts annulés, entrées supprimées, paie) sans l'enregistrer"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        impact = compute_absence_impact(AbsenceRecord(**serializer.validated_data))
+        return Response(impact.summary(), status=status.HTTP_200_OK)
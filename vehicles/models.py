@@ -2,9 +2,10 @@ from django.db import models
 from django.core.validators import RegexValidator
 from django.utils import timezone
 from accounts.models import CustomUser
+from sirh_core.tracking import TrackedModelMixin
 
 
-class Vehicle(models.Model):
+class Vehicle(TrackedModelMixin, models.Model):
     """Modèle pour les véhicules (ambulances, VSL, taxis)"""
     
     VEHICLE_TYPE_CHOICES = [